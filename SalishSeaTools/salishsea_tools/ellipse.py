@@ -15,9 +15,11 @@
 
 """A collection of tools for dealing with tidal ellipse calculations."""
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import numpy as np
 import netCDF4 as nc
-from salishsea_tools import tidetools
+from salishsea_tools import nc_tools, tidetools
 from nowcast import analyze
 from nowcast.figures import research_VENUS
 
@@ -214,11 +216,36 @@ def get_params(u, v, time, nconst, tidecorr=tidetools.CorrTides):
     :returns: params a dictionary containing the tidal ellipse parameter of the
         chosen constituents
     """
-    params = {}
     # Running fittit to get the amplitude and phase of the velcity time series.
     uapparam = tidetools.fittit(u, time, nconst)
     vapparam = tidetools.fittit(v, time, nconst)
 
+    return get_params_from_harmonics(uapparam, vapparam, tidecorr=tidecorr)
+
+
+def get_params_from_harmonics(uapparam, vapparam, tidecorr=tidetools.CorrTides):
+    """Calculates tidal ellipse parameters from the amplitudes and phases of
+    the u and v velocities, e.g. the results of
+    :py:class:`salishsea_tools.tidetools.HarmonicAnalyser` for records too
+    long to be held in memory.
+
+    :arg uapparam: Amplitude and phase of each constituent of one of the
+        orthogonal tidal current velocities, as returned by
+        :py:func:`salishsea_tools.tidetools.fittit`.
+    :type uapparam: dictionary
+
+    :arg vapparam: Amplitude and phase of each constituent of the other
+        orthogonal tidal current velocity.
+    :type vapparam: dictionary
+
+    :arg tidecorr: Tidal corrections in aplitude and phase. Default is the
+        nowcast values.
+    :type tidecorr: dictionary
+
+    :returns: params a dictionary containing the tidal ellipse parameter of the
+        chosen constituents
+    """
+    params = {}
     # Cycling through the constituents in the ap-parameter dict given by fittit
     for const in uapparam:
         # Applying tidal corrections to u and v phase parameter
@@ -251,6 +278,171 @@ def get_params(u, v, time, nconst, tidecorr=tidetools.CorrTides):
     return params
 
 
+# Names, long names, and units of the ellipse parameters in the netCDF
+# files written by get_params_domain()
+ELLIPSE_VARIABLES = (
+    ("semi_major", "Semi-Major Axis", "m/s"),
+    ("semi_minor", "Semi-Minor Axis", "m/s"),
+    ("inclination", "Inclination", "degrees"),
+    ("phase", "Phase", "degrees"),
+)
+
+
+def get_params_domain(
+    filesu,
+    filesv,
+    outfilename,
+    nconst,
+    tile_size=(100, 100),
+    depthrange="None",
+    depav=False,
+    tidecorr=tidetools.CorrTides,
+    max_workers=None,
+):
+    """Calculates tidal ellipse parameters over the whole domain of the
+    velocities in a series of grid_U and grid_V results files and writes them
+    to a netCDF file.
+
+    The domain is worked through in spatial tiles so that memory use is
+    bounded by the tile size rather than the domain size and length of the
+    time series.
+    For each tile, the velocities are read one file at a time,
+    prepared with :py:func:`prepare_vel`,
+    and accumulated by a :py:class:`salishsea_tools.tidetools.HarmonicAnalyser`
+    for each velocity component.
+    The ellipse parameters of the tile are written to outfilename when it is
+    finished.
+
+    Unstaggering in :py:func:`prepare_vel` needs the velocities at j-1 and i-1,
+    so the ellipse parameters at j=0 and i=0 are left as fill values.
+
+    :arg filesu: grid_U results files, in time order.
+    :type filesu: list
+
+    :arg filesv: grid_V results files, in the same order as filesu.
+    :type filesv: list
+
+    :arg outfilename: Name of the netCDF file to write the ellipse parameters
+        to.
+    :type outfilename: string
+
+    :arg nconst: The amount of tidal constituents used for the analysis. They
+        added in pairs and by order of importance, M2, K1, S2, O1, N2, P1, K2,
+        Q1.
+    :type nconst: int
+
+    :arg tile_size: Size of the tiles in the y and x dimensions.
+    :type tile_size: 2-tuple
+
+    :arg depthrange: Depth values of interest in meters as a float for a single
+        depth or a list for a range. A float will find the closest depth that
+        is <= the value given. Default is 'None' for the whole water column.
+    :type depthrange: float, string or list.
+
+    :arg depav: True will depth average over the whole depth profile given.
+        Default is False.
+    :type depav: boolean
+
+    :arg tidecorr: Tidal corrections in aplitude and phase. Default is the
+        nowcast values.
+    :type tidecorr: dictionary
+
+    :arg max_workers: Maximum number of worker processes to use to calculate
+        tiles in parallel; defaults to calculating the tiles one after the
+        other in this process.
+        The results file is only written by this process.
+    :type max_workers: int
+    """
+    with nc.Dataset(filesu[0]) as f:
+        depth = f.variables["depthu"][:]
+        ny, nx = f.variables["vozocrtx"].shape[-2:]
+    k = _depth_indices(depth, depthrange)
+    dep = np.atleast_1d(depth[k])
+    constituents = tidetools.FIT_CONSTITUENTS[:nconst]
+
+    tiles = [
+        (slice(j, min(j + tile_size[0], ny)), slice(i, min(i + tile_size[1], nx)))
+        for j in range(1, ny, tile_size[0])
+        for i in range(1, nx, tile_size[1])
+    ]
+    tile_args = (filesu, filesv, k, dep, depav, nconst, tidecorr)
+
+    with nc.Dataset(outfilename, "w") as out:
+        dims = ("y", "x") if depav else ("depth", "y", "x")
+        if not depav:
+            out.createDimension("depth", dep.size)
+            out.createVariable("depth", float, ("depth",))[:] = dep
+            out.variables["depth"].units = "m"
+        out.createDimension("y", ny)
+        out.createDimension("x", nx)
+        for const in constituents:
+            for name, long_name, units in ELLIPSE_VARIABLES:
+                var = out.createVariable("{}_{}".format(const, name), float, dims)
+                var.long_name = "{} {}".format(const, long_name)
+                var.units = units
+
+        def write_tile(tile, params):
+            for const in constituents:
+                for name, long_name, units in ELLIPSE_VARIABLES:
+                    var = out.variables["{}_{}".format(const, name)]
+                    var[(Ellipsis,) + tile] = params[const][long_name]
+            out.sync()
+
+        if max_workers is None or max_workers < 2:
+            for tile in tiles:
+                write_tile(tile, _get_params_tile(tile, *tile_args))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(_get_params_tile, tile, *tile_args): tile
+                    for tile in tiles
+                }
+                for future in as_completed(futures):
+                    write_tile(futures[future], future.result())
+
+
+def _get_params_tile(tile, filesu, filesv, k, dep, depav, nconst, tidecorr):
+    """Calculate the tidal ellipse parameters of a spatial tile for
+    :py:func:`get_params_domain`.
+
+    :returns: params a dictionary containing the tidal ellipse parameter of the
+        chosen constituents
+    """
+    # The unstaggering in prepare_vel requires an extra j and i
+    jss = slice(tile[0].start - 1, tile[0].stop)
+    iss = slice(tile[1].start - 1, tile[1].stop)
+    reftime = np.datetime64(tidecorr["reftime"].replace(tzinfo=None), "us")
+    uanalyser = tidetools.HarmonicAnalyser(nconst)
+    vanalyser = tidetools.HarmonicAnalyser(nconst)
+    for fileu, filev in zip(filesu, filesv):
+        with nc.Dataset(fileu) as fu, nc.Dataset(filev) as fv:
+            u = fu.variables["vozocrtx"][:, k, jss, iss]
+            v = fv.variables["vomecrty"][:, k, jss, iss]
+            time = (nc_tools.get_datetime64s(fu) - reftime) / np.timedelta64(1, "h")
+        u_u, v_v = prepare_vel(u, v, depav=depav, depth=dep)
+        uanalyser.update(u_u, time)
+        vanalyser.update(v_v, time)
+    return get_params_from_harmonics(
+        uanalyser.results(), vanalyser.results(), tidecorr=tidecorr
+    )
+
+
+def _depth_indices(depth, depthrange):
+    """Return the indices of the depths of interest for
+    :py:func:`get_params_domain`, always as an array or slice so that the
+    depth dimension is kept.
+    """
+    # Case one: for a single depth.
+    if type(depthrange) == float or type(depthrange) == int:
+        return np.where(depth <= depthrange)[0][-1:]
+    # Case two: for a specific range of depths
+    elif type(depthrange) == list:
+        in_range = np.logical_and(depth > depthrange[0], depth < depthrange[1])
+        return np.where(in_range)[0]
+    # Case three: For the whole depth range.
+    return slice(None)
+
+
 def get_params_nowcast_15(
     to,
     tf,
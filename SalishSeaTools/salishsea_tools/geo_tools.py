@@ -17,6 +17,7 @@
 
 import numpy as np
 import xarray as xr
+from scipy.spatial import cKDTree
 
 
 def distance_along_curve(lons, lats):
@@ -274,6 +275,113 @@ def find_closest_model_point(
             return np.nan, np.nan
 
 
+def find_closest_model_points(
+    lons,
+    lats,
+    model_lons,
+    model_lats,
+    grid="NEMO",
+    land_mask=None,
+    tols={
+        "NEMO": {"tol_lon": 0.007, "tol_lat": 0.004},
+        "GEM2.5": {"tol_lon": 0.018, "tol_lat": 0.013},
+        "continental2.5": {"tol_lon": 0.018, "tol_lat": 0.013},
+    },
+    checkTol=False,
+):
+    """Returns the grid coordinates of the closest model points
+    to many specified lons/lats.
+    If land_mask is provided, returns the closest water points.
+
+    This gives the same results as calling
+    :py:func:`find_closest_model_point` for each lon/lat,
+    but the grid points within tolerance of all of the lons/lats are found
+    with a single query of a k-d tree of the model grid,
+    instead of a search of the whole grid for each lon/lat.
+    It does not depend on the order of the points like
+    :py:func:`closestPointArray`.
+
+    :arg lons: longitudes to find closest grid points to
+    :type lons: :py:class:`numpy.ndarray`
+
+    :arg lats: latitudes to find closest grid points to
+    :type lats: :py:class:`numpy.ndarray`
+
+    :arg model_lons: specified model longitude grid
+    :type model_lons: :py:obj:`numpy.ndarray`
+
+    :arg model_lats: specified model latitude grid
+    :type model_lats: :py:obj:`numpy.ndarray`
+
+    :arg grid: specify which default lon/lat tolerances
+    :type grid: string
+
+    :arg land_mask: describes which grid coordinates are land
+    :type land_mask: numpy array
+
+    :arg tols: stored default tols for different grid types
+    :type tols: dict
+
+    :arg checkTol: optionally check that nearest ocean point is not
+        outside specified tolerances in case that spiral search is called
+
+    :returns: yinds, xinds: numpy arrays of same shape as input lons,
+        with NaN where no model point is found
+    """
+    if grid not in tols:
+        raise KeyError(
+            "The provided grid type is not in tols. "
+            "Use another grid type or add your grid type to tols."
+        )
+    tol_lon, tol_lat = tols[grid]["tol_lon"], tols[grid]["tol_lat"]
+    model_lons, model_lats = np.asarray(model_lons[:]), np.asarray(model_lats[:])
+    flat_lons, flat_lats = model_lons.ravel(), model_lats.ravel()
+    lons, lats = np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
+
+    # Scaling by the tolerances makes the tolerance box around each point
+    # a unit ball in the maximum norm
+    tree = cKDTree(np.column_stack((flat_lons / tol_lon, flat_lats / tol_lat)))
+    candidates = tree.query_ball_point(
+        np.column_stack((lons.ravel() / tol_lon, lats.ravel() / tol_lat)),
+        r=1,
+        p=np.inf,
+    )
+
+    outj = np.full(lons.size, np.nan)
+    outi = np.full(lons.size, np.nan)
+    for n, points in enumerate(candidates):
+        lon, lat = lons.flat[n], lats.flat[n]
+        points = np.sort(np.asarray(points, dtype=int))
+        # Same tolerance test as find_closest_model_point()
+        cand_lons, cand_lats = flat_lons[points], flat_lats[points]
+        in_tol = np.logical_and(
+            np.logical_and(cand_lons > lon - tol_lon, cand_lons < lon + tol_lon),
+            np.logical_and(cand_lats > lat - tol_lat, cand_lats < lat + tol_lat),
+        )
+        points = points[in_tol]
+        if points.size == 0:
+            continue
+        dists = haversine(lon, lat, flat_lons[points], flat_lats[points])
+        j, i = np.unravel_index(points[dists.argmin()], model_lons.shape)
+
+        # If point is on land and land mask is provided
+        # try to find closest water point
+        if land_mask is not None and land_mask[j, i]:
+            try:
+                j, i = _spiral_search_for_closest_water_point(
+                    j, i, land_mask, lon, lat, model_lons, model_lats
+                )
+            except ValueError:
+                continue
+            if checkTol and (
+                np.abs(model_lons[j, i] - lon) > tol_lon
+                or np.abs(model_lats[j, i] - lat) > tol_lat
+            ):
+                continue
+        outj[n], outi[n] = j, i
+    return outj.reshape(lons.shape), outi.reshape(lons.shape)
+
+
 def closestPointArray(
     lons,
     lats,
@@ -24,12 +24,14 @@ https://nbviewer.org/github/SalishSeaCast/analysis-nancy/blob/master/notebooks/e
 NKS nsoontie@eos.ubc.ca 08-2016
 """
 
+import os
+
 from salishsea_tools import geo_tools
-from tqdm import tqdm
 import numpy as np
 import netCDF4 as nc
 import scipy.interpolate as spi
 import scipy.sparse as sp
+from scipy.spatial import cKDTree
 
 __all__ = [
     "calculate_H",
@@ -38,7 +40,10 @@ __all__ = [
     "time_dependent_grid_U",
     "time_dependent_grid_V",
     "build_GEM_mask",
+    "build_weights",
     "build_matrix",
+    "save_matrix",
+    "load_matrix",
     "use_matrix",
 ]
 
@@ -86,6 +91,10 @@ def calculate_time_dependent_grid(
     tmask,
     ssh,
     input_vars,
+    time_chunk=None,
+    subset=None,
+    out=None,
+    memmap=None,
 ):
     """Calculate the time dependent vertical grids and scale factors for
     variable volume in NEMO.
@@ -108,25 +117,58 @@ def calculate_time_dependent_grid(
     :typ input_vars: dictionary
     :type return_vars: list of strings
 
+    :arg time_chunk: Number of time steps to calculate at a time;
+                     defaults to all of them at once.
+                     The adjustment factor is only calculated for one chunk
+                     at a time, and ssh may be a :py:class:`netCDF4.Variable`,
+                     in which case it is read one chunk at a time.
+    :type time_chunk: int
+
+    :arg subset: Horizontal subset of the grid to calculate,
+                 as (y slice, x slice) in full grid indices;
+                 defaults to the whole grid.
+    :type subset: 2-tuple of slices
+
+    :arg out: Arrays to write the results into, keyed by returned key;
+              e.g. :py:class:`numpy.memmap` or :py:class:`netCDF4.Variable`
+              instances. Arrays for keys that are not in out are allocated.
+    :type out: dictionary
+
+    :arg memmap: Directory in which to allocate the results that are not in
+                 out as memory-mapped .npy files named for their keys,
+                 rather than in memory.
+    :type memmap: str
+
     :returns: A dictionary containing the desired time dependent vertical
               scale factors on t and w grids and depths on t and w grids.
               Dimensions of each: (time, depth, y, x)
     """
+    sy, sx = _subset_slices(subset, tmask.shape[1:])
     # adjustment factors
-    H = calculate_H(e3t0, tmask)
-    adj = calculate_adjustment_factor(H, ssh)
-    adj = np.expand_dims(adj, axis=1)  # expand to give depth dimension
-    # Time-dependent grids
-    return_vars = {}
-    for key in input_vars:
-        return_key = "{}t".format(key[0:-1])
-        return_vars[return_key] = input_vars[key] * adj
+    H = calculate_H(e3t0[:, sy, sx], tmask[:, sy, sx])
 
-    return return_vars
+    def ssh_chunk(t0, t1):
+        return np.asanyarray(ssh[t0:t1, sy, sx])
+
+    return _time_dependent_grid(
+        H, ssh_chunk, ssh.shape[0], input_vars, (sy, sx), time_chunk, out, memmap
+    )
 
 
 def time_dependent_grid_U(
-    e3u0, e1u, e2u, e1t, e2t, umask, ssh, input_vars, return_ssh=False
+    e3u0,
+    e1u,
+    e2u,
+    e1t,
+    e2t,
+    umask,
+    ssh,
+    input_vars,
+    return_ssh=False,
+    time_chunk=None,
+    subset=None,
+    out=None,
+    memmap=None,
 ):
     """Calculate time-dependent vertical grid spacing and depths on U-grid for
     variable volume in NEMO.
@@ -168,35 +210,80 @@ def time_dependent_grid_U(
                      should be returned (ssh_u)
     :type return_ssh: boolean
 
+    :arg time_chunk: Number of time steps to calculate at a time;
+                     defaults to all of them at once.
+                     The adjustment factor is only calculated for one chunk
+                     at a time, and ssh may be a :py:class:`netCDF4.Variable`,
+                     in which case it is read one chunk at a time.
+    :type time_chunk: int
+
+    :arg subset: Horizontal subset of the grid to calculate,
+                 as (y slice, x slice) in full grid indices;
+                 defaults to the whole grid.
+    :type subset: 2-tuple of slices
+
+    :arg out: Arrays to write the results into, keyed by returned key;
+              e.g. :py:class:`numpy.memmap` or :py:class:`netCDF4.Variable`
+              instances. Arrays for keys that are not in out are allocated.
+    :type out: dictionary
+
+    :arg memmap: Directory in which to allocate the results that are not in
+                 out as memory-mapped .npy files named for their keys,
+                 rather than in memory.
+    :type memmap: str
+
     :returns: A dictionary containing the desired time dependent vertical
               scale factors on depths on u grid.
               Dimensions of each: (time, depth, y, x).
               If returned, ssh_u has dimensions (time, y, x)"""
-    ssh_u = np.zeros_like(ssh)
-    e1e2u = e1u * e2u
-    e1e2t = e1t * e2t
-    # Interpolate ssh to u grid
-    ssh_u[:, :, 0:-1] = (
-        0.5
-        * umask[0, :, 0:-1]
-        / e1e2u[:, 0:-1]
-        * (e1e2t[:, 0:-1] * ssh[:, :, 0:-1] + e1e2t[:, 1:] * ssh[:, :, 1:])
+    sy, sx = _subset_slices(subset, umask.shape[1:])
+    # The interpolation of ssh to the u grid needs the next T-grid column
+    sx_next = slice(sx.start, min(sx.stop + 1, umask.shape[2]))
+    width = sx.stop - sx.start
+    e1e2u = (e1u * e2u)[sy, sx_next]
+    e1e2t = (e1t * e2t)[sy, sx_next]
+    umask0 = umask[0, sy, sx_next]
+
+    def ssh_chunk(t0, t1):
+        ssh_t = np.asanyarray(ssh[t0:t1, sy, sx_next])
+        ssh_u = np.zeros_like(ssh_t)
+        # Interpolate ssh to u grid
+        ssh_u[:, :, 0:-1] = (
+            0.5
+            * umask0[:, 0:-1]
+            / e1e2u[:, 0:-1]
+            * (e1e2t[:, 0:-1] * ssh_t[:, :, 0:-1] + e1e2t[:, 1:] * ssh_t[:, :, 1:])
+        )
+        return ssh_u[:, :, :width]
+
+    H = calculate_H(e3u0[:, sy, sx], umask[:, sy, sx])
+    return _time_dependent_grid(
+        H,
+        ssh_chunk,
+        ssh.shape[0],
+        input_vars,
+        (sy, sx),
+        time_chunk,
+        out,
+        memmap,
+        ssh_key="ssh_u" if return_ssh else None,
     )
-    H = calculate_H(e3u0, umask)
-    adj = calculate_adjustment_factor(H, ssh_u)
-    adj = np.expand_dims(adj, axis=1)
-    # Time-dependent grids
-    return_vars = {}
-    for key in input_vars:
-        return_key = "{}t".format(key[0:-1])
-        return_vars[return_key] = input_vars[key] * adj
-    if return_ssh:
-        return_vars["ssh_u"] = ssh_u
-    return return_vars
 
 
 def time_dependent_grid_V(
-    e3v0, e1v, e2v, e1t, e2t, vmask, ssh, input_vars, return_ssh=False
+    e3v0,
+    e1v,
+    e2v,
+    e1t,
+    e2t,
+    vmask,
+    ssh,
+    input_vars,
+    return_ssh=False,
+    time_chunk=None,
+    subset=None,
+    out=None,
+    memmap=None,
 ):
     """Calculate time-dependent vertical grid spacing and depths on V-grid for
     variable volume in NEMO.
@@ -238,114 +325,386 @@ def time_dependent_grid_V(
                      should be returned (ssh_v)
     :type return_ssh: boolean
 
+    :arg time_chunk: Number of time steps to calculate at a time;
+                     defaults to all of them at once.
+                     The adjustment factor is only calculated for one chunk
+                     at a time, and ssh may be a :py:class:`netCDF4.Variable`,
+                     in which case it is read one chunk at a time.
+    :type time_chunk: int
+
+    :arg subset: Horizontal subset of the grid to calculate,
+                 as (y slice, x slice) in full grid indices;
+                 defaults to the whole grid.
+    :type subset: 2-tuple of slices
+
+    :arg out: Arrays to write the results into, keyed by returned key;
+              e.g. :py:class:`numpy.memmap` or :py:class:`netCDF4.Variable`
+              instances. Arrays for keys that are not in out are allocated.
+    :type out: dictionary
+
+    :arg memmap: Directory in which to allocate the results that are not in
+                 out as memory-mapped .npy files named for their keys,
+                 rather than in memory.
+    :type memmap: str
+
     :returns: A dictionary containing the desired time dependent vertical
               scale factors and depths on v grid.
               Dimensions of each: (time, depth, y, x).
               If returned, ssh_uvhas dimensions (time, y, x)"""
-    ssh_v = np.zeros_like(ssh)
-    e1e2v = e1v * e2v
-    e1e2t = e1t * e2t
-    # Interpolate ssh to V-grid
-    ssh_v[:, 0:-1, :] = (
-        0.5
-        * vmask[0, 0:-1, :]
-        / e1e2v[0:-1, :]
-        * (e1e2t[0:-1, :] * ssh[:, 0:-1, :] + e1e2t[1:, :] * ssh[:, 1:, :])
+    sy, sx = _subset_slices(subset, vmask.shape[1:])
+    # The interpolation of ssh to the v grid needs the next T-grid row
+    sy_next = slice(sy.start, min(sy.stop + 1, vmask.shape[1]))
+    height = sy.stop - sy.start
+    e1e2v = (e1v * e2v)[sy_next, sx]
+    e1e2t = (e1t * e2t)[sy_next, sx]
+    vmask0 = vmask[0, sy_next, sx]
+
+    def ssh_chunk(t0, t1):
+        ssh_t = np.asanyarray(ssh[t0:t1, sy_next, sx])
+        ssh_v = np.zeros_like(ssh_t)
+        # Interpolate ssh to V-grid
+        ssh_v[:, 0:-1, :] = (
+            0.5
+            * vmask0[0:-1, :]
+            / e1e2v[0:-1, :]
+            * (e1e2t[0:-1, :] * ssh_t[:, 0:-1, :] + e1e2t[1:, :] * ssh_t[:, 1:, :])
+        )
+        return ssh_v[:, :height, :]
+
+    H = calculate_H(e3v0[:, sy, sx], vmask[:, sy, sx])
+    return _time_dependent_grid(
+        H,
+        ssh_chunk,
+        ssh.shape[0],
+        input_vars,
+        (sy, sx),
+        time_chunk,
+        out,
+        memmap,
+        ssh_key="ssh_v" if return_ssh else None,
     )
-    H = calculate_H(e3v0, vmask)
-    adj = calculate_adjustment_factor(H, ssh_v)
-    adj = np.expand_dims(adj, axis=1)
-    # Time-dependent grids
-    return_vars = {}
-    for key in input_vars:
-        return_key = "{}t".format(key[0:-1])
-        return_vars[return_key] = input_vars[key] * adj
-    if return_ssh:
-        return_vars["ssh_v"] = ssh_v
 
+
+def _subset_slices(subset, shape):
+    """Return the (y, x) slices with explicit start and stop indices of
+    a horizontal subset of a grid with (y, x) shape.
+    """
+    if subset is None:
+        subset = (slice(None), slice(None))
+    sy, sx = (slice(*s.indices(n)[:2]) for s, n in zip(subset, shape))
+    return sy, sx
+
+
+def _time_dependent_grid(
+    H, ssh_chunk, ntimes, input_vars, subset, time_chunk, out, memmap, ssh_key=None
+):
+    """Calculate time-dependent grids from the initial grids in input_vars
+    one time chunk at a time, writing them into out arrays,
+    memory-mapped arrays, or allocated arrays.
+
+    ssh_chunk(t0, t1) returns the ssh on the grid of H for time steps t0 to
+    t1.
+    """
+    sy, sx = subset
+    initial = {key: input_vars[key][..., sy, sx] for key in input_vars}
+    time_chunk = time_chunk or max(ntimes, 1)
+    return_vars = dict(out or {})
+    for t0 in range(0, ntimes, time_chunk):
+        t1 = min(t0 + time_chunk, ntimes)
+        ssh_t = ssh_chunk(t0, t1)
+        adj = calculate_adjustment_factor(H, ssh_t)
+        adj = np.expand_dims(adj, axis=1)  # expand to give depth dimension
+        chunk_vars = {"{}t".format(key[0:-1]): initial[key] for key in initial}
+        if ssh_key is not None:
+            chunk_vars[ssh_key] = ssh_t
+        for return_key, initial_var in chunk_vars.items():
+            if return_key == ssh_key:
+                shape, dtype = (ntimes,) + ssh_t.shape[1:], ssh_t.dtype
+                masked = np.ma.isMaskedArray(ssh_t)
+            else:
+                # Initial grids may keep the leading t=1 axis of the mesh mask
+                shape = (ntimes,) + np.broadcast_shapes(
+                    initial_var.shape, adj[:1].shape
+                )[1:]
+                dtype = np.result_type(initial_var, adj)
+                masked = np.ma.isMaskedArray(initial_var) or np.ma.isMaskedArray(adj)
+            if return_key not in return_vars:
+                if memmap is not None:
+                    return_vars[return_key] = np.lib.format.open_memmap(
+                        os.path.join(memmap, return_key + ".npy"),
+                        mode="w+",
+                        dtype=dtype,
+                        shape=shape,
+                    )
+                elif masked:
+                    return_vars[return_key] = np.ma.empty(shape, dtype=dtype)
+                else:
+                    return_vars[return_key] = np.empty(shape, dtype=dtype)
+            target = return_vars[return_key]
+            if return_key == ssh_key:
+                target[t0:t1] = ssh_t
+            elif type(target) in (np.ndarray, np.memmap) and not masked:
+                # Multiply in place to avoid a temporary copy of the chunk
+                np.multiply(initial_var, adj, out=target[t0:t1])
+            else:
+                target[t0:t1] = initial_var * adj
     return return_vars
 
 
 def build_GEM_mask(grid_GEM, grid_NEMO, mask_NEMO):
-    """ """
-
-    # Evaluate each point on GEM grid
-    mask_GEM = []
-    msg = "Building HRDPS mask"
-    for lon, lat in zip(
-        tqdm(grid_GEM["longitude"].values.flatten() - 360, desc=msg),
-        grid_GEM["latitude"].values.flatten(),
-    ):
-
-        # Find closest NEMO ji point
-        try:
-            j, i = geo_tools.find_closest_model_point(
-                lon,
-                lat,
-                grid_NEMO["longitude"],
-                grid_NEMO["latitude"],
-            )
-        except ValueError:
-            j, i = np.nan, np.nan
-
-        # Append to list
-        if j is np.nan or i is np.nan:
-            mask_GEM.append(0)
-        else:
-            mask_GEM.append(mask_NEMO[j, i].values)
-
-    # Reshape
-    mask_GEM = np.array(mask_GEM, dtype="int").reshape(grid_GEM["longitude"].shape)
+    """Build a land/water mask on the HRDPS/GEM grid from the NEMO mask.
+
+    Each GEM grid point takes the mask value of the closest NEMO grid point
+    that is within the NEMO tolerances of
+    :py:func:`geo_tools.find_closest_model_point`,
+    and is land (0) if there is no such point.
+    The NEMO points of all of the GEM points are found in one batch query
+    by :py:func:`geo_tools.find_closest_model_points`.
+
+    :arg grid_GEM: GEM grid with longitude (0 to 360) and latitude variables
+    :type grid_GEM: :py:class:`xarray.Dataset`
+
+    :arg grid_NEMO: NEMO grid with longitude and latitude variables
+    :type grid_NEMO: :py:class:`xarray.Dataset`
+
+    :arg mask_NEMO: NEMO surface mask, 1 for water
+    :type mask_NEMO: :py:class:`xarray.DataArray`
+
+    :returns: GEM grid mask, 1 for water
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    j, i = geo_tools.find_closest_model_points(
+        np.asarray(grid_GEM["longitude"]) - 360,
+        np.asarray(grid_GEM["latitude"]),
+        np.asarray(grid_NEMO["longitude"]),
+        np.asarray(grid_NEMO["latitude"]),
+    )
+    found = ~np.isnan(j)
+    mask_GEM = np.zeros(found.shape, dtype="int")
+    mask_GEM[found] = np.asarray(mask_NEMO)[j[found].astype(int), i[found].astype(int)]
 
     return mask_GEM
 
 
-def build_matrix(weightsfile, opsfile):
+def build_weights(lons_src, lats_src, lons_NEMO, lats_NEMO, weightsfile=None):
+    """Calculate bilinear interpolation weights from an operational
+    (e.g. HRDPS) lon/lat grid to the NEMO grid.
+
+    For each NEMO grid point, the source grid cells with the closest centres
+    are found with a k-d tree query,
+    and the bilinear mapping of each of those cells is inverted by
+    vectorized Newton iterations to find the one that contains the point,
+    and the point's position in it.
+    NEMO grid points that are outside of the source grid get zero weights.
+
+    The weights are in the same form as a NEMO weights file:
+    src01 to src04 are the (Fortran, 1-based) flattened source grid indices
+    of the corners of the cell that contains each NEMO grid point,
+    and wgt01 to wgt04 are their weights.
+    If weightsfile is given, they are written to it so that it can be
+    used by :py:func:`build_matrix`.
+
+    Longitudes may be in either the -180 to 180 or 0 to 360 convention.
+
+    :arg lons_src: Source grid longitudes
+    :type lons_src: :py:class:`numpy.ndarray`
+
+    :arg lats_src: Source grid latitudes
+    :type lats_src: :py:class:`numpy.ndarray`
+
+    :arg lons_NEMO: NEMO grid longitudes
+    :type lons_NEMO: :py:class:`numpy.ndarray`
+
+    :arg lats_NEMO: NEMO grid latitudes
+    :type lats_NEMO: :py:class:`numpy.ndarray`
+
+    :arg weightsfile: Path to NEMO weights file to write.
+    :type weightsfile: str
+
+    :returns: src and wgt arrays with shape (4,) + NEMO grid shape
+    :rtype: 2-tuple of :py:class:`numpy.ndarray`
+    """
+    lons_src, lats_src = np.asarray(lons_src, dtype=float), np.asarray(lats_src)
+    lons_NEMO, lats_NEMO = np.asarray(lons_NEMO, dtype=float), np.asarray(lats_NEMO)
+    lons_src, lons_NEMO = (lons_src + 180) % 360 - 180, (lons_NEMO + 180) % 360 - 180
+    nemoshape, nx = lons_NEMO.shape, lons_src.shape[1]
+
+    # Cell corners, anti-clockwise from (j, i)
+    corners = (
+        (slice(0, -1), slice(0, -1)),
+        (slice(0, -1), slice(1, None)),
+        (slice(1, None), slice(1, None)),
+        (slice(1, None), slice(0, -1)),
+    )
+    cell_lons = np.stack([lons_src[c].ravel() for c in corners], axis=-1)
+    cell_lats = np.stack([lats_src[c].ravel() for c in corners], axis=-1)
+
+    # Closest cell centres, with longitude scaled to make distances isotropic
+    scale = np.cos(np.radians(lats_src.mean()))
+    tree = cKDTree(
+        np.column_stack((cell_lons.mean(axis=1) * scale, cell_lats.mean(axis=1)))
+    )
+    lons, lats = lons_NEMO.ravel(), lats_NEMO.ravel()
+    _, cells = tree.query(
+        np.column_stack((lons * scale, lats)), k=min(8, cell_lons.shape[0])
+    )
+    cells = cells.reshape(lons.size, -1)
+
+    # Position of each point in each candidate cell
+    s, t = _invert_bilinear(
+        cell_lons[cells], cell_lats[cells], lons[:, np.newaxis], lats[:, np.newaxis]
+    )
+    tol = 1e-9
+    inside = (s >= -tol) & (s <= 1 + tol) & (t >= -tol) & (t <= 1 + tol)
+    first = inside.argmax(axis=1)
+    points = np.arange(lons.size)
+    found = inside[points, first]
+    cell = cells[points, first]
+    s = np.clip(s[points, first], 0, 1)
+    t = np.clip(t[points, first], 0, 1)
+
+    cj, ci = np.divmod(cell, nx - 1)
+    src = np.stack(
+        [cj * nx + ci, cj * nx + ci + 1, (cj + 1) * nx + ci + 1, (cj + 1) * nx + ci]
+    )
+    wgt = np.stack([(1 - s) * (1 - t), s * (1 - t), s * t, (1 - s) * t])
+    src[:, ~found], wgt[:, ~found] = 0, 0
+    src, wgt = (src + 1).reshape((4,) + nemoshape), wgt.reshape((4,) + nemoshape)
+
+    if weightsfile is not None:
+        with nc.Dataset(weightsfile, "w") as f:
+            f.createDimension("y", nemoshape[0])
+            f.createDimension("x", nemoshape[1])
+            for k in range(4):
+                f.createVariable("src0{}".format(k + 1), "i4", ("y", "x"))[:] = src[k]
+                f.createVariable("wgt0{}".format(k + 1), "f8", ("y", "x"))[:] = wgt[k]
+    return src, wgt
+
+
+def _invert_bilinear(x, y, px, py, iterations=10):
+    """Find the position (s, t) of points (px, py) in quadrilateral cells
+    with corners (x, y) by Newton iterations on the bilinear mapping
+    from the unit square to each cell.
+    Corners are in the last axis, anti-clockwise from (s, t) = (0, 0).
+    """
+    a0, a1 = x[..., 0], x[..., 1] - x[..., 0]
+    a2, a3 = x[..., 3] - x[..., 0], x[..., 0] - x[..., 1] + x[..., 2] - x[..., 3]
+    b0, b1 = y[..., 0], y[..., 1] - y[..., 0]
+    b2, b3 = y[..., 3] - y[..., 0], y[..., 0] - y[..., 1] + y[..., 2] - y[..., 3]
+    s = np.full(a0.shape, 0.5)
+    t = np.full(a0.shape, 0.5)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(iterations):
+            fx = a0 + a1 * s + a2 * t + a3 * s * t - px
+            fy = b0 + b1 * s + b2 * t + b3 * s * t - py
+            j00, j01 = a1 + a3 * t, a2 + a3 * s
+            j10, j11 = b1 + b3 * t, b2 + b3 * s
+            det = j00 * j11 - j01 * j10
+            s = s - (j11 * fx - j01 * fy) / det
+            t = t - (j00 * fy - j10 * fx) / det
+    return s, t
+
+
+def build_matrix(weightsfile, opsfile, matrixfile=None):
     """
     Given a NEMO weights file and an operational surface forcing file, we
     assemble the weights into a sparse interpolation matrix that interpolates
     the surface forcing data from the operational grid to the NEMO grid. This
     function returns the matrix and the NEMO grid shape.
 
+    If matrixfile is given and exists, the matrix and NEMO grid shape are
+    loaded from it with :py:func:`load_matrix` instead; otherwise they are
+    saved to it with :py:func:`save_matrix` after they are assembled.
+
     :arg weightsfile: Path to NEMO weights file.
     :type weightsfile: str
 
     :arg opsfile: Path to an operational file.
     :type opsfile: str
 
+    :arg matrixfile: Path to a saved interpolation matrix file;
+                     must end with .npz.
+    :type matrixfile: str
+
     :returns: Sparse interpolation matrix and NEMO grid shape
     :rtype: (:class:`~scipy:scipy.sparse.csr_matrix`, :class:`tuple`)
     """
+    if matrixfile is not None and os.path.exists(matrixfile):
+        return load_matrix(matrixfile)
+
     # Weights
     with nc.Dataset(weightsfile) as f:
-        s1 = f.variables["src01"][:] - 1  # -1 for fortran-to-python indexing
-        s2 = f.variables["src02"][:] - 1
-        s3 = f.variables["src03"][:] - 1
-        s4 = f.variables["src04"][:] - 1
-        w1 = f.variables["wgt01"][:]
-        w2 = f.variables["wgt02"][:]
-        w3 = f.variables["wgt03"][:]
-        w4 = f.variables["wgt04"][:]
+        # -1 for fortran-to-python indexing
+        src = [f.variables["src0{}".format(k)][:] - 1 for k in range(1, 5)]
+        wgt = [f.variables["wgt0{}".format(k)][:] for k in range(1, 5)]
 
     with nc.Dataset(opsfile) as f:
         NO = (
             f.dimensions["x"].size * f.dimensions["y"].size
         )  # number of operational grid points
     NN, nemoshape = (
-        s1.size,
-        s1.shape,
+        src[0].size,
+        src[0].shape,
     )  # number of NEMO grid points and shape of NEMO matrix
 
-    # Build matrix
-    n = np.array([x for x in range(0, NN)])
-    M1 = sp.csr_matrix((w1.flatten(), (n, s1.flatten())), (NN, NO))
-    M2 = sp.csr_matrix((w2.flatten(), (n, s2.flatten())), (NN, NO))
-    M3 = sp.csr_matrix((w3.flatten(), (n, s3.flatten())), (NN, NO))
-    M4 = sp.csr_matrix((w4.flatten(), (n, s4.flatten())), (NN, NO))
-    M = M1 + M2 + M3 + M4
+    # Build matrix; the weights of the 4 source points of each NEMO point
+    # are summed into one matrix
+    n = np.tile(np.arange(NN), 4)
+    M = sp.csr_matrix(
+        (
+            np.concatenate([w.flatten() for w in wgt]),
+            (n, np.concatenate([s.flatten() for s in src])),
+        ),
+        (NN, NO),
+    )
+    if matrixfile is not None:
+        save_matrix(matrixfile, M, nemoshape)
     return M, nemoshape
 
 
+def save_matrix(matrixfile, matrix, nemoshape):
+    """Save an interpolation matrix and NEMO grid shape
+    (produced by grid_tools.build_matrix) to a compressed sparse matrix file.
+
+    :arg matrixfile: Path to the file to save; .npz is appended if it does
+                     not end with .npz
+    :type matrixfile: str
+
+    :arg matrix: Interpolation matrix (from build_matrix)
+    :type matrix: :class:`~scipy:scipy.sparse.csr_matrix`
+
+    :arg nemoshape: NEMO grid shape (from build_matrix)
+    :type nemoshape: tuple
+    """
+    matrix = sp.csr_matrix(matrix)
+    np.savez_compressed(
+        matrixfile,
+        data=matrix.data,
+        indices=matrix.indices,
+        indptr=matrix.indptr,
+        shape=matrix.shape,
+        nemoshape=nemoshape,
+    )
+
+
+def load_matrix(matrixfile):
+    """Load an interpolation matrix and NEMO grid shape saved by
+    :py:func:`save_matrix`.
+
+    :arg matrixfile: Path to the saved matrix file.
+    :type matrixfile: str
+
+    :returns: Sparse interpolation matrix and NEMO grid shape
+    :rtype: (:class:`~scipy:scipy.sparse.csr_matrix`, :class:`tuple`)
+    """
+    with np.load(matrixfile) as f:
+        matrix = sp.csr_matrix(
+            (f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"])
+        )
+        nemoshape = tuple(int(n) for n in f["nemoshape"])
+    return matrix, nemoshape
+
+
 def use_matrix(opsfile, matrix, nemoshape, variable, time):
     """
     Given an operational surface forcing file, an interpolation matrix and
@@ -353,6 +712,12 @@ def use_matrix(opsfile, matrix, nemoshape, variable, time):
     a time index, we return the operational data interpolated onto the NEMO
     grid.
 
+    Many time steps and variables can be interpolated at once by passing
+    a slice or sequence of time indices and a list of variable names.
+    The ops file is opened once and the time steps of each variable are
+    interpolated by a single sparse matrix product with a
+    (operational points x times) block.
+
     :arg opsfile: Path to operational file to interpolate.
     :type opsfile: str
 
@@ -362,22 +727,32 @@ def use_matrix(opsfile, matrix, nemoshape, variable, time):
     :arg nemoshape: NEMO grid shape (from build_matrix)
     :type nemoshape: tuple
 
-    :arg variable: Specified variable in ops file.
-    :type variable: str
+    :arg variable: Specified variable, or list of variables, in ops file.
+    :type variable: str or list
 
-    :arg time index: time index in ops file.
-    :type time index: integer
+    :arg time index: time index, or slice or sequence of time indices,
+                     in ops file.
+    :type time index: integer, slice or sequence
 
-    :returns: Operational data interpolated onto the NEMO grid
-    :rtype: :class:`~numpy:numpy.ndarray`
+    :returns: Operational data interpolated onto the NEMO grid,
+              with a leading time dimension if time is a slice or sequence;
+              a dict of them keyed by variable name if variable is a list.
+    :rtype: :class:`~numpy:numpy.ndarray` or dict
     """
+    variables = [variable] if isinstance(variable, str) else list(variable)
+    single_time = np.ndim(time) == 0 and not isinstance(time, slice)
     with nc.Dataset(opsfile) as f:
-        odata = f.variables[variable][time, ...]  # Load the 2D field
-
-    # Interpolate by matrix multiply - quite fast
-    ndata = matrix * odata.flatten()
-
-    # Reshape to NEMO shaped array
-    ndata = ndata.reshape(nemoshape)
-
-    return ndata
+        ndata = {}
+        for var in variables:
+            # Load the 2D field(s)
+            odata = np.asarray(f.variables[var][time, ...])
+            times_shape = odata.shape[: odata.ndim - 2]
+            odata = odata.reshape(-1, matrix.shape[1])
+
+            # Interpolate by matrix multiply - quite fast
+            # Reshape to NEMO shaped array
+            ndata[var] = (matrix @ odata.T).T.reshape(times_shape + tuple(nemoshape))
+            if single_time:
+                ndata[var] = ndata[var].reshape(nemoshape)
+
+    return ndata[variable] if isinstance(variable, str) else ndata
@@ -26,13 +26,16 @@ Included are functions for:
 """
 
 from collections import namedtuple, OrderedDict
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 from resource import getrlimit, RLIMIT_NOFILE
+import json
 import os
 
 import arrow
 import netCDF4 as nc
 import numpy as np
+import xarray as xr
 
 import warnings
 
@@ -253,11 +256,60 @@ def time_origin(dataset, time_var="time_counter"):
     return value
 
 
+def get_datetime64s(dataset, tindex=None, time_var="time_counter"):
+    """Return the time stamps of the time_counter values in dataset
+    as a numpy datetime64 array.
+
+    The time stamps are calculated by adding the time_counter values
+    (in seconds) to the dataset's time_counter.time_origin value
+    in a single vectorized operation,
+    so this is much faster than :py:func:`timestamp` for long time series.
+
+    :arg dataset: netcdf dataset object
+    :type dataset: :py:class:`netCDF4.Dataset`
+
+    :arg tindex: time_counter variable index(es);
+                 defaults to all of the time_counter values.
+    :type tindex: int or iterable
+
+    :arg time_var: name of the time variable
+    :type time_var: str
+
+    :returns: UTC time stamp value(s) at tindex in the dataset.
+    :rtype: :py:class:`numpy.ndarray` of :py:class:`numpy.datetime64`
+    """
+    time_orig = np.datetime64(time_origin(dataset, time_var=time_var).naive, "us")
+    seconds = np.asarray(dataset.variables[time_var][:], dtype=float)
+    if tindex is not None:
+        try:
+            seconds = seconds[np.atleast_1d(np.asarray(tindex, dtype=int))]
+        except IndexError:
+            raise IndexError("time_counter variable has no tindex={}".format(tindex))
+    return time_orig + np.round(seconds * 1e6).astype("timedelta64[us]")
+
+
+def _datetime64s_to_datetimes(datetime64s):
+    """Convert an array of UTC numpy datetime64 time stamps to an array of
+    timezone-aware :py:class:`datetime.datetime` objects.
+
+    :arg datetime64s: UTC time stamps.
+    :type datetime64s: :py:class:`numpy.ndarray` of :py:class:`numpy.datetime64`
+
+    :rtype: :py:class:`numpy.ndarray` of :py:class:`datetime.datetime`
+    """
+    naive = datetime64s.astype("datetime64[us]").astype(datetime)
+    return np.array(
+        [dt.replace(tzinfo=timezone.utc) for dt in naive.ravel()], dtype=object
+    ).reshape(naive.shape)
+
+
 def timestamp(dataset, tindex, time_var="time_counter"):
     """Return the time stamp of the tindex time_counter value(s) in dataset.
 
     The time stamp is calculated by adding the time_counter[tindex] value
     (in seconds) to the dataset's time_counter.time_origin value.
+    Use :py:func:`get_datetime64s` instead to get a numpy datetime64 array
+    without constructing :py:class:`Arrow` instances.
 
     :arg dataset: netcdf dataset object
     :type dataset: :py:class:`netCDF4.Dataset`
@@ -271,18 +323,14 @@ def timestamp(dataset, tindex, time_var="time_counter"):
     :returns: Time stamp value(s) at tindex in the dataset.
     :rtype: :py:class:`Arrow` instance or list of instances
     """
-    time_orig = time_origin(dataset, time_var=time_var)
-    time_counter = dataset.variables[time_var]
     try:
         iter(tindex)
     except TypeError:
         tindex = [tindex]
-    results = []
-    for i in tindex:
-        try:
-            results.append(time_orig + timedelta(seconds=time_counter[i].item()))
-        except IndexError:
-            raise IndexError("time_counter variable has no tindex={}".format(tindex))
+    datetimes = _datetime64s_to_datetimes(
+        get_datetime64s(dataset, tindex, time_var=time_var)
+    )
+    results = [arrow.Arrow.fromdatetime(dt) for dt in datetimes]
     if len(results) > 1:
         return results
     else:
@@ -292,8 +340,8 @@ def timestamp(dataset, tindex, time_var="time_counter"):
 def get_datetimes(dataset, time_var="time_counter"):
     """Return the datetime array for a dataset
 
-    This is a wrapper around nc_tools.timestamp that automatically
-    handles all timesteps and converts the arrow objects to a numpy
+    This is a wrapper around nc_tools.get_datetime64s that automatically
+    handles all timesteps and converts the numpy datetime64 values to a numpy
     datetime object array.
 
     :arg dataset: netcdf dataset object.
@@ -306,15 +354,8 @@ def get_datetimes(dataset, time_var="time_counter"):
     :rtype: :py:class:`Numpy` array of :py:class:`Datetime` instances
     """
 
-    # Get arrow objects
-    time_stamps = timestamp(
-        dataset,
-        np.arange(dataset.variables["time_counter"].shape[0]),
-        time_var=time_var,
-    )
-
     # Get datetime.datetime objects
-    datetimes = np.array([time_stamp.datetime for time_stamp in time_stamps])
+    datetimes = _datetime64s_to_datetimes(get_datetime64s(dataset, time_var=time_var))
 
     return datetimes
 
@@ -368,9 +409,11 @@ def ssh_timeseries_at_point(
     :rtype: :py:class:`collections.namedtuple`
     """
     ssh = grid_T.variables[ssh_var][:, j, i]
-    time = timestamp(grid_T, range(len(ssh)), time_var=time_var)
-    if datetimes:
-        time = np.array([a.datetime for a in time])
+    time = _datetime64s_to_datetimes(
+        get_datetime64s(grid_T, range(len(ssh)), time_var=time_var)
+    )
+    if not datetimes:
+        time = [arrow.Arrow.fromdatetime(dt) for dt in time]
     ssh_ts = namedtuple("ssh_ts", "ssh, time")
     return ssh_ts(ssh, np.array(time))
 
@@ -406,13 +449,124 @@ def uv_wind_timeseries_at_point(grid_weather, j, i, datetimes=False):
     """
     u_wind = grid_weather.variables["u_wind"][:, j, i]
     v_wind = grid_weather.variables["v_wind"][:, j, i]
-    time = timestamp(grid_weather, range(len(u_wind)))
-    if datetimes:
-        time = np.array([a.datetime for a in time])
+    time = _datetime64s_to_datetimes(get_datetime64s(grid_weather, range(len(u_wind))))
+    if not datetimes:
+        time = [arrow.Arrow.fromdatetime(dt) for dt in time]
     wind_ts = namedtuple("wind_ts", "u, v, time")
     return wind_ts(u_wind, v_wind, np.array(time))
 
 
+def ssh_timeseries_at_points(
+    grid_T, points, time_var="time_counter", ssh_var="sossheig"
+):
+    """Return the sea surface height time series at many grid points
+    from a NEMO tracer results dataset.
+
+    The sea surface heights at all of the points are read from the dataset
+    in a single read of only the grid rows and columns that contain them,
+    so this is much faster than calling :py:func:`ssh_timeseries_at_point`
+    for each point.
+
+    :arg grid_T: Tracer results dataset from NEMO.
+    :type grid_T: :py:class:`netCDF4.Dataset`
+
+    :arg points: Grid point (j, i) indices to get sea surface heights at.
+                 A dict maps station names to grid points;
+                 e.g. :kbd:`{name: places.PLACES[name]['NEMO grid ji'] for name in names}`.
+                 The stations of a sequence of grid points are numbered from 0.
+    :type points: dict or sequence of 2-tuples
+
+    :arg time_var: Name of time variable.
+    :type time_var: str
+
+    :arg ssh_var: Name of sea surface height variable.
+    :type ssh_var: str
+
+    :returns: Dataset with a :py:attr:`ssh` variable indexed by
+              :py:attr:`station` and :py:attr:`time`, and :py:attr:`j`
+              and :py:attr:`i` grid point coordinates of the stations.
+    :rtype: :py:class:`xarray.Dataset`
+    """
+    return _timeseries_at_points(grid_T, {"ssh": ssh_var}, points, time_var)
+
+
+def uv_wind_timeseries_at_points(grid_weather, points, time_var="time_counter"):
+    """Return the u and v wind components time series at many grid points
+    from a weather forcing dataset.
+
+    The wind components at all of the points are read from the dataset
+    in a single read of only the grid rows and columns that contain them,
+    so this is much faster than calling
+    :py:func:`uv_wind_timeseries_at_point` for each point.
+
+    :arg grid_weather: Weather forcing dataset, typically from an
+                       :file:`ops_yYYYYmMMdDD.nc` file produced by the
+                       :py:mod:`nowcast.workers.grid_to_netcdf` worker.
+    :type grid_weather: :py:class:`netCDF4.Dataset`
+
+    :arg points: Grid point (j, i) indices to get wind components at.
+                 A dict maps station names to grid points;
+                 e.g. :kbd:`{name: places.PLACES[name]['wind grid ji'] for name in names}`.
+                 The stations of a sequence of grid points are numbered from 0.
+    :type points: dict or sequence of 2-tuples
+
+    :arg time_var: Name of time variable.
+    :type time_var: str
+
+    :returns: Dataset with :py:attr:`u` and :py:attr:`v` variables indexed by
+              :py:attr:`station` and :py:attr:`time`, and :py:attr:`j`
+              and :py:attr:`i` grid point coordinates of the stations.
+    :rtype: :py:class:`xarray.Dataset`
+    """
+    return _timeseries_at_points(
+        grid_weather, {"u": "u_wind", "v": "v_wind"}, points, time_var
+    )
+
+
+def _timeseries_at_points(dataset, var_names, points, time_var):
+    """Return the time series of (time, y, x) variables at many grid points
+    from a dataset, reading each variable once.
+
+    :arg dataset: Results or forcing dataset.
+    :type dataset: :py:class:`netCDF4.Dataset`
+
+    :arg dict var_names: Names of the variables in the returned dataset
+                         mapped to their names in dataset.
+
+    :arg points: Grid point (j, i) indices, as a dict keyed by station name
+                 or a sequence.
+    :type points: dict or sequence of 2-tuples
+
+    :arg time_var: Name of time variable.
+    :type time_var: str
+
+    :rtype: :py:class:`xarray.Dataset`
+    """
+    try:
+        stations = list(points.keys())
+        ji = np.array([points[station] for station in stations], dtype=int)
+    except AttributeError:
+        ji = np.array(points, dtype=int).reshape(-1, 2)
+        stations = list(range(len(ji)))
+    j, i = ji[:, 0], ji[:, 1]
+    # Orthogonal indexing on the rows and columns of the points reads
+    # len(rows) * len(cols) values per time step, rather than a block that
+    # can span most of the domain for widely spread points
+    rows, j_row = np.unique(j, return_inverse=True)
+    cols, i_col = np.unique(i, return_inverse=True)
+    data_vars = {}
+    for name, var_name in var_names.items():
+        values = dataset.variables[var_name][:, rows, cols][:, j_row, i_col]
+        data_vars[name] = (("station", "time"), np.ma.filled(values.T, np.nan))
+    coords = {
+        "station": stations,
+        "time": get_datetime64s(dataset, time_var=time_var),
+        "j": ("station", j),
+        "i": ("station", i),
+    }
+    return xr.Dataset(data_vars, coords=coords)
+
+
 def init_dataset_attrs(
     dataset,
     title,
@@ -620,82 +774,103 @@ def generate_pressure_file(filename, p_file, t_file, alt_file, day):
     :arg alt_file: full path name of the altitude of CGRF cells
     :type alt_file: string
 
+    :arg day: the date
+    :type day: arrow
+    """
+    with nc.Dataset(alt_file) as f:
+        alt = f.variables["alt"][:]
+    _write_pressure_file(filename, p_file, t_file, alt, day)
+
+
+def _write_pressure_file(filename, p_file, t_file, alt, day):
+    """Generates a file with CGRF pressure corrected to sea level
+    from the altitude of the CGRF cells.
+
+    :arg filename: full path name where the corrected pressure should be saved
+    :type filename: string
+
+    :arg p_file: full path name of the uncorrected CGRF pressure
+    :type p_file: string
+
+    :arg t_file: full path name of the corresponding CGRF temperature
+    :type t_file: string
+
+    :arg alt: altitude of CGRF cells
+    :type alt: numpy array
+
     :arg day: the date
     :type day: arrow
     """
     # load data
-    f = nc.Dataset(p_file)
-    press = f.variables["atmpres"]
-    f = nc.Dataset(t_file)
-    temp = f.variables["tair"]
-    time = f.variables["time_counter"]
-    lon = f.variables["nav_lon"]
-    lat = f.variables["nav_lat"]
-    f = nc.Dataset(alt_file)
-    alt = f.variables["alt"]
-
-    # correct pressure
-    press_corr = np.zeros(press.shape)
-    for k in range(press.shape[0]):
-        press_corr[k, :, :] = _slp(alt, press[k, :, :], temp[k, :, :])
-
-    # Create netcdf
-    slp_file = nc.Dataset(filename, "w", zlib=True)
-    description = "corrected sea level pressure"
-    # dataset attributes
-    init_dataset_attrs(
-        slp_file,
-        title=(
-            "CGRF {} forcing dataset for {}".format(
-                description, day.format("YYYY-MM-DD")
+    with nc.Dataset(p_file) as pf, nc.Dataset(t_file) as tf:
+        press = pf.variables["atmpres"]
+        temp = tf.variables["tair"]
+        time = tf.variables["time_counter"]
+        lon = tf.variables["nav_lon"]
+        lat = tf.variables["nav_lat"]
+
+        # correct pressure for all time steps at once
+        press_corr = _slp(alt, press[:], temp[:])
+
+        # Create netcdf
+        with nc.Dataset(filename, "w", zlib=True) as slp_file:
+            description = "corrected sea level pressure"
+            # dataset attributes
+            init_dataset_attrs(
+                slp_file,
+                title=(
+                    "CGRF {} forcing dataset for {}".format(
+                        description, day.format("YYYY-MM-DD")
+                    )
+                ),
+                notebook_name="",
+                nc_filepath="",
+                comment=(
+                    "Processed and adjusted from "
+                    "goapp.ocean.dal.ca::canadian_GDPS_reforecasts_v1 files."
+                ),
+                quiet=True,
             )
-        ),
-        notebook_name="",
-        nc_filepath="",
-        comment=(
-            "Processed and adjusted from "
-            "goapp.ocean.dal.ca::canadian_GDPS_reforecasts_v1 files."
-        ),
-        quiet=True,
-    )
-    # dimensions
-    slp_file.createDimension("time_counter", 0)
-    slp_file.createDimension("y", press_corr.shape[1])
-    slp_file.createDimension("x", press_corr.shape[2])
-    # time
-    time_counter = slp_file.createVariable("time_counter", "double", ("time_counter",))
-    time_counter.calendar = time.calendar
-    time_counter.long_name = time.long_name
-    time_counter.title = time.title
-    time_counter.units = time.units
-    time_counter[:] = time[:]
-    time_counter.valid_range = time.valid_range
-    # lat/lon variables
-    nav_lat = slp_file.createVariable("nav_lat", "float32", ("y", "x"))
-    nav_lat.long_name = lat.long_name
-    nav_lat.units = lat.units
-    nav_lat.valid_max = lat.valid_max
-    nav_lat.valid_min = lat.valid_min
-    nav_lat.nav_model = lat.nav_model
-    nav_lat[:] = lat
-    nav_lon = slp_file.createVariable("nav_lon", "float32", ("y", "x"))
-    nav_lon.long_name = lon.long_name
-    nav_lon.units = lon.units
-    nav_lon.valid_max = lon.valid_max
-    nav_lon.valid_min = lon.valid_min
-    nav_lon.nav_model = lon.nav_model
-    nav_lon[:] = lon
-    # Pressure
-    atmpres = slp_file.createVariable("atmpres", "float32", ("time_counter", "y", "x"))
-    atmpres.long_name = "Sea Level Pressure"
-    atmpres.units = press.units
-    atmpres.valid_min = press.valid_min
-    atmpres.valid_max = press.valid_max
-    atmpres.missing_value = press.missing_value
-    atmpres.axis = press.axis
-    atmpres[:] = press_corr[:]
-
-    slp_file.close()
+            # dimensions
+            slp_file.createDimension("time_counter", 0)
+            slp_file.createDimension("y", press_corr.shape[1])
+            slp_file.createDimension("x", press_corr.shape[2])
+            # time
+            time_counter = slp_file.createVariable(
+                "time_counter", "double", ("time_counter",)
+            )
+            time_counter.calendar = time.calendar
+            time_counter.long_name = time.long_name
+            time_counter.title = time.title
+            time_counter.units = time.units
+            time_counter[:] = time[:]
+            time_counter.valid_range = time.valid_range
+            # lat/lon variables
+            nav_lat = slp_file.createVariable("nav_lat", "float32", ("y", "x"))
+            nav_lat.long_name = lat.long_name
+            nav_lat.units = lat.units
+            nav_lat.valid_max = lat.valid_max
+            nav_lat.valid_min = lat.valid_min
+            nav_lat.nav_model = lat.nav_model
+            nav_lat[:] = lat[:]
+            nav_lon = slp_file.createVariable("nav_lon", "float32", ("y", "x"))
+            nav_lon.long_name = lon.long_name
+            nav_lon.units = lon.units
+            nav_lon.valid_max = lon.valid_max
+            nav_lon.valid_min = lon.valid_min
+            nav_lon.nav_model = lon.nav_model
+            nav_lon[:] = lon[:]
+            # Pressure
+            atmpres = slp_file.createVariable(
+                "atmpres", "float32", ("time_counter", "y", "x")
+            )
+            atmpres.long_name = "Sea Level Pressure"
+            atmpres.units = press.units
+            atmpres.valid_min = press.valid_min
+            atmpres.valid_max = press.valid_max
+            atmpres.missing_value = press.missing_value
+            atmpres.axis = press.axis
+            atmpres[:] = press_corr[:]
 
 
 def generate_pressure_file_ops(filename, p_file, t_file, alt_file, day):
@@ -713,70 +888,203 @@ def generate_pressure_file_ops(filename, p_file, t_file, alt_file, day):
     :arg alt_file: full path name of the altitude of CGRF cells
     :type alt_file: string
 
+    :arg day: the date
+    :type day: arrow
+    """
+    _write_pressure_file_ops(
+        filename, p_file, t_file, _read_height_ops(alt_file, t_file), day
+    )
+
+
+def _read_height_ops(alt_file, t_file):
+    """Read the altitude of the cells of the larger GEM domain
+    and truncate it to the domain of the temperature file.
+    """
+    with nc.Dataset(alt_file) as f, nc.Dataset(t_file) as tf:
+        alt, _, _ = _truncate_height(
+            f.variables["HGT_surface"][:],
+            f.variables["longitude"][:],
+            f.variables["latitude"][:],
+            tf.variables["nav_lon"][:],
+            tf.variables["nav_lat"][:],
+        )
+    return alt
+
+
+def _write_pressure_file_ops(filename, p_file, t_file, alt, day):
+    """Generates a file with GRIB2 pressure corrected to sea level.
+
+    :arg filename: full path name where the corrected pressure should be saved
+    :type filename: string
+
+    :arg p_file: full path name of the uncorrected pressure
+    :type p_file: string
+
+    :arg t_file: full path name of the corresponding temperature
+    :type t_file: string
+
+    :arg alt: altitude of the GEM cells truncated to the domain of t_file
+              by :py:func:`_truncate_height`
+    :type alt: numpy array
+
     :arg day: the date
     :type day: arrow
     """
     # load data
-    f = nc.Dataset(p_file)
-    press = f.variables["atmpres"]
-    f = nc.Dataset(t_file)
-    temp = f.variables["tair"]
-    time = f.variables["time_counter"]
-    lon = f.variables["nav_lon"]
-    lat = f.variables["nav_lat"]
-    f = nc.Dataset(alt_file)
-    alt = f.variables["HGT_surface"]
-    lat_a = f.variables["latitude"]
-    lon_a = f.variables["longitude"]
-
-    alt, lon_a, lat_a = _truncate_height(alt, lon_a, lat_a, lon, lat)
-
-    # correct pressure
-    press_corr = np.zeros(press.shape)
-    for k in range(press.shape[0]):
-        press_corr[k, :, :] = _slp(alt, press[k, :, :], temp[k, :, :])
-
-    # Create netcdf
-    slp_file = nc.Dataset(filename, "w", zlib=True)
-    description = "corrected sea level pressure"
-    # dataset attributes
-    init_dataset_attrs(
-        slp_file,
-        title=(
-            "GRIB2 {} forcing dataset for {}".format(
-                description, day.format("YYYY-MM-DD")
+    with nc.Dataset(p_file) as pf, nc.Dataset(t_file) as tf:
+        press = pf.variables["atmpres"]
+        temp = tf.variables["tair"]
+        time = tf.variables["time_counter"]
+        lon = tf.variables["nav_lon"]
+        lat = tf.variables["nav_lat"]
+
+        # correct pressure for all time steps at once
+        press_corr = _slp(alt, press[:], temp[:])
+
+        # Create netcdf
+        with nc.Dataset(filename, "w", zlib=True) as slp_file:
+            description = "corrected sea level pressure"
+            # dataset attributes
+            init_dataset_attrs(
+                slp_file,
+                title=(
+                    "GRIB2 {} forcing dataset for {}".format(
+                        description, day.format("YYYY-MM-DD")
+                    )
+                ),
+                notebook_name="",
+                nc_filepath="",
+                comment=("Processed and adjusted from " "GEM 2.5km operational model"),
+                quiet=True,
             )
-        ),
-        notebook_name="",
-        nc_filepath="",
-        comment=("Processed and adjusted from " "GEM 2.5km operational model"),
-        quiet=True,
-    )
-    # dimensions
-    slp_file.createDimension("time_counter", 0)
-    slp_file.createDimension("y", press_corr.shape[1])
-    slp_file.createDimension("x", press_corr.shape[2])
-    # time
-    time_counter = slp_file.createVariable("time_counter", "double", ("time_counter",))
-    time_counter.long_name = time.long_name
-    time_counter.units = time.units
-    time_counter[:] = time[:]
-    # lat/lon variables
-    nav_lat = slp_file.createVariable("nav_lat", "float32", ("y", "x"))
-    nav_lat.long_name = lat.long_name
-    nav_lat.units = lat.units
-    nav_lat[:] = lat
-    nav_lon = slp_file.createVariable("nav_lon", "float32", ("y", "x"))
-    nav_lon.long_name = lon.long_name
-    nav_lon.units = lon.units
-    nav_lon[:] = lon
-    # Pressure
-    atmpres = slp_file.createVariable("atmpres", "float32", ("time_counter", "y", "x"))
-    atmpres.long_name = "Sea Level Pressure"
-    atmpres.units = press.units
-    atmpres[:] = press_corr[:]
-
-    slp_file.close()
+            # dimensions
+            slp_file.createDimension("time_counter", 0)
+            slp_file.createDimension("y", press_corr.shape[1])
+            slp_file.createDimension("x", press_corr.shape[2])
+            # time
+            time_counter = slp_file.createVariable(
+                "time_counter", "double", ("time_counter",)
+            )
+            time_counter.long_name = time.long_name
+            time_counter.units = time.units
+            time_counter[:] = time[:]
+            # lat/lon variables
+            nav_lat = slp_file.createVariable("nav_lat", "float32", ("y", "x"))
+            nav_lat.long_name = lat.long_name
+            nav_lat.units = lat.units
+            nav_lat[:] = lat[:]
+            nav_lon = slp_file.createVariable("nav_lon", "float32", ("y", "x"))
+            nav_lon.long_name = lon.long_name
+            nav_lon.units = lon.units
+            nav_lon[:] = lon[:]
+            # Pressure
+            atmpres = slp_file.createVariable(
+                "atmpres", "float32", ("time_counter", "y", "x")
+            )
+            atmpres.long_name = "Sea Level Pressure"
+            atmpres.units = press.units
+            atmpres[:] = press_corr[:]
+
+
+def generate_pressure_files(
+    start, end, filename, p_file, t_file, alt_file, ops=False, max_workers=None
+):
+    """Generates files with CGRF or GRIB2 pressure corrected to sea level
+    for each day in a date range.
+
+    The altitude file is read once for all of the days,
+    the pressure correction is applied to all of the time steps of a day
+    at once,
+    and the days can be processed concurrently by worker processes.
+
+    The file names are templates that are formatted with the date of each day
+    as :kbd:`day`;
+    e.g. :kbd:`slp_y{day:YYYY}m{day:MM}d{day:DD}.nc`.
+
+    :arg start: first date in the range
+    :type start: arrow
+
+    :arg end: last date in the range
+    :type end: arrow
+
+    :arg filename: template for the full path names where the corrected
+                   pressure should be saved
+    :type filename: string
+
+    :arg p_file: template for the full path names of the uncorrected pressure
+    :type p_file: string
+
+    :arg t_file: template for the full path names of the corresponding
+                 temperature
+    :type t_file: string
+
+    :arg alt_file: full path name of the altitude of the atmospheric model cells
+    :type alt_file: string
+
+    :arg ops: generate files from GRIB2 operational GEM files
+              like :py:func:`generate_pressure_file_ops` rather than
+              from CGRF files like :py:func:`generate_pressure_file`
+    :type ops: boolean
+
+    :arg max_workers: maximum number of worker processes to use to process
+                      days concurrently; the default is to process them
+                      sequentially
+    :type max_workers: int
+
+    :returns: full path names of the corrected pressure files
+    :rtype: list
+    """
+    days = list(arrow.Arrow.range("day", start, end))
+    filenames = [filename.format(day=day) for day in days]
+    p_files = [p_file.format(day=day) for day in days]
+    t_files = [t_file.format(day=day) for day in days]
+    if ops:
+        # The GEM domain is truncated to the same cells for every day
+        alt = _read_height_ops(alt_file, t_files[0])
+        write_pressure_file = _write_pressure_file_ops
+    else:
+        with nc.Dataset(alt_file) as f:
+            alt = f.variables["alt"][:]
+        write_pressure_file = _write_pressure_file
+
+    if max_workers is None or max_workers < 2:
+        for day_filename, day_p_file, day_t_file, day in zip(
+            filenames, p_files, t_files, days
+        ):
+            write_pressure_file(day_filename, day_p_file, day_t_file, alt, day)
+    else:
+        # Send the altitude to each worker once rather than with every day
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_pressure_worker,
+            initargs=(alt,),
+        ) as executor:
+            # Consume the results so that exceptions are raised here
+            list(
+                executor.map(
+                    _pressure_worker,
+                    [write_pressure_file] * len(days),
+                    filenames,
+                    p_files,
+                    t_files,
+                    days,
+                )
+            )
+    return filenames
+
+
+# Altitude of the atmospheric model cells in generate_pressure_files()
+# worker processes, set by _init_pressure_worker()
+_pressure_alt = None
+
+
+def _init_pressure_worker(alt):
+    global _pressure_alt
+    _pressure_alt = alt
+
+
+def _pressure_worker(write_pressure_file, filename, p_file, t_file, day):
+    write_pressure_file(filename, p_file, t_file, _pressure_alt, day)
 
 
 def _slp(Z, P, T):
@@ -802,8 +1110,8 @@ def _truncate_height(alt1, lon1, lat1, lon2, lat2):
             np.abs(lat1 - lat2[0, 0]) < 10 ** (-5),
         )
     )
-    i_st = i[1]
-    j_st = i[0]
+    i_st = i[1].item()
+    j_st = i[0].item()
 
     # top right
     i = np.where(
@@ -813,8 +1121,8 @@ def _truncate_height(alt1, lon1, lat1, lon2, lat2):
         )
     )
 
-    i_ed = i[1]
-    j_ed = i[0]
+    i_ed = i[1].item()
+    j_ed = i[0].item()
 
     h_small = alt1[0, j_st : j_ed + 1, i_st : i_ed + 1]
     lat_small = lat1[j_st : j_ed + 1, i_st : i_ed + 1]
@@ -822,9 +1130,13 @@ def _truncate_height(alt1, lon1, lat1, lon2, lat2):
     return h_small, lon_small, lat_small
 
 
-def combine_subdomain(filenames, outfilename):
+def combine_subdomain(filenames, outfilename, time_chunk=1, max_workers=None):
     """Recombine per-processor subdomain files into one single file.
 
+    The recombination is streamed variable by variable and time chunk by
+    time chunk, so peak memory use is proportional to the full domain size
+    of one time chunk of one variable.
+
     Note: filenames must be an array of files organized to reflect the
     subdomain decomposition. filenames[0,0] is bottom left, filenames[0,-1] is
     bottom right, filenames[-1,0] is top left, filenames[-1,-1] is top right.
@@ -840,19 +1152,42 @@ def combine_subdomain(filenames, outfilename):
 
     :arg outfilename: The name of the file for saving output
     :type outfilename: string
+
+    :arg time_chunk: Number of time steps of each variable to recombine
+                     at a time.
+    :type time_chunk: int
+
+    :arg max_workers: Maximum number of worker processes to use to read
+                      the subdomain files concurrently.
+                      The default is to read the files sequentially.
+    :type max_workers: int
     """
     # Determine shape of each subdomain
     shapes = _define_shapes(filenames)
 
     # Initialize
     new = nc.Dataset(outfilename, "w")
-    _initialize_dimensions(new, nc.Dataset(filenames[0, 0]))
-    newvars = _initialize_variables(new, nc.Dataset(filenames[0, 0]))
+    with nc.Dataset(filenames[0, 0]) as first:
+        _initialize_dimensions(new, first)
+        newvars = _initialize_variables(new, first)
+
+    # Worker processes for concurrent reads of the subdomain files
+    executor = None
+    if max_workers is not None and max_workers > 1:
+        maxopen = getrlimit(RLIMIT_NOFILE)[0] // 5
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_dataset_worker_init,
+            initargs=(list(filenames.flatten()), max(2, maxopen // max_workers)),
+        )
 
     # Build full array
-    _concatentate_variables(filenames, shapes, newvars)
-
-    new.close()
+    try:
+        _concatentate_variables(filenames, shapes, newvars, time_chunk, executor)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        new.close()
 
 
 def _define_shapes(filenames):
@@ -883,9 +1218,9 @@ def _define_shapes(filenames):
         iss = 0
         for i in np.arange(filenames.shape[1]):
             name = filenames[j, i]
-            f = nc.Dataset(name)
-            x = f.dimensions["x"].__len__()
-            y = f.dimensions["y"].__len__()
+            with nc.Dataset(name) as f:
+                x = f.dimensions["x"].__len__()
+                y = f.dimensions["y"].__len__()
             shapes[name] = {}
             shapes[name]["iss"] = iss
             shapes[name]["iee"] = iss + x
@@ -918,6 +1253,8 @@ def _initialize_dimensions(newfile, oldfile):
 
 def _initialize_variables(newfile, oldfile):
     """Initialize new file to have the same variables as oldfile.
+    The values of variables that are not on the horizontal grid are copied;
+    variables on the horizontal grid are filled by _concatentate_variables.
     Used for recombining per-processor subdomain files
 
     :arg newfile: the new netCDF file
@@ -934,15 +1271,18 @@ def _initialize_variables(newfile, oldfile):
         var = oldfile.variables[varname]
         dims = var.dimensions
         newvar = newfile.createVariable(varname, var.datatype, dims)
-        newvar[:] = var[:]
+        if "x" not in dims:
+            newvar[:] = var[:]
         newvars[varname] = newvar
 
     return newvars
 
 
-def _concatentate_variables(filenames, shapes, variables):
+def _concatentate_variables(filenames, shapes, variables, time_chunk=1, executor=None):
     """Concatentate netcdf variables listed in dictionary variables for all of
     the files stored in filenames. Concatentation on horizontal grid.
+    Each variable is assembled and written one chunk of its first (time)
+    dimension at a time.
     Used for recombining per-processor subdomain files
 
     :arg filenames: array of filenames for each piece of subdomain
@@ -953,22 +1293,61 @@ def _concatentate_variables(filenames, shapes, variables):
 
     :arg variables: conatiner for the new variables
     :type variables: dictionary with variable name key and netcdf array value
+
+    :arg time_chunk: number of time steps to concatenate at a time
+    :type time_chunk: int
+
+    :arg executor: worker processes initialized by _dataset_worker_init
+                   to read the subdomain files concurrently,
+                   or None to read them sequentially
+    :type executor: :py:class:`concurrent.futures.ProcessPoolExecutor`
     """
-    for name in filenames.flatten():
-        for varname in variables.keys():
-            newvar = variables[varname]
-            f = nc.Dataset(name)
-            oldvar = f.variables[varname]
-            x1 = shapes[name]["iss"]
-            x2 = shapes[name]["iee"]
-            y1 = shapes[name]["jss"]
-            y2 = shapes[name]["jee"]
-            if "x" in newvar.dimensions:
-                newvar[..., y1:y2, x1:x2] = oldvar[..., :, :]
+    names = list(filenames.flatten())
+    datasets = scDataset.scDatasetManager(names)
+    ny = max(shape["jee"] for shape in shapes.values())
+    nx = max(shape["iee"] for shape in shapes.values())
+    try:
+        for varname, newvar in variables.items():
+            if "x" not in newvar.dimensions:
+                continue
+            # Chunk along the first dimension unless it is on the horizontal grid
+            if newvar.dimensions[0] in ("y", "x"):
+                chunks = [()]
+            else:
+                nt = newvar.shape[0]
+                chunks = [
+                    (slice(t, min(t + time_chunk, nt)),)
+                    for t in range(0, nt, time_chunk)
+                ]
+            for chunk in chunks:
+                key = chunk + (Ellipsis,)
+                if executor is None:
+                    pieces = (
+                        datasets[di].variables[varname][key] for di in range(len(names))
+                    )
+                else:
+                    pieces = executor.map(
+                        _dataset_worker_read,
+                        range(len(names)),
+                        [varname] * len(names),
+                        [key] * len(names),
+                    )
+                block = None
+                for name, piece in zip(names, pieces):
+                    if block is None:
+                        block = np.zeros(piece.shape[:-2] + (ny, nx), newvar.dtype)
+                    x1 = shapes[name]["iss"]
+                    x2 = shapes[name]["iee"]
+                    y1 = shapes[name]["jss"]
+                    y2 = shapes[name]["jee"]
+                    block[..., y1:y2, x1:x2] = piece
+                newvar[chunk + (Ellipsis, slice(0, ny), slice(0, nx))] = block
+    finally:
+        datasets.close()
 
 
 class scDataset(object):
-    def __init__(self, files):
+    def __init__(self, files, max_workers=None, index_file=None, cache_size=None):
         """
         Simple Concatenated Dataset
 
@@ -1000,6 +1379,36 @@ class scDataset(object):
         :arg files: list of netcdf filenames in chronological order
         :type files: list
 
+        :arg max_workers: Maximum number of worker processes to use to read
+                          the per-file pieces of a concatenated variable
+                          concurrently.
+                          The default is to read the files sequentially.
+                          Worker processes are used rather than threads
+                          because the netCDF/HDF5 libraries are not thread-safe.
+                          The open file handle budget of the dataset manager
+                          is shared among the workers.
+        :type max_workers: int
+
+        :arg index_file: Path/filename of a sidecar JSON index of the
+                         time dimension lengths and variable metadata of
+                         the files.
+                         If the index file exists and matches the sizes and
+                         modification times of files, the dataset is
+                         constructed from it without opening any of the files;
+                         they are opened only when their data is requested.
+                         Otherwise, the files are opened to build the index,
+                         and it is written to index_file for next time.
+        :type index_file: :py:class:`pathlib.Path` or str
+
+        :arg cache_size: Maximum number of bytes of decoded per-file blocks
+                         of concatenated variables to keep in a least
+                         recently used cache so that repeated reads of the
+                         same slices do not go back to disk.
+                         Blocks are keyed by variable, file, and slice.
+                         The default is no cache.
+                         Use :py:meth:`cache_info` to get the cache statistics.
+        :type cache_size: int
+
         Example usage:
 
         .. code-block:: python
@@ -1030,44 +1439,121 @@ class scDataset(object):
                t1 = ds.variables['votemper'][29:33:-1,-10:-1,100:130]
                print(t1.shape)
 
+        .. code-block:: python
+
+           # Integer array, boolean and strided indexing also work on the
+           # time axis, with one read per run of regularly spaced times in
+           # each file
+           with scDataset(files) as ds:
+               noon = ds.variables['votemper'][12::24, 0, 100, 100]
+               some = ds.variables['votemper'][[3, 30, 300], 0, 100, 100]
+
+        .. code-block:: python
+
+           # Read a multi-week surface slab using 8 worker processes
+           with scDataset(files, max_workers=8) as ds:
+               sst = ds.variables['votemper'][:, 0, :, :]
+
+        .. code-block:: python
+
+           # Construct the dataset for a year of hourly files without
+           # opening them all, after the first time
+           with scDataset(files, index_file='SalishSea_1h_2019.json') as ds:
+               ssh = ds.variables['sossheig'][:, 100, 100]
+
+        .. code-block:: python
+
+           # Keep up to 1 GB of decoded blocks for repeated reads
+           with scDataset(files, cache_size=2**30) as ds:
+               for j in range(400, 450):
+                   section = ds.variables['votemper'][:, :, j, :]
+               print(ds.cache_info())
+
         """
         # Initialize a dataset manager with the list of files
         self._dsmgr = self.scDatasetManager(files)
 
-        # Open the first dataset and set a few class variables
-        d0 = self._dsmgr[0]
+        # Worker processes for concurrent reads of the per-file pieces of a
+        # request, each with its share of the open file handle budget
+        self._executor = None
+        if max_workers is not None and max_workers > 1:
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_dataset_worker_init,
+                initargs=(files, max(2, self._dsmgr._MAXOPEN // max_workers)),
+            )
+
+        # Least recently used cache of decoded per-file blocks
+        self._cache = None
+        if cache_size:
+            self._cache = self.scBlockCache(cache_size)
+
+        # Get the time dimension sizes and variable metadata from the
+        # sidecar index if we can, otherwise by opening each dataset
+        index = None
+        if index_file is not None:
+            index = _read_scDataset_index(index_file, files)
+        lazy = index is not None
+        if not lazy:
+            index = _build_scDataset_index(self._dsmgr, files)
+            if index_file is not None:
+                with open(index_file, "wt") as f:
+                    json.dump(index, f)
+
+        # Set a few class variables
         #        self.description = d0.description
-        self.file_format = d0.file_format
+        self.file_format = index["file_format"]
         self.filepath = files
 
-        # Find the time dimension name
-        for dim in d0.dimensions:
-            if d0.dimensions[dim].isunlimited():
-                timedimname = dim
-                break
-
-        # Open each dataset, get time dimension size and set the indices fi and li
+        # Set the indices fi and li from the time dimension sizes
+        timedimname = index["time_dim"]
         fi = []  # file (dataset) index
         li = []  # local time index
-        for di in range(len(files)):
-            curlen = self._dsmgr[di].dimensions[timedimname].size
+        for di, curlen in enumerate(index["time_lengths"]):
             fi += [di for x in range(curlen)]
             li += [x for x in range(curlen)]
 
         # First dimension must be unlimited, else use the first dataset
         self.variables = OrderedDict()
-        vars0 = d0.variables
-        for vname in vars0:
-            if vars0[vname].dimensions[0] == timedimname:
+        for vname, meta in index["variables"].items():
+            if meta["dimensions"][:1] == [timedimname]:
                 # We concatenate this variable
+                v0 = _scVariableMeta(
+                    tuple(meta["dimensions"]),
+                    np.dtype(meta["dtype"]),
+                    len(meta["shape"]),
+                    tuple(meta["shape"]),
+                )
                 self.variables[vname] = self.scVariable(
-                    vars0[vname], vname, self._dsmgr, fi, li
+                    v0, vname, self._dsmgr, fi, li, self._executor, self._cache
                 )
+            elif lazy:
+                # Passthrough this variable to the first file when it is used
+                self.variables[vname] = self.scPassthroughVariable(vname, self._dsmgr)
             else:
                 # Passthrough this variable to the first file
-                self.variables[vname] = vars0[vname]
+                self.variables[vname] = self._dsmgr[0].variables[vname]
+
+    def cache_info(self):
+        """Return the decoded block cache statistics.
+
+        :returns: Numbers of cache hits, misses and evictions,
+                  and maximum and current size of the cache in bytes,
+                  or :py:obj:`None` if the dataset has no cache.
+        :rtype: :py:class:`collections.namedtuple`
+        """
+        if self._cache is None:
+            return None
+        return self._cache.info()
+
+    def cache_clear(self):
+        """Empty the decoded block cache and reset its statistics."""
+        if self._cache is not None:
+            self._cache.clear()
 
     def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
         self._dsmgr.close()
 
     def __enter__(self):
@@ -1084,9 +1570,9 @@ class scDataset(object):
         Manages datasets by opening/closing them on demand
         """
 
-        def __init__(self, files):
+        def __init__(self, files, maxopen=None):
             self._files = files
-            self._MAXOPEN = getrlimit(RLIMIT_NOFILE)[0] // 5
+            self._MAXOPEN = maxopen or getrlimit(RLIMIT_NOFILE)[0] // 5
             self._dslist = [(-1, None)] * self._MAXOPEN
 
         def __getitem__(self, di):
@@ -1114,6 +1600,83 @@ class scDataset(object):
                     ds.close()
             self._dslist = []
 
+    class scBlockCache(object):
+        """
+        Least recently used cache of decoded blocks, bounded by their total
+        size in bytes
+        """
+
+        CacheInfo = namedtuple(
+            "CacheInfo", "hits, misses, evictions, maxsize, currsize"
+        )
+
+        def __init__(self, maxsize):
+            self._maxsize = maxsize
+            self.clear()
+
+        def get(self, key):
+            """
+            Return the block stored for key, or None
+            """
+            try:
+                block = self._blocks[key]
+            except KeyError:
+                self._misses += 1
+                return None
+            self._blocks.move_to_end(key)
+            self._hits += 1
+            return block
+
+        def put(self, key, block):
+            """
+            Store block for key, evicting least recently used blocks to make
+            room for it; blocks larger than the cache are not stored
+            """
+            nbytes = self._nbytes(block)
+            if nbytes > self._maxsize or key in self._blocks:
+                return
+            while self._currsize + nbytes > self._maxsize:
+                evicted_key, evicted = self._blocks.popitem(last=False)
+                self._currsize -= self._nbytes(evicted)
+                self._evictions += 1
+            self._blocks[key] = block
+            self._currsize += nbytes
+
+        @staticmethod
+        def _nbytes(block):
+            mask = np.ma.getmask(block)
+            return block.nbytes + (0 if mask is np.ma.nomask else mask.nbytes)
+
+        def info(self):
+            return self.CacheInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                self._maxsize,
+                self._currsize,
+            )
+
+        def clear(self):
+            self._blocks = OrderedDict()
+            self._currsize = 0
+            self._hits = self._misses = self._evictions = 0
+
+    class scPassthroughVariable(object):
+        """
+        Passes through to a variable that is not concatenated, opening the
+        first dataset only when the variable is used
+        """
+
+        def __init__(self, vname, datasets):
+            self.name = vname
+            self.ds = datasets
+
+        def __getitem__(self, items):
+            return self.ds[0].variables[self.name][items]
+
+        def __getattr__(self, attr):
+            return getattr(self.ds[0].variables[self.name], attr)
+
     class scVariable(object):
         """
         Builds a concatenated version of a netCDF Variable type
@@ -1121,10 +1684,12 @@ class scDataset(object):
            shape and dimensions correctly. Attribute handling, etc is not implemented.
         """
 
-        def __init__(self, v0, vname, datasets, fi, li):
+        def __init__(self, v0, vname, datasets, fi, li, executor=None, cache=None):
             self.ds = datasets
-            self._fi = fi
-            self._li = li
+            self._fi = np.asarray(fi, dtype=int)
+            self._li = np.asarray(li, dtype=int)
+            self._executor = executor
+            self._cache = cache
 
             # Set a few class variables
             self.name = vname
@@ -1135,7 +1700,8 @@ class scDataset(object):
 
         def __getitem__(self, initems):
             """
-            Implement Python indexing: int, slice, ellipsis accepted
+            Implement Python indexing: int, slice, ellipsis accepted,
+            and integer array and boolean indexing on the time axis
             """
             # Make the input iterable
             if not isinstance(initems, tuple):
@@ -1155,34 +1721,34 @@ class scDataset(object):
                     break
 
             # Find the time indices
-            ti = items[0]  # global time indices to extract, may be int or slice
-            fi = self._fi[ti]  # index of each file (dataset) to draw from
-            li = self._li[ti]  # local time index for each dataset
+            ti = items[0]  # global time indices to extract, may be int, slice or array
 
             # For single time output (no concatenation), just draw from the right dataset
-            if type(ti) is int or type(ti) is np.int64:
-                if self.ndim == 1:
-                    out = self.ds[fi].variables[self.name][li]
-                if self.ndim == 2:
-                    out = self.ds[fi].variables[self.name][li, items[1]]
-                if self.ndim == 3:
-                    out = self.ds[fi].variables[self.name][li, items[1], items[2]]
-                if self.ndim == 4:
-                    out = self.ds[fi].variables[self.name][
-                        li, items[1], items[2], items[3]
-                    ]
-                return out
+            if isinstance(ti, (int, np.integer)):
+                fi = self._fi[ti]  # index of the file (dataset) to draw from
+                li = self._li[ti]  # local time index in the dataset
+                out = self._read([fi], [(li,) + tuple(items[1:])])[0]
+                # Don't expose cached blocks to modification
+                return out if self._cache is None else out.copy()
+
+            # Resolve slices, integer arrays and boolean arrays to global time
+            # indices, and read each of the distinct indices once, in order
+            tidx = np.arange(self.shape[0])[ti]
+            uniq, inverse = np.unique(tidx, return_inverse=True)
+            fi = self._fi[uniq]  # index of each file (dataset) to draw from
+            li = self._li[uniq]  # local time index for each dataset
 
             # If we need to concatenate, then we need to determine the output
             # array size. This approach is an ugly hack but it works.
             sizo = [1] * self.ndim  # assume one in each dimension
             rdim = []  # list of dimensions to remove
             for ii, item in enumerate(items):
-                if type(item) is int or type(item) is np.int64:
+                if isinstance(item, (int, np.integer)):
                     rdim += [ii]
                 else:  # update output size at this dim if not an integer index
-                    tmp = [None] * self.shape[ii]  # build a dummy array
-                    sizo[ii] = len(tmp[item])  # index the dummy array, record length
+                    tmp = np.empty(self.shape[ii], bool)  # build a dummy array
+                    sizo[ii] = tmp[item].size  # index the dummy array, record length
+            sizo[0] = uniq.size
             out = np.zeros(
                 sizo, self.dtype
             )  # allocate output array with matching data type
@@ -1190,20 +1756,230 @@ class scDataset(object):
                 out, axis=tuple(rdim)
             )  # remove unwanted singleton dimensions
 
-            # Now we read each time index sequentially and fill the output array
-            for ii in range(len(fi)):
-                if self.ndim == 1:
-                    out[ii] = self.ds[fi[ii]].variables[self.name][li[ii]]
-                if self.ndim == 2:
-                    out[ii, ...] = self.ds[fi[ii]].variables[self.name][
-                        li[ii], items[1]
-                    ]
-                if self.ndim == 3:
-                    out[ii, ...] = self.ds[fi[ii]].variables[self.name][
-                        li[ii], items[1], items[2]
-                    ]
-                if self.ndim == 4:
-                    out[ii, ...] = self.ds[fi[ii]].variables[self.name][
-                        li[ii], items[1], items[2], items[3]
-                    ]
+            # Now we read each run of regularly spaced time indices from a file
+            # with a single sliced read and fill the output array
+            runs = list(_time_runs(fi, li))
+            pieces = self._read(
+                [di for di, local, outslc in runs],
+                [(local,) + tuple(items[1:]) for di, local, outslc in runs],
+            )
+            for (di, local, outslc), piece in zip(runs, pieces):
+                out[outslc, ...] = piece
+
+            # Put the distinct time indices in the requested order,
+            # with repeats
+            if uniq.size != tidx.size or np.any(uniq != tidx):
+                out = out[inverse.ravel()]
             return out
+
+        def _read(self, dis, keys):
+            """
+            Read the pieces of the variable given by index expressions keys
+            from the files with indices dis, from the block cache if we have
+            one, and concurrently if we have worker processes
+            """
+            pieces = [None] * len(keys)
+            missing = []
+            for n, (di, key) in enumerate(zip(dis, keys)):
+                if self._cache is not None:
+                    pieces[n] = self._cache.get((self.name, di, _hashable_key(key)))
+                if pieces[n] is None:
+                    missing.append(n)
+            if self._executor is None or len(missing) < 2:
+                values = (
+                    self.ds[dis[n]].variables[self.name][keys[n]] for n in missing
+                )
+            else:
+                values = self._executor.map(
+                    _dataset_worker_read,
+                    [dis[n] for n in missing],
+                    [self.name] * len(missing),
+                    [keys[n] for n in missing],
+                )
+            for n, value in zip(missing, values):
+                pieces[n] = value
+                if self._cache is not None:
+                    self._cache.put((self.name, dis[n], _hashable_key(keys[n])), value)
+            return pieces
+
+
+# Metadata that scDataset.scVariable needs about a concatenated variable
+_scVariableMeta = namedtuple("_scVariableMeta", "dimensions, dtype, ndim, shape")
+
+
+def _build_scDataset_index(datasets, files):
+    """Build an :py:class:`scDataset` index of the time dimension lengths
+    and variable metadata of files by opening each of them.
+
+    :arg datasets: Dataset manager for files.
+    :type datasets: :py:class:`scDataset.scDatasetManager`
+
+    :arg files: list of netcdf filenames in chronological order
+    :type files: list
+
+    :returns: Index that can be serialized to JSON.
+    :rtype: dict
+    """
+    d0 = datasets[0]
+
+    # Find the time dimension name
+    for dim in d0.dimensions:
+        if d0.dimensions[dim].isunlimited():
+            timedimname = dim
+            break
+
+    index = {
+        "files": [_scDataset_file_stat(filename) for filename in files],
+        "file_format": d0.file_format,
+        "time_dim": timedimname,
+        "time_lengths": [],
+        "variables": {},
+    }
+    for vname, var in d0.variables.items():
+        index["variables"][vname] = {
+            "dimensions": list(var.dimensions),
+            "dtype": np.dtype(var.dtype).str,
+            "shape": list(var.shape),
+        }
+    for di in range(len(files)):
+        index["time_lengths"].append(datasets[di].dimensions[timedimname].size)
+    return index
+
+
+def _read_scDataset_index(index_file, files):
+    """Read an :py:class:`scDataset` index from a sidecar JSON file.
+
+    :arg index_file: Path/filename of the index file.
+    :type index_file: :py:class:`pathlib.Path` or str
+
+    :arg files: list of netcdf filenames in chronological order
+    :type files: list
+
+    :returns: Index, or :py:obj:`None` if the index file does not exist
+              or does not match the current files.
+    :rtype: dict
+    """
+    try:
+        with open(index_file, "rt") as f:
+            index = json.load(f)
+    except (IOError, ValueError):
+        return None
+    try:
+        stats = [_scDataset_file_stat(filename) for filename in files]
+    except OSError:
+        return None
+    if index.get("files") != stats:
+        return None
+    return index
+
+
+def _scDataset_file_stat(filename):
+    """Return the path, size and modification time of a file that an
+    :py:class:`scDataset` index uses to detect changed files.
+
+    :arg filename: Path/filename of the file.
+    :type filename: :py:class:`pathlib.Path` or str
+
+    :rtype: dict
+    """
+    stat = os.stat(filename)
+    return {
+        "path": os.path.abspath(filename),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+    }
+
+
+# Dataset manager of a dataset reading worker process
+_dataset_worker_datasets = None
+
+
+def _dataset_worker_init(files, maxopen):
+    """Initialize a worker process that reads pieces of variables from
+    files for :py:class:`scDataset` or :py:func:`combine_subdomain`
+    with its own dataset manager.
+
+    :arg files: list of netcdf filenames in chronological order
+    :type files: list
+
+    :arg maxopen: Maximum number of files the worker may hold open.
+    :type maxopen: int
+    """
+    global _dataset_worker_datasets
+    _dataset_worker_datasets = scDataset.scDatasetManager(files, maxopen)
+
+
+def _dataset_worker_read(di, vname, key):
+    """Read a piece of a variable from one file in a dataset reading
+    worker process.
+
+    :arg di: File (dataset) index.
+    :type di: int
+
+    :arg vname: Variable name.
+    :type vname: str
+
+    :arg key: Index expression to read the piece of the variable with.
+    :type key: tuple
+
+    :returns: Values read from the file.
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    return _dataset_worker_datasets[di].variables[vname][key]
+
+
+def _hashable_key(key):
+    """Convert an index expression into a hashable equivalent for use as
+    an :py:class:`scDataset` block cache key.
+
+    :arg key: Index expression of ints, slices and integer arrays.
+    :type key: tuple
+
+    :rtype: tuple
+    """
+    hashable = []
+    for item in key:
+        if isinstance(item, slice):
+            hashable.append(("slice", item.start, item.stop, item.step))
+        elif isinstance(item, (int, np.integer)):
+            hashable.append(int(item))
+        else:
+            item = np.asarray(item)
+            hashable.append(("array", item.dtype.str, item.shape, item.tobytes()))
+    return tuple(hashable)
+
+
+def _time_runs(fi, li):
+    """Group the per-time-index file and local time indices of a
+    concatenated variable read into runs that can each be read from a
+    single file with one sliced read.
+
+    Runs are regularly spaced, increasing local time indices in a file,
+    so strided reads are coalesced as well as contiguous ones.
+
+    Used by :py:class:`scDataset.scVariable` to coalesce multi-time reads.
+
+    :arg fi: File (dataset) index for each output time index.
+    :type fi: :py:class:`numpy.ndarray`
+
+    :arg li: Local time index within its file for each output time index.
+    :type li: :py:class:`numpy.ndarray`
+
+    :returns: Iterator of 3-tuples of file index, local time index slice,
+              and output time index slice.
+    """
+    start = 0
+    while start < len(fi):
+        stop = start + 1
+        step = 1
+        if stop < len(fi) and fi[stop] == fi[start] and li[stop] > li[start]:
+            step = li[stop] - li[start]
+            while (
+                stop < len(fi)
+                and fi[stop] == fi[start]
+                and li[stop] - li[stop - 1] == step
+            ):
+                stop += 1
+        local = slice(li[start], li[stop - 1] + 1, step if step > 1 else None)
+        yield fi[start], local, slice(start, stop)
+        start = stop
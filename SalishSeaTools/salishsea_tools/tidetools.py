@@ -19,10 +19,13 @@ Salish Sea NEMO model
 
 import cmath
 import collections
-import csv
+import contextlib
 import datetime
+import functools
 import os
-from math import radians, cos, sqrt, pi
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from math import pi
 
 import angles
 import matplotlib.pyplot as plt
@@ -32,6 +35,7 @@ import pandas as pd
 import pytz
 import requests
 from dateutil import tz
+from scipy.ndimage import correlate1d
 from scipy.optimize import curve_fit
 
 from salishsea_tools import (
@@ -57,38 +61,137 @@ CorrTides = {
 }
 
 
-def get_all_perm_dfo_wlev(start_date, end_date):
+# Base URL of the DFO water level data web service used by get_dfo_wlev()
+DFO_WLEV_URL = (
+    "https://www.meds-sdmm.dfo-mpo.gc.ca/isdm-gdsi/twl-mne/inventory-inventaire/"
+)
+
+# Permanent DFO water level sites
+DFO_PERM_WLEV_STATIONS = {
+    "Point Atkinson": 7795,
+    "Vancouver": 7735,
+    "Patricia Bay": 7277,
+    "Victoria Harbour": 7120,
+    "Bamfield": 8545,
+    "Tofino": 8615,
+    "Winter Harbour": 8735,
+    "Port Hardy": 8408,
+    "Campbell River": 8074,
+    "New Westminster": 7654,
+}
+
+
+def get_all_perm_dfo_wlev(
+    start_date, end_date, cache_dir=None, max_workers=None, base_url=DFO_WLEV_URL
+):
     """Get water level data for all permanent DFO water level sites
     for specified period.
 
+    The sites are downloaded concurrently by :py:func:`get_dfo_wlevs`.
+
     :arg start_date: Start date; e.g. '01-JAN-2010'.
     :type start_date: str
 
     :arg end_date: End date; e.g. '31-JAN-2010'
     :type end_date: str
 
-    :returns: Saves text files with water level data at each site
+    :arg cache_dir: Directory of the local cache of downloaded files;
+                    see :py:func:`get_dfo_wlev`.
+    :type cache_dir: str
+
+    :arg max_workers: Maximum number of concurrent downloads;
+                      defaults to one per site.
+    :type max_workers: int
+
+    :arg base_url: Base URL of the DFO water level data web service.
+    :type base_url: str
+
+    :returns: Saves text files with water level data at each site,
+              and returns a dict of their file names keyed by site name
     """
-    stations = {
-        "Point Atkinson": 7795,
-        "Vancouver": 7735,
-        "Patricia Bay": 7277,
-        "Victoria Harbour": 7120,
-        "Bamfield": 8545,
-        "Tofino": 8615,
-        "Winter Harbour": 8735,
-        "Port Hardy": 8408,
-        "Campbell River": 8074,
-        "New Westminster": 7654,
-    }
-    for ttt in stations:
-        get_dfo_wlev(stations[ttt], start_date, end_date)
+    downloads = [
+        (station_no, start_date, end_date)
+        for station_no in DFO_PERM_WLEV_STATIONS.values()
+    ]
+    outfiles = get_dfo_wlevs(
+        downloads,
+        cache_dir=cache_dir,
+        max_workers=max_workers or len(downloads),
+        base_url=base_url,
+    )
+    return dict(zip(DFO_PERM_WLEV_STATIONS, outfiles))
+
+
+def get_dfo_wlevs(downloads, cache_dir=None, max_workers=8, base_url=DFO_WLEV_URL):
+    """Download water level data from DFO site for several stations
+    and/or periods concurrently.
 
+    Each download is a stateful form POST followed by a GET,
+    so each one has its own :py:class:`requests.Session`;
+    the sessions share a connection pool,
+    so connections to the DFO site are reused.
+    Downloads that are already in the cache_dir do not access the network.
 
-def get_dfo_wlev(station_no, start_date, end_date):
+    :arg downloads: Station number, start date, and end date of each download;
+                    e.g. [(7795, '01-JAN-2010', '31-JAN-2010'),
+                    (7795, '01-FEB-2010', '28-FEB-2010')].
+    :type downloads: iterable of 3-tuples
+
+    :arg cache_dir: Directory of the local cache of downloaded files;
+                    see :py:func:`get_dfo_wlev`.
+    :type cache_dir: str
+
+    :arg max_workers: Maximum number of concurrent downloads.
+    :type max_workers: int
+
+    :arg base_url: Base URL of the DFO water level data web service.
+    :type base_url: str
+
+    :returns: File names of the downloaded data, in the order of downloads
+    :rtype: list
+    """
+    # Sessions are not thread-safe, and the DFO site keeps the station of
+    # each download in the session, but the connection pool of an adapter
+    # can be shared
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+
+    def download(station_no, start_date, end_date):
+        session = requests.Session()
+        session.mount(base_url, adapter)
+        return get_dfo_wlev(
+            station_no,
+            start_date,
+            end_date,
+            session=session,
+            cache_dir=cache_dir,
+            base_url=base_url,
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(download, *args) for args in downloads]
+            return [future.result() for future in futures]
+    finally:
+        adapter.close()
+
+
+def get_dfo_wlev(
+    station_no,
+    start_date,
+    end_date,
+    session=None,
+    cache_dir=None,
+    base_url=DFO_WLEV_URL,
+):
     """Download water level data from DFO site for one DFO station
     for specified period.
 
+    If cache_dir is given, the data file is saved in that directory instead
+    of the current directory, and if it is already there, it is used without
+    accessing the network.
+    Cache files are keyed by station number and period, and are only
+    written once the download is complete.
+
     :arg station_no: Station number e.g. 7795.
     :type station_no: int
 
@@ -98,14 +201,26 @@ def get_dfo_wlev(station_no, start_date, end_date):
     :arg end_date: End date; e.g. '31-JAN-2010'
     :type end_date: str
 
-    :returns: Saves text file with water level data at one station
+    :arg session: Session to use for the requests to the DFO site;
+                  defaults to a new session.
+    :type session: :py:class:`requests.Session`
+
+    :arg cache_dir: Directory of the local cache of downloaded files.
+    :type cache_dir: str
+
+    :arg base_url: Base URL of the DFO water level data web service.
+    :type base_url: str
+
+    :returns: Saves text file with water level data at one station,
+              and returns its file name
     """
     # Name the output file
     outfile = "wlev_" + str(station_no) + "_" + start_date + "_" + end_date + ".csv"
+    if cache_dir is not None:
+        outfile = os.path.join(cache_dir, outfile)
+        if os.path.exists(outfile):
+            return outfile
     # Form urls and html information
-    base_url = (
-        "https://www.meds-sdmm.dfo-mpo.gc.ca/isdm-gdsi/twl-mne/inventory-inventaire/"
-    )
     form_handler = "data-donnees-eng.asp?user=isdm-gdsi&region=PAC&tst=1&no=" + str(
         station_no
     )
@@ -125,12 +240,27 @@ def get_dfo_wlev(station_no, start_date, end_date):
         "&Name=" + str(station_no) + "-" + start_date + "_slev.csv"
     )
     # Go get the data from the DFO site
-    with requests.Session() as s:
-        s.post(base_url + form_handler, data=sitedata)
+    if session is None:
+        session_context = requests.Session()
+    else:
+        session_context = contextlib.nullcontext(session)
+    with session_context as s:
+        s.post(base_url + form_handler, data=sitedata).raise_for_status()
         r = s.get(base_url + data_provider)
+        r.raise_for_status()
     # Write the data to a text file
-    with open(outfile, "w") as f:
-        f.write(r.text)
+    if cache_dir is None:
+        with open(outfile, "w") as f:
+            f.write(r.text)
+    else:
+        # Write to a temporary file first so that incomplete files never
+        # appear in the cache
+        os.makedirs(cache_dir, exist_ok=True)
+        tmpfile = "{}.{}.{}.tmp".format(outfile, os.getpid(), threading.get_ident())
+        with open(tmpfile, "w") as f:
+            f.write(r.text)
+        os.replace(tmpfile, outfile)
+    return outfile
 
 
 def dateParserMeasured(s):
@@ -390,41 +520,61 @@ def find_model_level(depth, model_depths, fractional=False):
     If depth is greater than the max depth the lowest level is returned.
     A python index is returned (count starting at 0). Add 1 for Fortran.
 
-    :arg depth: The specified depth
-    :type depth: float > 0
+    depth may also be an array of depths (e.g. a whole profile or
+    observation table); their levels are all found with a single
+    :py:func:`numpy.searchsorted` call.
+
+    :arg depth: The specified depth(s)
+    :type depth: float > 0 or numpy array
 
     :arg model_depths: array of model depths
-    :type model_depths: numpy array (one dimensional)
+    :type model_depths: numpy array (one dimensional, increasing)
 
     :arg fractional: a flag that specifies if a fractional model level
                      is desired
     :type fractional: boolean
 
-    :returns: idx, the model level index
+    :returns: idx, the model level index(es), with the same shape as depth.
+              For a scalar depth, a fractional index is only a float if it
+              is between model levels; an array of fractional indexes is
+              always a float array.
     """
-
-    # index for closest value
-    idx = (np.abs(depth - model_depths)).argmin()
+    depth = np.asarray(depth, dtype=float)
+    model_depths = np.asarray(model_depths, dtype=float)
+    nlevels = model_depths.shape[0]
+
+    # index for closest value; the shallower level in case of a tie
+    above = np.clip(np.searchsorted(model_depths, depth) - 1, 0, nlevels - 1)
+    below = np.minimum(above + 1, nlevels - 1)
+    idx = np.where(
+        np.abs(depth - model_depths[below]) < np.abs(depth - model_depths[above]),
+        below,
+        above,
+    )
 
     # If a fractional index is requried...
     if fractional:
-        sign = np.sign(depth - model_depths[idx])
-        idxpm = idx + sign * 1
-        # Check not to go out of bounds
-        if idxpm < model_depths.shape[0] and idxpm >= 0:
+        sign = np.sign(depth - model_depths[idx]).astype(int)
+        idxpm = idx + sign
+        in_bounds = (sign != 0) & (idxpm >= 0) & (idxpm < nlevels)
+        idxpm_depths = model_depths[np.clip(idxpm, 0, nlevels - 1)]
+        # If idxpm < 0 then we are between z=0 and depth of first gridcell;
+        # assume z=0 correspons to idx = -model_depths[0]
+        surface = idxpm < 0
+        idxpm = np.where(surface, -model_depths[0], idxpm)
+        idxpm_depths = np.where(surface, 0, idxpm_depths)
+        with np.errstate(divide="ignore", invalid="ignore"):
             m = (
                 (idx - idxpm)
-                / (model_depths[idx] - model_depths[idxpm])
+                / (model_depths[idx] - idxpm_depths)
                 * (depth - model_depths[idx])
             )
-            idx = m + idx
-        # If idxpm < 0 then we are between z=0 and depth of first gridcell
-        if idxpm < 0:
-            # assume z=0 correspons to idx = -model_depths[0]
-            idxpm = -model_depths[0]
-            m = (idx - idxpm) / (model_depths[idx] - 0) * (depth - model_depths[idx])
-            idx = m + idx
-    return idx
+        interpolated = in_bounds | surface
+        if idx.ndim == 0 and not interpolated:
+            # A scalar depth at or beyond a model level gets an integer index
+            return idx[()]
+        idx = np.where(interpolated, m + idx, idx)
+    return idx[()]
 
 
 def find_closest_model_point(
@@ -717,10 +867,158 @@ def plot_diffs_on_domain(
     return fig
 
 
+# Columns of the differences between measured and modelled water level
+# harmonics calculated by wlev_harm_diffs()
+WLEV_HARM_DIFFS_COLUMNS = [
+    "Station Number",
+    "Station Name",
+    "Longitude",
+    "Latitude",
+    "Modelled M2 amp",
+    "Observed M2 amp",
+    "Modelled M2 phase",
+    "Observed M2 phase",
+    "M2 Difference Foreman",
+    "M2 Difference Masson",
+    "Modelled K1 amp",
+    "Observed K1 amp",
+    "Modelled K1 phase",
+    "Observed K1 phase",
+    "K1 Difference Foreman",
+    "K1 Difference Masson",
+]
+
+
+def read_meas_wl_harm(filename="obs_tidal_wlev_const_all.csv"):
+    """Read the measured water level harmonics from Foreman et al (1995)
+    and US sites.
+
+    :arg filename: Filename to read.
+    :type filename: str
+
+    :returns: meas_wl_harm
+    :rtype: :py:class:`pandas.DataFrame`
+    """
+    meas_wl_harm = pd.read_csv(filename, sep=";")
+    meas_wl_harm = meas_wl_harm.rename(
+        columns={
+            "M2 amp": "M2_amp",
+            "M2 phase (deg UT)": "M2_pha",
+            "K1 amp": "K1_amp",
+            "K1 phase (deg UT)": "K1_pha",
+        }
+    )
+    return meas_wl_harm
+
+
+def wlev_harm_diffs(
+    meas_wl_harm,
+    mod_M2_amp,
+    mod_K1_amp,
+    mod_M2_pha,
+    mod_K1_pha,
+    X,
+    Y,
+    land_mask=None,
+    points=None,
+):
+    """Calculate differences between measured and modelled water level
+    harmonics at all of the measurement stations at once.
+
+    The model grid points of all of the stations are found with one
+    :py:func:`geo_tools.find_closest_model_points` query
+    and the modelled harmonics are gathered with fancy indexing.
+    For repeated comparisons (e.g. of many model runs),
+    the grid points can be calculated once and passed in as points.
+
+    Station numbers start at 1.
+    Modelled values and differences are NaN for stations for which no model
+    point is found.
+
+    :arg meas_wl_harm: Measured harmonics, as returned by
+                       :py:func:`read_meas_wl_harm`.
+    :type meas_wl_harm: :py:class:`pandas.DataFrame`
+
+    :arg mod_M2_amp: Modelled M2 amplitude [m]
+    :type mod_M2_amp: :py:class:`numpy.ndarray`
+
+    :arg mod_K1_amp: Modelled K1 amplitude [m]
+    :type mod_K1_amp: :py:class:`numpy.ndarray`
+
+    :arg mod_M2_pha: Modelled M2 phase [degrees]
+    :type mod_M2_pha: :py:class:`numpy.ndarray`
+
+    :arg mod_K1_pha: Modelled K1 phase [degrees]
+    :type mod_K1_pha: :py:class:`numpy.ndarray`
+
+    :arg X: Model grid longitudes
+    :type X: :py:class:`numpy.ndarray`
+
+    :arg Y: Model grid latitudes
+    :type Y: :py:class:`numpy.ndarray`
+
+    :arg land_mask: Model grid land mask; e.g. bathy.mask
+    :type land_mask: :py:class:`numpy.ndarray`
+
+    :arg points: Model grid y and x indices of the stations from a previous
+                 :py:func:`geo_tools.find_closest_model_points` call.
+    :type points: 2-tuple of :py:class:`numpy.ndarray`
+
+    :returns: Differences between measured and modelled harmonics with
+              WLEV_HARM_DIFFS_COLUMNS columns
+    :rtype: :py:class:`pandas.DataFrame`
+    """
+    lons = -meas_wl_harm.Lon.to_numpy(dtype=float)
+    lats = meas_wl_harm.Lat.to_numpy(dtype=float)
+    if points is None:
+        points = geo_tools.find_closest_model_points(
+            lons, lats, X, Y, land_mask=land_mask
+        )
+    j, i = points
+    found = ~np.isnan(j)
+    j, i = j[found].astype(int), i[found].astype(int)
+
+    diffs = {
+        "Station Number": np.arange(1, lons.size + 1),
+        "Station Name": meas_wl_harm.Site.to_numpy(),
+        "Longitude": lons,
+        "Latitude": lats,
+    }
+    for const, mod_amp, mod_pha in (
+        ("M2", mod_M2_amp, mod_M2_pha),
+        ("K1", mod_K1_amp, mod_K1_pha),
+    ):
+        # Observed constituents
+        Ao = meas_wl_harm[const + "_amp"].to_numpy(dtype=float) / 100  # [m]
+        go = meas_wl_harm[const + "_pha"].to_numpy(dtype=float)  # [degrees UTC]
+        # Modelled constituents
+        Am = np.full(lons.size, np.nan)
+        gm = np.full(lons.size, np.nan)
+        Am[found] = np.ma.filled(np.ma.asarray(mod_amp)[j, i], np.nan)  # [m]
+        gm[found] = np.mod(np.ma.filled(np.ma.asarray(mod_pha)[j, i], np.nan), 360)
+        # Calculate differences two ways
+        go_rad, gm_rad = np.radians(go), np.radians(gm)
+        diffs["Modelled {} amp".format(const)] = Am
+        diffs["Observed {} amp".format(const)] = Ao
+        diffs["Modelled {} phase".format(const)] = gm
+        diffs["Observed {} phase".format(const)] = go
+        diffs["{} Difference Foreman".format(const)] = np.hypot(
+            Ao * np.cos(go_rad) - Am * np.cos(gm_rad),
+            Ao * np.sin(go_rad) - Am * np.sin(gm_rad),
+        )
+        diffs["{} Difference Masson".format(const)] = np.sqrt(
+            0.5 * (Am**2 + Ao**2) - Am * Ao * np.cos(gm_rad - go_rad)
+        )
+    return pd.DataFrame(diffs, columns=WLEV_HARM_DIFFS_COLUMNS)
+
+
 def calc_diffs_meas_mod(runname, loc, grid):
     """Calculate differences between measured and modelled water level
     e.g. (meas_wl_harm, Am_M2_all, Ao_M2_all, gm_M2_all, go_M2_all, D_F95_M2_all, D_M04_M2_all,Am_K1_all, Ao_K1_all, gm_K1_all, go_K1_all, D_F95_K1_all, D_M04_K1_all = calc_diffs_meas_mod('50s_13Sep-20Sep')
 
+    The differences are calculated by :py:func:`wlev_harm_diffs`,
+    which returns them as a :py:class:`pandas.DataFrame`.
+
     :arg runname: name of model run
     :type runname: str
 
@@ -729,155 +1027,49 @@ def calc_diffs_meas_mod(runname, loc, grid):
               go_K1_all, D_F95_K1_all, D_M04_K1_all
     """
     # Read in the measured data from Foreman et al (1995) and US sites
-    meas_wl_harm = pd.read_csv("obs_tidal_wlev_const_all.csv", sep=";")
-    meas_wl_harm = meas_wl_harm.rename(
-        columns={
-            "M2 amp": "M2_amp",
-            "M2 phase (deg UT)": "M2_pha",
-            "K1 amp": "K1_amp",
-            "K1 phase (deg UT)": "K1_pha",
-        }
-    )
+    meas_wl_harm = read_meas_wl_harm("obs_tidal_wlev_const_all.csv")
     # Make an appropriately named csv file for results
     outfile = "wlev_harm_diffs_" + "".join(runname) + ".csv"
-    D_F95_M2_all = []
-    D_M04_M2_all = []
-    Am_M2_all = []
-    Ao_M2_all = []
-    gm_M2_all = []
-    go_M2_all = []
-
-    D_F95_K1_all = []
-    D_M04_K1_all = []
-    Am_K1_all = []
-    Ao_K1_all = []
-    gm_K1_all = []
-    go_K1_all = []
     # Get harmonics data
     mod_M2_amp, mod_K1_amp, mod_M2_pha, mod_K1_pha = get_amp_phase_data(runname, loc)
     # Get bathy data
     bathy, X, Y = get_bathy_data(grid)
-    with open(outfile, "wb") as csvfile:
-        writer = csv.writer(csvfile, delimiter=",")
-        writer.writerow(
-            [
-                "Station Number",
-                "Station Name",
-                "Longitude",
-                "Latitude",
-                "Modelled M2 amp",
-                "Observed M2 amp",
-                "Modelled M2 phase",
-                "Observed M2 phase",
-                "M2 Difference Foreman",
-                "M2 Difference Masson",
-                "Modelled K1 amp",
-                "Observed K1 amp",
-                "Modelled K1 phase",
-                "Observed K1 phase",
-                "K1 Difference Foreman",
-                "K1 Difference Masson",
-            ]
-        )
-        for t in np.arange(0, len(meas_wl_harm.Lat)):
-            x1, y1 = geo_tools.find_closest_model_point(
-                -meas_wl_harm.Lon[t], meas_wl_harm.Lat[t], X, Y, land_mask=bathy.mask
-            )
-            if x1:
-                # Observed constituents
-                Ao_M2 = meas_wl_harm.M2_amp[t] / 100  # [m]
-                go_M2 = meas_wl_harm.M2_pha[t]  # [degrees UTC]
-                Ao_K1 = meas_wl_harm.K1_amp[t] / 100  # [m]
-                go_K1 = meas_wl_harm.K1_pha[t]  # [degrees UTC]
-                # Modelled constituents
-                Am_M2 = mod_M2_amp[x1, y1]  # [m]
-                gm_M2 = angles.normalize(mod_M2_pha[x1, y1], 0, 360)  # [degrees ????]
-                Am_K1 = mod_K1_amp[x1, y1]  # [m]
-                gm_K1 = angles.normalize(mod_K1_pha[x1, y1], 0, 360)  # [degrees ????]
-                # Calculate differences two ways
-                D_F95_M2 = sqrt(
-                    (Ao_M2 * np.cos(radians(go_M2)) - Am_M2 * np.cos(radians(gm_M2)))
-                    ** 2
-                    + (Ao_M2 * np.sin(radians(go_M2)) - Am_M2 * np.sin(radians(gm_M2)))
-                    ** 2
-                )
-                D_M04_M2 = sqrt(
-                    0.5 * (Am_M2**2 + Ao_M2**2)
-                    - Am_M2 * Ao_M2 * cos(radians(gm_M2 - go_M2))
-                )
-                D_F95_K1 = sqrt(
-                    (Ao_K1 * np.cos(radians(go_K1)) - Am_K1 * np.cos(radians(gm_K1)))
-                    ** 2
-                    + (Ao_K1 * np.sin(radians(go_K1)) - Am_K1 * np.sin(radians(gm_K1)))
-                    ** 2
-                )
-                D_M04_K1 = sqrt(
-                    0.5 * (Am_K1**2 + Ao_K1**2)
-                    - Am_K1 * Ao_K1 * cos(radians(gm_K1 - go_K1))
-                )
-                # Write results to csv
-                writer.writerow(
-                    [
-                        str(t + 1),
-                        meas_wl_harm.Site[t],
-                        -meas_wl_harm.Lon[t],
-                        meas_wl_harm.Lat[t],
-                        Am_M2,
-                        Ao_M2,
-                        gm_M2,
-                        go_M2,
-                        D_F95_M2,
-                        D_M04_M2,
-                        Am_K1,
-                        Ao_K1,
-                        gm_K1,
-                        go_K1,
-                        D_F95_K1,
-                        D_M04_K1,
-                    ]
-                )
-                # Append the latest result
-                Am_M2_all.append(float(Am_M2))
-                Ao_M2_all.append(float(Ao_M2))
-                gm_M2_all.append(float(gm_M2))
-                go_M2_all.append(float(go_M2))
-                D_F95_M2_all.append(float(D_F95_M2))
-                D_M04_M2_all.append(float(D_M04_M2))
-                Am_K1_all.append(float(Am_K1))
-                Ao_K1_all.append(float(Ao_K1))
-                gm_K1_all.append(float(gm_K1))
-                go_K1_all.append(float(go_K1))
-                D_F95_K1_all.append(float(D_F95_K1))
-                D_M04_K1_all.append(float(D_M04_K1))
-            else:
-                # If no point found, fill difference fields with 9999
-                print(
-                    "No point found in current domain for station " + str(t + 1) + " :("
-                )
-                writer.writerow(
-                    [
-                        str(t + 1),
-                        meas_wl_harm.Site[t],
-                        -meas_wl_harm.Lon[t],
-                        meas_wl_harm.Lat[t],
-                        9999,
-                        9999,
-                    ]
-                )
-    return (
+    diffs = wlev_harm_diffs(
         meas_wl_harm,
-        Am_M2_all,
-        Ao_M2_all,
-        gm_M2_all,
-        go_M2_all,
-        D_F95_M2_all,
-        D_M04_M2_all,
-        Am_K1_all,
-        Ao_K1_all,
-        gm_K1_all,
-        go_K1_all,
-        D_F95_K1_all,
-        D_M04_K1_all,
+        mod_M2_amp,
+        mod_K1_amp,
+        mod_M2_pha,
+        mod_K1_pha,
+        X,
+        Y,
+        land_mask=bathy.mask,
+    )
+    found = diffs["Modelled M2 amp"].notna()
+    for station_no in diffs["Station Number"][~found]:
+        print("No point found in current domain for station " + str(station_no) + " :(")
+    # Write results to csv;
+    # if no point found, fill difference fields with 9999
+    csv_diffs = diffs.astype({column: object for column in diffs.columns[4:]})
+    csv_diffs.loc[~found, diffs.columns[4:]] = None
+    csv_diffs.loc[~found, diffs.columns[4:6]] = 9999
+    csv_diffs.to_csv(outfile, index=False)
+    found_diffs = diffs[found]
+    return (meas_wl_harm,) + tuple(
+        found_diffs[column].tolist()
+        for column in (
+            "Modelled M2 amp",
+            "Observed M2 amp",
+            "Modelled M2 phase",
+            "Observed M2 phase",
+            "M2 Difference Foreman",
+            "M2 Difference Masson",
+            "Modelled K1 amp",
+            "Observed K1 amp",
+            "Modelled K1 phase",
+            "Observed K1 phase",
+            "K1 Difference Foreman",
+            "K1 Difference Masson",
+        )
     )
 
 
@@ -1205,6 +1397,98 @@ def get_composite_harms2():
     return mod_M2_amp, mod_K1_amp, mod_M2_pha, mod_K1_pha
 
 
+def composite_harmonics(
+    runnames, loc, variables, filename="Tidal_Harmonics_eta.nc", chunk_size=None
+):
+    """Combine harmonics variables from the specified runs into
+    run-length weighted means for a 'composite' run.
+
+    The runs to be 'composed' must all have the same model setup.
+    The weighted means are accumulated in place, one run and, optionally,
+    one chunk of rows at a time, so memory use is that of the results plus
+    one chunk.
+
+    The results are cached, keyed by the run list, location, file name and
+    variables, so repeated comparisons of the same runs do not reload the
+    files.
+    The cached data and masks are shared by the results of each call and
+    are read-only;
+    use :py:func:`composite_harmonics.cache_clear` to clear the cache after
+    re-running a model run.
+
+    :arg runnames: Names of the model runs to process;
+                   e.g. ('40d', '41d50d', '51d60d').
+    :type runnames: tuple
+
+    :arg loc: Location of results folder;
+              e.g. /ocean/dlatorne/MEOPAR/SalishSea/results
+    :type loc: str
+
+    :arg variables: Names of the harmonics variables to combine;
+                    e.g. ('M2_eta_real', 'M2_eta_imag').
+    :type variables: tuple
+
+    :arg filename: Name of the harmonics file in each run's results folder.
+    :type filename: str
+
+    :arg chunk_size: Number of rows (y values) to read at a time;
+                     defaults to the whole domain.
+    :type chunk_size: int
+
+    :returns: Weighted mean of each variable.
+    :rtype: dict of :py:class:`numpy.ma.MaskedArray`
+    """
+    results = _composite_harmonics(
+        tuple(runnames), loc, tuple(variables), filename, chunk_size
+    )
+    # New masked arrays that share the cached read-only data and masks,
+    # so callers cannot change what later callers get
+    return {
+        var: np.ma.masked_array(data, mask=mask)
+        for var, (data, mask) in results.items()
+    }
+
+
+@functools.lru_cache(maxsize=8)
+def _composite_harmonics(runnames, loc, variables, filename, chunk_size):
+    runlengths = [get_run_length(runname, loc) for runname in runnames]
+    totaldays = sum(runlengths)
+    results, masks = {}, {}
+    for runname, runlength in zip(runnames, runlengths):
+        weight = runlength / totaldays
+        with NC.Dataset(os.path.join(loc, runname, filename)) as harm:
+            for var in variables:
+                harm_var = harm.variables[var]
+                shape = harm_var.shape[1:]
+                if var not in results:
+                    results[var] = np.zeros(shape)
+                    masks[var] = np.zeros(shape, dtype=bool)
+                step = chunk_size or max(shape[0], 1)
+                for j in range(0, shape[0], step):
+                    chunk = harm_var[0, j : j + step]
+                    masks[var][j : j + step] |= np.ma.getmaskarray(chunk)
+                    data = np.ma.getdata(chunk).astype(float)
+                    data *= weight
+                    results[var][j : j + step] += data
+    for var in variables:
+        results[var].flags.writeable = False
+        masks[var].flags.writeable = False
+        results[var] = (results[var], masks[var])
+    return results
+
+
+composite_harmonics.cache_info = _composite_harmonics.cache_info
+composite_harmonics.cache_clear = _composite_harmonics.cache_clear
+
+
+def _amp_pha(results, prefix):
+    """Amplitude and phase of the real and imaginary harmonics variables that
+    start with prefix; e.g. 'M2_eta'.
+    """
+    real, imag = results[prefix + "_real"], results[prefix + "_imag"]
+    return np.sqrt(real**2 + imag**2), -np.degrees(np.arctan2(imag, real))
+
+
 def get_composite_harms(runnames, loc):
     """Combine the harmonics from the specified runs into a 'composite' run.
 
@@ -1221,24 +1505,10 @@ def get_composite_harms(runnames, loc):
     :returns: mod_M2_amp, mod_K1_amp, mod_M2_pha, mod_K1_pha
     :rtypes: 4-tuple of numpy.ndarray instances
     """
-    results = {}
     vars = "M2_eta_real M2_eta_imag K1_eta_real K1_eta_imag".split()
-    runlengths = {runname: get_run_length(runname, loc) for runname in runnames}
-    for k, runname in enumerate(runnames):
-        filename = os.path.join(loc, runnames[k], "Tidal_Harmonics_eta.nc")
-        harmT = NC.Dataset(filename)
-        for var in vars:
-            try:
-                results[var] += harmT.variables[var][0, ...] * runlengths[runname]
-            except KeyError:
-                results[var] = harmT.variables[var][0, ...] * runlengths[runname]
-    totaldays = sum(runlengths.itervalues())
-    for var in vars:
-        results[var] /= totaldays
-    mod_M2_amp = np.sqrt(results["M2_eta_real"] ** 2 + results["M2_eta_imag"] ** 2)
-    mod_M2_pha = -np.degrees(np.arctan2(results["M2_eta_imag"], results["M2_eta_real"]))
-    mod_K1_amp = np.sqrt(results["K1_eta_real"] ** 2 + results["K1_eta_imag"] ** 2)
-    mod_K1_pha = -np.degrees(np.arctan2(results["K1_eta_imag"], results["K1_eta_real"]))
+    results = composite_harmonics(runnames, loc, vars)
+    mod_M2_amp, mod_M2_pha = _amp_pha(results, "M2_eta")
+    mod_K1_amp, mod_K1_pha = _amp_pha(results, "K1_eta")
     return mod_M2_amp, mod_K1_amp, mod_M2_pha, mod_K1_pha
 
 
@@ -1261,53 +1531,22 @@ def get_composite_harms_uv(runname, loc):
     :returns: mod_M2_u_amp, mod_M2_u_pha, mod_M2_v_amp, mod_M2_v_pha,
               mod_K1_u_amp, mod_K1_u_pha, mod_K1_v_amp, mod_K1_v_pha
     """
-    runlength = np.zeros((len(runname), 1))
-    for k in range(0, len(runname)):
-        runlength[k, 0] = get_run_length(runname[k], loc)
-
-    mod_M2_u_real1 = 0.0
-    mod_M2_u_imag1 = 0.0
-    mod_M2_v_real1 = 0.0
-    mod_M2_v_imag1 = 0.0
-    mod_K1_u_real1 = 0.0
-    mod_K1_u_imag1 = 0.0
-    mod_K1_v_real1 = 0.0
-    mod_K1_v_imag1 = 0.0
-
-    for runnum in range(0, len(runname)):
-        harmU = NC.Dataset(loc + runname[runnum] + "/Tidal_Harmonics_U.nc", "r")
-        # Get imaginary and real components
-        mod_M2_u_real1 += harmU.variables["M2_u_real"][0, :, :] * runlength[runnum]
-        mod_M2_u_imag1 += harmU.variables["M2_u_imag"][0, :, :] * runlength[runnum]
-        mod_K1_u_real1 += harmU.variables["K1_u_real"][0, :, :] * runlength[runnum]
-        mod_K1_u_imag1 += harmU.variables["K1_u_imag"][0, :, :] * runlength[runnum]
-
-    for runnum in range(0, len(runname)):
-        harmV = NC.Dataset(loc + runname[runnum] + "/Tidal_Harmonics_V.nc", "r")
-        # Get imaginary and real components
-        mod_M2_v_real1 += harmV.variables["M2_v_real"][0, :, :] * runlength[runnum]
-        mod_M2_v_imag1 += harmV.variables["M2_v_imag"][0, :, :] * runlength[runnum]
-        mod_K1_v_real1 += harmV.variables["K1_v_real"][0, :, :] * runlength[runnum]
-        mod_K1_v_imag1 += harmV.variables["K1_v_imag"][0, :, :] * runlength[runnum]
-
-    totaldays = sum(runlength)
-    mod_M2_u_real = mod_M2_u_real1 / totaldays
-    mod_M2_u_imag = mod_M2_u_imag1 / totaldays
-    mod_K1_u_real = mod_K1_u_real1 / totaldays
-    mod_K1_u_imag = mod_K1_u_imag1 / totaldays
-    mod_M2_v_real = mod_M2_v_real1 / totaldays
-    mod_M2_v_imag = mod_M2_v_imag1 / totaldays
-    mod_K1_v_real = mod_K1_v_real1 / totaldays
-    mod_K1_v_imag = mod_K1_v_imag1 / totaldays
-
-    mod_M2_u_amp = np.sqrt(mod_M2_u_real**2 + mod_M2_u_imag**2)
-    mod_M2_u_pha = -np.degrees(np.arctan2(mod_M2_u_imag, mod_M2_u_real))
-    mod_K1_u_amp = np.sqrt(mod_K1_u_real**2 + mod_K1_u_imag**2)
-    mod_K1_u_pha = -np.degrees(np.arctan2(mod_K1_u_imag, mod_K1_u_real))
-    mod_M2_v_amp = np.sqrt(mod_M2_v_real**2 + mod_M2_v_imag**2)
-    mod_M2_v_pha = -np.degrees(np.arctan2(mod_M2_v_imag, mod_M2_v_real))
-    mod_K1_v_amp = np.sqrt(mod_K1_v_real**2 + mod_K1_v_imag**2)
-    mod_K1_v_pha = -np.degrees(np.arctan2(mod_K1_v_imag, mod_K1_v_real))
+    results = composite_harmonics(
+        runname,
+        loc,
+        "M2_u_real M2_u_imag K1_u_real K1_u_imag".split(),
+        filename="Tidal_Harmonics_U.nc",
+    )
+    mod_M2_u_amp, mod_M2_u_pha = _amp_pha(results, "M2_u")
+    mod_K1_u_amp, mod_K1_u_pha = _amp_pha(results, "K1_u")
+    results = composite_harmonics(
+        runname,
+        loc,
+        "M2_v_real M2_v_imag K1_v_real K1_v_imag".split(),
+        filename="Tidal_Harmonics_V.nc",
+    )
+    mod_M2_v_amp, mod_M2_v_pha = _amp_pha(results, "M2_v")
+    mod_K1_v_amp, mod_K1_v_pha = _amp_pha(results, "K1_v")
 
     return (
         mod_M2_u_amp,
@@ -1935,7 +2174,299 @@ def fittit(uaus, time, nconst):
     return apparam
 
 
-def filter_timeseries(record, winlen=39, method="box"):
+# Tidal constituents in the order they are added to the fit by fittit()
+# and fittit_lstsq()
+FIT_CONSTITUENTS = ("M2", "K1", "S2", "O1", "N2", "P1", "K2", "Q1")
+
+
+def _fit_constituents(nconst):
+    """Return the names of the tidal constituents that are fitted by fittit()
+    and fittit_lstsq() for nconst constituents; they are added in pairs.
+
+    :arg nconst: The amount of tidal constituents used for the analysis.
+    :type nconst: int
+
+    :returns: constituent names
+    :rtype: tuple
+    """
+    npairs = min(max((nconst + 1) // 2, 1), len(FIT_CONSTITUENTS) // 2)
+    return FIT_CONSTITUENTS[: 2 * npairs]
+
+
+def _harmonic_design_matrix(time, constituents):
+    """Return the design matrix of the linear least-squares harmonic fit
+    of a time series to the mean and the cosine and sine terms of tidal
+    constituents.
+
+    :arg time: Time over which the time series is taken in hours.
+    :type time: :py:class:'np.ndarray'
+
+    :arg constituents: Names of the tidal constituents in CorrTides.
+    :type constituents: sequence
+
+    :returns: Design matrix with a column of ones followed by a cosine and a
+              sine column for each constituent.
+    :rtype: :py:class:'np.ndarray'
+    """
+    time = np.asarray(time, dtype=float)
+    freqs = np.radians([CorrTides[const]["freq"] for const in constituents])
+    arg = time[:, np.newaxis] * freqs
+    design = np.empty((time.size, 1 + 2 * len(constituents)))
+    design[:, 0] = 1
+    design[:, 1::2] = np.cos(arg)
+    design[:, 2::2] = np.sin(arg)
+    return design
+
+
+def _harmonic_amp_phase(coeffs, constituents, nconst, shape):
+    """Convert the coefficients of a linear least-squares harmonic fit to
+    the amplitudes and phases dictionary returned by fittit().
+
+    :arg coeffs: Fit coefficients; the mean followed by the cosine and sine
+                 coefficient of each constituent, for each point.
+    :type coeffs: :py:class:'np.ndarray'
+
+    :arg constituents: Names of the fitted tidal constituents.
+    :type constituents: sequence
+
+    :arg nconst: The amount of tidal constituents to return
+                 amplitudes and phases for.
+    :type nconst: int
+
+    :arg shape: Shape of the amplitude and phase arrays.
+    :type shape: tuple
+
+    :returns: a dictionary object containing a phase an amplitude for each
+              harmonic constituent
+    """
+    apparam = collections.OrderedDict()
+    for k, const in enumerate(constituents):
+        if k < nconst:
+            cos_coeff, sin_coeff = coeffs[1 + 2 * k], coeffs[2 + 2 * k]
+            amp = np.hypot(cos_coeff, sin_coeff)
+            # Phase between [-180, 180]
+            phase = (np.degrees(np.arctan2(sin_coeff, cos_coeff)) + 180) % 360 - 180
+            phase = np.where(amp == 0, 0, phase)
+        else:
+            amp = phase = np.zeros(coeffs.shape[1:])
+        # Mask the zero values
+        apparam[const] = {
+            "amp": np.ma.masked_values(amp.reshape(shape), 0),
+            "phase": np.ma.masked_values(phase.reshape(shape), 0),
+        }
+    return apparam
+
+
+def fittit_lstsq(uaus, time, nconst):
+    """Function to find tidal components of a time series over the whole
+    area given, by linear least-squares.
+
+    This is a much faster replacement for :py:func:`fittit`.
+    Because the constituent frequencies are fixed, the harmonic fit is
+    a linear problem; the design matrix is built once and the fit is solved
+    for all of the points in a single batched least-squares calculation,
+    rather than with a non-linear curve fit at each point.
+
+    Time must be in axis zero; the time series may have any other
+    dimensions (e.g. depth, y, x).
+    Points at which the time series is all zero are masked in the results,
+    as they are by :py:func:`fittit`.
+
+    :arg uaus: The time series to be analyzed.
+    :type uaus:  :py:class:'np.ndarray'
+
+    :arg time: Time over which the time series is taken in hours.
+    :type time: :py:class:'np.ndarray'
+
+    :arg nconst: The amount of tidal constituents used for the analysis.
+                 They added in pairs and by order of importance,
+                 M2, K1, S2, O1, N2, P1, K2, Q1.
+    :type nconst: int
+
+    :returns: a dictionary object containing a phase an amplitude for each
+              harmonic constituent, for each orthogonal velocity
+    """
+    uaus = np.ma.filled(np.ma.asarray(uaus, dtype=float), 0)
+    constituents = _fit_constituents(nconst)
+    design = _harmonic_design_matrix(time, constituents)
+    coeffs = np.linalg.lstsq(design, uaus.reshape(uaus.shape[0], -1), rcond=None)[0]
+    return _harmonic_amp_phase(coeffs, constituents, nconst, uaus.shape[1:])
+
+
+class HarmonicAnalyser(object):
+    """Streaming harmonic analysis of a time series that is too long
+    to be loaded into memory at once.
+
+    The normal equations of the linear least-squares harmonic fit done by
+    :py:func:`fittit_lstsq` are accumulated one piece of the time series
+    (e.g. one results file) at a time with :py:meth:`update`,
+    so only the current piece and a small set of sums for each point are
+    held in memory.
+    Analysers that have accumulated different pieces of the same time series
+    (e.g. in separate worker processes) can be combined with
+    :py:meth:`merge`.
+    The amplitudes and phases for every point are calculated at the end
+    by :py:meth:`results`.
+
+    Times of all of the pieces must be in hours relative to the same
+    reference time.
+
+    :arg nconst: The amount of tidal constituents used for the analysis.
+                 They added in pairs and by order of importance,
+                 M2, K1, S2, O1, N2, P1, K2, Q1.
+    :type nconst: int
+    """
+
+    def __init__(self, nconst):
+        self.nconst = nconst
+        self.constituents = _fit_constituents(nconst)
+        nparams = 1 + 2 * len(self.constituents)
+        self.normal_matrix = np.zeros((nparams, nparams))
+        self.rhs = None
+        self.shape = None
+        self.ntimes = 0
+
+    def update(self, data, time):
+        """Accumulate a piece of the time series.
+
+        :arg data: Piece of the time series with time in axis zero;
+                   the other dimensions must be the same for every piece.
+        :type data: :py:class:'np.ndarray'
+
+        :arg time: Times of the piece of the time series in hours.
+        :type time: :py:class:'np.ndarray'
+
+        :returns: The analyser.
+        :rtype: :py:class:`HarmonicAnalyser`
+        """
+        data = np.ma.filled(np.ma.asarray(data, dtype=float), 0)
+        if self.shape is None:
+            self.shape = data.shape[1:]
+            self.rhs = np.zeros(
+                (self.normal_matrix.shape[0], int(np.prod(self.shape, dtype=int)))
+            )
+        elif data.shape[1:] != self.shape:
+            raise ValueError(
+                "time series shape {} does not match {}".format(
+                    data.shape[1:], self.shape
+                )
+            )
+        design = _harmonic_design_matrix(time, self.constituents)
+        self.normal_matrix += design.T @ design
+        self.rhs += design.T @ data.reshape(data.shape[0], -1)
+        self.ntimes += data.shape[0]
+        return self
+
+    def merge(self, other):
+        """Add the pieces of the time series accumulated by another analyser.
+
+        :arg other: Analyser for the same points and constituents.
+        :type other: :py:class:`HarmonicAnalyser`
+
+        :returns: The analyser.
+        :rtype: :py:class:`HarmonicAnalyser`
+        """
+        if other.constituents != self.constituents:
+            raise ValueError(
+                "cannot merge analysers of different constituents: "
+                "{} and {}".format(self.constituents, other.constituents)
+            )
+        if other.shape is None:
+            return self
+        if self.shape is None:
+            self.shape = other.shape
+            self.rhs = np.zeros_like(other.rhs)
+        elif other.shape != self.shape:
+            raise ValueError(
+                "time series shape {} does not match {}".format(other.shape, self.shape)
+            )
+        self.normal_matrix += other.normal_matrix
+        self.rhs += other.rhs
+        self.ntimes += other.ntimes
+        return self
+
+    def results(self):
+        """Calculate the amplitudes and phases of the accumulated time series.
+
+        :returns: a dictionary object containing a phase an amplitude for each
+                  harmonic constituent, in the same form as is returned by
+                  :py:func:`fittit`
+        """
+        if self.shape is None:
+            raise ValueError("no time series have been accumulated")
+        coeffs = np.linalg.lstsq(self.normal_matrix, self.rhs, rcond=None)[0]
+        return _harmonic_amp_phase(coeffs, self.constituents, self.nconst, self.shape)
+
+
+def predict_tide(time, apparam, mean=0, nodal=True, tidecorr=CorrTides):
+    """Synthesize the tidal signal from harmonic constants for many locations
+    at once.
+
+    The prediction for all of the locations and times is calculated as
+    a single matrix product of the cosine and sine of each constituent's
+    argument at each time with the constants at each location,
+    so long time series for many locations are fast to calculate.
+
+    With nodal=False, the prediction at each location is the same as the
+    :py:func:`double`, :py:func:`quadruple`, :py:func:`sextuple`, or
+    :py:func:`octuple` fit function for the constituents in apparam,
+    i.e. the constants are those returned by :py:func:`fittit`.
+    With nodal=True, the constants are taken to be the nodally corrected
+    amplitudes and phases (like those used to calculate ellipse parameters in
+    :py:func:`salishsea_tools.ellipse.get_params`),
+    and the ft and uvt corrections in tidecorr are applied to them.
+
+    :arg time: Times to predict the tide at,
+               in hours since tidecorr["reftime"],
+               or as :py:class:`numpy.datetime64` values.
+    :type time: :py:class:'np.ndarray'
+
+    :arg apparam: Amplitude and phase of each constituent, in the form
+                  returned by :py:func:`fittit`;
+                  the amplitude and phase arrays of all of the constituents
+                  must have the same shape, e.g. (number of stations,).
+    :type apparam: dict
+
+    :arg mean: Mean value to add to the tidal signal,
+               either a scalar or an array with the same shape as the
+               amplitudes.
+    :type mean: float or :py:class:'np.ndarray'
+
+    :arg nodal: Apply the nodal corrections in tidecorr to the constants.
+    :type nodal: boolean
+
+    :arg tidecorr: Tidal corrections in amplitude and phase, and frequencies
+                   of the constituents. Default is the nowcast values.
+    :type tidecorr: dictionary
+
+    :returns: Predicted tide with time in axis zero followed by the
+              dimensions of the amplitudes.
+    :rtype: :py:class:'np.ndarray'
+    """
+    time = np.asarray(time)
+    if np.issubdtype(time.dtype, np.datetime64):
+        reftime = np.datetime64(tidecorr["reftime"].replace(tzinfo=None), "us")
+        time = (time - reftime) / np.timedelta64(1, "h")
+    constituents = list(apparam)
+    shape = np.shape(apparam[constituents[0]]["amp"])
+    coeffs = np.empty((1 + 2 * len(constituents), int(np.prod(shape, dtype=int))))
+    coeffs[0] = np.broadcast_to(mean, shape).ravel()
+    for k, const in enumerate(constituents):
+        amp = np.ma.filled(apparam[const]["amp"], 0).astype(float)
+        phase = np.ma.filled(apparam[const]["phase"], 0).astype(float)
+        if nodal:
+            amp = amp * tidecorr[const]["ft"]
+            phase = phase - tidecorr[const]["uvt"]
+        phase = np.radians(phase)
+        coeffs[1 + 2 * k] = (amp * np.cos(phase)).ravel()
+        coeffs[2 + 2 * k] = (amp * np.sin(phase)).ravel()
+    design = _harmonic_design_matrix(np.ravel(time), constituents)
+    return (design @ coeffs).reshape(np.shape(time) + shape)
+
+
+def filter_timeseries(
+    record, winlen=39, method="box", axis=0, chunk_size=None, out=None
+):
     """Filter a timeseries.
 
     Developed for wind and tidal filtering, but can be modified for use
@@ -1943,8 +2474,19 @@ def filter_timeseries(record, winlen=39, method="box"):
     half a window length longer at either end than the period of interest
     to accommodate window length shrinking near the array edges.
 
-    *This function can only operate along the 0 axis. Please modify to include
-    an axis argument in the future.*
+    The filter is applied as a convolution along the time axis,
+    so all of the other dimensions are filtered at once.
+    Records that are too large to be filtered in one piece can be filtered
+    chunk_size time steps at a time;
+    each chunk is read with the half window length of data on either side
+    that it needs, so the result is the same as filtering the whole record.
+    To keep memory use bounded by the chunk size for a record that does not
+    fit in memory, e.g. a :py:class:`netCDF4.Variable`,
+    also give an out array to write the filtered record into.
+
+    Masked values in a masked array record are filtered as zeros,
+    and filtered values are masked where every value in their window is
+    masked.
 
     Types of filters (*please add to these*):
     * **box**: simple running mean
@@ -1960,15 +2502,22 @@ def filter_timeseries(record, winlen=39, method="box"):
     :arg method: type of filter (ex. 'box', 'doodson', etc.)
     :type method: string
 
-    :returns filtered: filtered timeseries
-    :rtype: same as record
-    """
+    :arg axis: time axis of record
+    :type axis: integer
 
-    # Preallocate filtered record
-    filtered = record.copy()
+    :arg chunk_size: number of time steps to filter at a time;
+                     defaults to the whole record
+    :type chunk_size: integer
 
-    # Length along time axis
-    record_length = record.shape[0]
+    :arg out: array with the shape of record to write the filtered record
+              into; defaults to a new array
+    :type out: :py:class:`numpy.ndarray`, :py:class:`numpy.memmap`,
+               or :py:class:`netCDF4.Variable`
+
+    :returns filtered: filtered timeseries
+    :rtype: same as record, or :py:class:`numpy.ma.MaskedArray` for a
+            :py:class:`netCDF4.Variable` record, or out if it is given
+    """
 
     # Window length
     w = (winlen - 1) // 2
@@ -1989,24 +2538,88 @@ def filter_timeseries(record, winlen=39, method="box"):
     else:
         raise ValueError("Invalid filter method: {}".format(method))
 
-    # Loop through record
-    for i in range(record_length):
+    # Preallocate filtered record
+    if out is not None:
+        filtered = out
+    elif hasattr(record, "copy"):
+        filtered = record.copy()
+    else:
+        # netCDF4.Variable values are read as masked arrays
+        filtered = np.ma.empty(record.shape, dtype=record.dtype)
 
-        # Adjust window length for end cases
-        W = min(i, w, record_length - i - 1)
-        Weight = weight[:W]
-        Weight = np.append(Weight[::-1], np.append(centerval, Weight))
-        if sum(Weight) != 0:
-            Weight = Weight / sum(Weight)
+    # Length along time axis
+    axis = axis % len(record.shape)
+    record_length = record.shape[axis]
+    if chunk_size is None:
+        chunk_size = max(record_length, 1)
+
+    def time_slice(start, stop):
+        return (slice(None),) * axis + (slice(start, stop),)
+
+    # Filter a chunk at a time, with the half window of data on either side
+    for start in range(0, record_length, chunk_size):
+        stop = min(start + chunk_size, record_length)
+        lo, hi = max(start - w, 0), min(stop + w, record_length)
+        block = record[time_slice(lo, hi)]
+        block = np.moveaxis(getattr(block, "values", block), axis, 0)
+        chunk = _filter_block(block, weight, centerval, lo, start, stop, record_length)
+        filtered[time_slice(start, stop)] = np.moveaxis(chunk, 0, axis)
+
+    return filtered
 
-        # Expand weight dims so it can operate on record window
-        for dim in range(record.ndim - 1):
-            Weight = Weight[:, np.newaxis]
 
-        # Apply mean over window length
+def _filter_block(block, weight, centerval, lo, start, stop, record_length):
+    """Apply the filter weights to time steps start to stop of a record,
+    given the block of the record that begins at time step lo and
+    includes the filter window of each of those time steps.
+
+    :returns: filtered time steps, with time in axis zero
+    :rtype: :py:class:`numpy.ndarray`, or :py:class:`numpy.ma.MaskedArray`
+            for a masked block
+    """
+    w = weight.size
+    filtered = np.empty((stop - start,) + block.shape[1:])
+
+    # Filter masked values as zeros, and count the unmasked values in each
+    # window so that filtered values with entirely masked windows are masked
+    valid = None
+    if np.ma.getmask(block) is not np.ma.nomask:
+        valid = ~np.ma.getmaskarray(block)
+        block = np.ma.filled(block.astype(float), 0)
+        nvalid = np.empty(filtered.shape, dtype=int)
+
+    # Full windows: correlate the block with the normalized filter kernel
+    full_start, full_stop = max(start, w), min(stop, record_length - w)
+    if full_start < full_stop:
+        kernel = np.append(weight[::-1], np.append(centerval, weight))
+        kernel = kernel / kernel.sum()
+        i0, i1 = full_start - lo - w, full_stop - lo + w
+        full = correlate1d(block[i0:i1].astype(float), kernel, axis=0)
+        filtered[full_start - start : full_stop - start] = full[w : full.shape[0] - w]
+        if valid is not None:
+            counts = correlate1d(
+                valid[i0:i1].astype(int), np.ones(kernel.size, dtype=int), axis=0
+            )
+            nvalid[full_start - start : full_stop - start] = counts[
+                w : counts.shape[0] - w
+            ]
+
+    # Adjust window length for end cases
+    for i in range(start, stop):
+        if full_start <= i < full_stop:
+            continue
+        W = min(i, w, record_length - i - 1)
         if W > 0:
-            filtered[i, ...] = np.sum(record[i - W : i + W + 1, ...] * Weight, axis=0)
+            Weight = weight[:W]
+            Weight = np.append(Weight[::-1], np.append(centerval, Weight))
+            if sum(Weight) != 0:
+                Weight = Weight / sum(Weight)
+            window = block[i - lo - W : i - lo + W + 1]
+            filtered[i - start] = np.tensordot(Weight, window, axes=(0, 0))
         else:
-            filtered[i, ...] = record[i, ...]
-
+            filtered[i - start] = block[i - lo]
+        if valid is not None:
+            nvalid[i - start] = valid[i - lo - W : i - lo + W + 1].sum(axis=0)
+    if valid is not None:
+        return np.ma.masked_array(filtered, mask=nvalid == 0)
     return filtered
@@ -18,6 +18,7 @@ conserving memory.
 """
 
 from salishsea_tools import viz_tools
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dateutil.parser import parse
 from datetime import timedelta
 from tqdm import tqdm
@@ -27,36 +28,110 @@ import os
 
 
 def load_NEMO_timeseries(
-    filenames, mask, field, dim, index=0, spacing=1, shape="grid", unstagger_dim=None
+    filenames,
+    mask,
+    field,
+    dim,
+    index=0,
+    spacing=1,
+    shape="grid",
+    unstagger_dim=None,
+    memmap=None,
+    max_workers=None,
 ):
-    """ """
+    """Load the water point timeseries of a slice of a NEMO results field
+    from a sequence of results files.
+
+    The output array is preallocated and filled in place,
+    so the time and memory needed grow linearly with the number of files.
+    When the files are read sequentially, each file is opened once and the
+    output array is sized from the length of the first file;
+    it is only resized if the files differ in length.
+    The files can be read concurrently by a pool of worker processes,
+    which first get the time counters of all of the files to size the
+    output array;
+    their data are still placed in the output array in chronological order.
+
+    :arg filenames: Sequential list of NEMO results filenames
+                    (e.g., from :py:func:`make_filename_list`)
+    :type filenames: list of str
+
+    :arg mask: NEMO mesh mask
+    :type mask: :py:class:`xarray.Dataset`
+
+    :arg field: Name of the results field to load
+    :type field: str
+
+    :arg dim: Name of the dimension to slice the field on
+    :type dim: str
+
+    :arg index: Index of the slice on dim
+    :type index: int
+
+    :arg spacing: Subsampling spacing of the grid points in the slice
+    :type spacing: int
+
+    :arg shape: Return the data as a 'grid' or as water point timeseries
+    :type shape: str
+
+    :arg unstagger_dim: Dimension to unstagger velocity fields on
+    :type unstagger_dim: str
+
+    :arg memmap: Path/filename of a :file:`.npy` file to memory-map
+                 the water point timeseries output array to,
+                 so that it does not have to fit in memory.
+                 The default is to hold the output array in memory.
+                 A grid shaped output array is always held in memory.
+    :type memmap: str
+
+    :arg max_workers: Maximum number of worker processes to use to read
+                      the files concurrently.
+                      The default is to read the files sequentially.
+    :type max_workers: int
+
+    :returns: data, coords
+    :rtype: :py:class:`numpy.ndarray`, dict
+    """
 
     # Reshape mask, grid, and depth
     tmask, coords, ngrid, ngrid_water = reshape_coords(
         mask, dim, index=index, spacing=spacing
     )
 
-    # Initialize output array
-    date = np.empty(0, dtype="datetime64[ns]")
-    data = np.empty((0, ngrid_water))
-
-    # Loop through filenames
-    for filename in tqdm(filenames):
-        # Open NEMO results and flatten (depth averages added here)
-        data_grid = xr.open_dataset(filename)[field].isel(**{dim: index})
-
-        # Unstagger if velocity field
-        if unstagger_dim is not None:
-            data_grid = viz_tools.unstagger_xarray(data_grid, unstagger_dim)
-
-        # Reshape field
-        data_trim = reshape_to_ts(
-            data_grid.values, tmask, ngrid, ngrid_water, spacing=spacing
-        )
-
-        # Store trimmed arrays
-        date = np.concatenate([date, data_grid.time_counter.values])
-        data = np.concatenate([data, data_trim], axis=0)
+    args = (field, dim, index, unstagger_dim, tmask, ngrid, ngrid_water, spacing)
+    if max_workers is None or max_workers < 2:
+        # Read each file once, sizing the output array from the length of
+        # the first file and resizing it if the files differ in length
+        dates, data, end = [], None, 0
+        for n, filename in enumerate(tqdm(filenames)):
+            file_dates, values = _load_ts(filename, *args)
+            start, end = end, end + len(file_dates)
+            if data is None or end > data.shape[0]:
+                nrows = end + (len(filenames) - n - 1) * len(file_dates)
+                data = _resize_output(data, start, nrows, ngrid_water, memmap)
+            # Store trimmed array in place
+            data[start:end, :] = values
+            dates.append(file_dates)
+        if data is None or end < data.shape[0]:
+            data = _resize_output(data, end, end, ngrid_water, memmap)
+    else:
+        # Worker processes to read the files concurrently
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # Get the dates from each file to size the output array
+            dates = list(executor.map(_load_dates, filenames))
+            starts = np.cumsum([0] + [len(file_dates) for file_dates in dates])
+            data = _resize_output(None, 0, starts[-1], ngrid_water, memmap)
+
+            runs = list(zip(filenames, starts[:-1], starts[1:]))
+            futures = {
+                executor.submit(_load_ts, filename, *args): (start, end)
+                for filename, start, end in runs
+            }
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                # Store trimmed array in place, in chronological order
+                start, end = futures.pop(future)
+                data[start:end, :] = future.result()[1]
+    date = np.concatenate([np.empty(0, dtype="datetime64[ns]")] + dates)
 
     # Reshape to grid
     if shape == "grid":
@@ -90,6 +165,60 @@ def load_NEMO_timeseries(
     return data, coords
 
 
+def _load_dates(filename):
+    """Return the time counter values of a NEMO results file."""
+
+    with xr.open_dataset(filename) as ds:
+        return ds.time_counter.values
+
+
+def _load_ts(
+    filename, field, dim, index, unstagger_dim, tmask, ngrid, ngrid_water, spacing
+):
+    """Return the time counter values and the water point timeseries of
+    a slice of a NEMO results field from a results file.
+    """
+
+    # Open NEMO results and flatten (depth averages added here)
+    with xr.open_dataset(filename) as ds:
+        data_grid = ds[field].isel(**{dim: index})
+
+        # Unstagger if velocity field
+        if unstagger_dim is not None:
+            data_grid = viz_tools.unstagger_xarray(data_grid, unstagger_dim)
+
+        # Reshape field
+        return ds.time_counter.values, reshape_to_ts(
+            data_grid.values, tmask, ngrid, ngrid_water, spacing=spacing
+        )
+
+
+def _resize_output(data, nkeep, nrows, ncols, memmap):
+    """Return a new output array for :py:func:`load_NEMO_timeseries`
+    with nrows rows that holds the first nkeep rows of data.
+    """
+
+    if memmap is None:
+        resized = np.empty((nrows, ncols))
+        if data is not None:
+            resized[:nkeep] = data[:nkeep]
+        return resized
+    if data is None:
+        return np.lib.format.open_memmap(
+            memmap, mode="w+", dtype=float, shape=(int(nrows), int(ncols))
+        )
+    # Copy to a new memory-mapped file and move it into place
+    tmpfile = "{}.{}.tmp".format(memmap, os.getpid())
+    resized = np.lib.format.open_memmap(
+        tmpfile, mode="w+", dtype=float, shape=(int(nrows), int(ncols))
+    )
+    resized[:nkeep] = data[:nkeep]
+    resized.flush()
+    del resized
+    os.replace(tmpfile, memmap)
+    return np.load(memmap, mmap_mode="r+")
+
+
 def make_filename_list(
     timerange, qty, model="nowcast", resolution="h", path="/results/SalishSea"
 ):
@@ -217,12 +346,8 @@ def reshape_to_ts(data_grid, mask, ngrid, ngrid_water, spacing=1):
     # Convert to Numpy ndarray, subsample, and reshape
     data_flat = data_grid[:, ::spacing, ::spacing].reshape((-1, ngrid))
 
-    # Preallocate trimmed array
-    data_trim = np.zeros((data_flat.shape[0], ngrid_water))
-
-    # Trim land points
-    for tindex, data_t in enumerate(data_flat):
-        data_trim[tindex, :] = data_t[mask]
+    # Trim land points at all times at once
+    data_trim = data_flat[:, mask.astype(bool)].astype(float)
 
     return data_trim
 
@@ -240,10 +365,129 @@ def reshape_to_grid(data_flat, coords, shape):
     """
 
     # Preallocate gridded array
-    data_grid = np.zeros((data_flat.shape[0],) + shape)
+    data_grid = np.zeros((data_flat.shape[0],) + tuple(shape))
 
-    # Reshape flattened data to grid
-    for coord1, coord2, data_xyz in zip(*(coords + [data_flat.T])):
-        data_grid[:, coord1, coord2] = data_xyz
+    # Reshape flattened data to grid at all points at once
+    data_grid[:, coords[0], coords[1]] = data_flat
 
     return data_grid
+
+
+class WaterPoints(object):
+    """Compact storage of fields at the water points of a grid.
+
+    The flat indices of the water points are calculated once from a tmask,
+    and used to gather fields on the grid into water point vectors,
+    and to scatter water point vectors back onto the grid,
+    for any number of leading (e.g. time) dimensions at once.
+
+    Gathering the scatter of water point vectors returns them unchanged,
+    and scattering the gather of fields on the grid returns the fields
+    with their land points set to the fill value.
+
+    :arg tmask: Mask of the grid that is true at water points;
+                e.g. :kbd:`mask.tmask.isel(t=0, z=0).values`
+    :type tmask: :py:class:`numpy.ndarray`
+    """
+
+    def __init__(self, tmask):
+        self.tmask = np.asarray(tmask).astype(bool)
+        #: Shape of the grid
+        self.shape = self.tmask.shape
+        #: Flat indices of the water points on the grid
+        self.indices = np.flatnonzero(self.tmask)
+        #: Number of water points
+        self.size = self.indices.size
+
+    @property
+    def grid_indices(self):
+        """Tuple of arrays of the grid indices of the water points
+        on each axis of the grid.
+        """
+        return np.unravel_index(self.indices, self.shape)
+
+    def empty(self, leading_shape=(), dtype=float, memmap=None):
+        """Return an uninitialized array of water point vectors.
+
+        :arg leading_shape: Shape of the leading dimensions of the array;
+                            e.g. the number of time steps.
+        :type leading_shape: int or tuple
+
+        :arg dtype: Data type of the array.
+
+        :arg memmap: Path/filename of a :file:`.npy` file to memory-map
+                     the array to.
+                     The default is to hold the array in memory.
+        :type memmap: str
+
+        :returns: Array with shape :kbd:`leading_shape + (self.size,)`.
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        shape = tuple(np.atleast_1d(leading_shape).astype(int).tolist())
+        shape += (int(self.size),)
+        if memmap is None:
+            return np.empty(shape, dtype=dtype)
+        return np.lib.format.open_memmap(memmap, mode="w+", dtype=dtype, shape=shape)
+
+    def gather(self, data_grid, out=None):
+        """Gather fields on the grid into water point vectors.
+
+        :arg data_grid: Fields on the grid, with any number of leading
+                        dimensions before the grid dimensions.
+        :type data_grid: :py:class:`numpy.ndarray`
+
+        :arg out: Array to store the water point vectors in;
+                  e.g. from :py:meth:`empty`.
+        :type out: :py:class:`numpy.ndarray`
+
+        :returns: Water point vectors with shape
+                  :kbd:`data_grid.shape[:-ndim] + (self.size,)`.
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        data_grid = np.asarray(data_grid)
+        leading_shape = data_grid.shape[: data_grid.ndim - len(self.shape)]
+        if data_grid.shape[len(leading_shape) :] != self.shape:
+            raise ValueError(
+                "data_grid shape {} does not end with grid shape {}".format(
+                    data_grid.shape, self.shape
+                )
+            )
+        data_flat = data_grid.reshape(leading_shape + (-1,))
+        if out is None:
+            return data_flat[..., self.indices]
+        out[...] = data_flat[..., self.indices]
+        return out
+
+    def scatter(self, data_ts, fill_value=0, out=None):
+        """Scatter water point vectors onto the grid.
+
+        :arg data_ts: Water point vectors, with any number of leading
+                      dimensions before the water point dimension.
+        :type data_ts: :py:class:`numpy.ndarray`
+
+        :arg fill_value: Value to set at land points.
+
+        :arg out: Array to store the fields on the grid in.
+                  Its land points are set to fill_value.
+        :type out: :py:class:`numpy.ndarray`
+
+        :returns: Fields on the grid with shape
+                  :kbd:`data_ts.shape[:-1] + self.shape`.
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        data_ts = np.asarray(data_ts)
+        if data_ts.shape[-1:] != (self.size,):
+            raise ValueError(
+                "data_ts last dimension {} is not the number of water points {}".format(
+                    data_ts.shape[-1:], self.size
+                )
+            )
+        shape = data_ts.shape[:-1] + self.shape
+        if out is None:
+            out = np.empty(shape, dtype=data_ts.dtype)
+        out_flat = out.reshape(data_ts.shape[:-1] + (-1,))
+        if not np.shares_memory(out_flat, out):
+            raise ValueError("out must be a contiguous array")
+        out_flat[...] = fill_value
+        out_flat[..., self.indices] = data_ts
+        return out
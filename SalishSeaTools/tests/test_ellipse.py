@@ -0,0 +1,216 @@
+# Copyright 2013 – present by the SalishSeaCast contributors
+# and The University of British Columbia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unit tests for ellipse module."""
+
+import sys
+import types
+
+import netCDF4 as nc
+import numpy as np
+import pytest
+
+from salishsea_tools import tidetools
+
+
+def _unstag_rot(ugrid, vgrid):
+    """Stand-in for nowcast.figures.research_VENUS.unstag_rot()."""
+    u_t = (ugrid[..., 1:, :-1] + ugrid[..., 1:, 1:]) / 2
+    v_t = (vgrid[..., 1:, 1:] + vgrid[..., :-1, 1:]) / 2
+    theta = np.radians(29)
+    u_E = u_t * np.cos(theta) - v_t * np.sin(theta)
+    v_N = u_t * np.sin(theta) + v_t * np.cos(theta)
+    return u_E, v_N
+
+
+def _depth_average(var, depths, depth_axis):
+    """Stand-in for nowcast.analyze.depth_average()."""
+    return np.ma.average(var, axis=depth_axis, weights=np.gradient(depths))
+
+
+# ellipse imports modules from the SalishSeaNowcast package,
+# which is not a dependency of SalishSeaTools,
+# so stand-ins are used when it is not installed
+try:
+    import nowcast  # noqa: F401
+except ImportError:
+    analyze = types.ModuleType("nowcast.analyze")
+    analyze.depth_average = _depth_average
+    research_VENUS = types.ModuleType("nowcast.figures.research_VENUS")
+    research_VENUS.unstag_rot = _unstag_rot
+    figures = types.ModuleType("nowcast.figures")
+    figures.research_VENUS = research_VENUS
+    nowcast = types.ModuleType("nowcast")
+    nowcast.analyze = analyze
+    nowcast.figures = figures
+    sys.modules.update(
+        {
+            "nowcast": nowcast,
+            "nowcast.analyze": analyze,
+            "nowcast.figures": figures,
+            "nowcast.figures.research_VENUS": research_VENUS,
+        }
+    )
+
+from salishsea_tools import ellipse  # noqa: E402
+
+NCONST = 4
+DEPTHS = np.array([0.5, 1.5, 2.5])
+NY, NX = 5, 6
+
+
+def _tidal_signal(time, amps, phases):
+    """Synthetic time series of the first amps.shape[0] constituents in
+    tidetools.FIT_CONSTITUENTS with time in axis 0.
+    """
+    signal = np.zeros((time.size,) + amps.shape[1:])
+    expand = (slice(None),) + (np.newaxis,) * (amps.ndim - 1)
+    for k, const in enumerate(tidetools.FIT_CONSTITUENTS[: amps.shape[0]]):
+        freq = tidetools.CorrTides[const]["freq"]
+        signal += amps[k] * np.cos(np.radians(freq * time[expand] - phases[k]))
+    return signal
+
+
+@pytest.fixture(scope="module")
+def velocity_files(tmp_path_factory):
+    """Write 2 files each of hourly grid_U and grid_V-like tidal velocities,
+    and return the file names and the velocities with time in hours since
+    the tidal corrections reference time.
+    """
+    tmp_path = tmp_path_factory.mktemp("ellipse")
+    rng = np.random.default_rng(41)
+    shape = (NCONST, DEPTHS.size, NY, NX)
+    time = np.arange(0.5, 24 * 16)
+    u = _tidal_signal(time, rng.uniform(0.1, 1, shape), rng.uniform(-170, 170, shape))
+    v = _tidal_signal(time, rng.uniform(0.1, 1, shape), rng.uniform(-170, 170, shape))
+    filesu, filesv = [], []
+    for n, tslice in enumerate((slice(0, 24 * 8), slice(24 * 8, None))):
+        for grid, var, vel, files in (
+            ("U", "vozocrtx", u, filesu),
+            ("V", "vomecrty", v, filesv),
+        ):
+            filename = str(tmp_path / "grid_{}_{}.nc".format(grid, n))
+            with nc.Dataset(filename, "w") as f:
+                f.createDimension("time_counter")
+                f.createDimension("depth{}".format(grid.lower()), DEPTHS.size)
+                f.createDimension("y", NY)
+                f.createDimension("x", NX)
+                time_counter = f.createVariable(
+                    "time_counter", float, ("time_counter",)
+                )
+                time_counter.time_origin = "2014-SEP-10 00:00:00"
+                time_counter[:] = time[tslice] * 3600
+                f.createVariable(
+                    "depth{}".format(grid.lower()),
+                    float,
+                    ("depth{}".format(grid.lower()),),
+                )[:] = DEPTHS
+                dims = ("time_counter", "depth{}".format(grid.lower()), "y", "x")
+                f.createVariable(var, float, dims)[:] = vel[tslice]
+            files.append(filename)
+    return filesu, filesv, u, v, time
+
+
+class TestGetParamsFromHarmonics:
+    """Unit tests for get_params_from_harmonics() function."""
+
+    @staticmethod
+    def _apparam(amp, phase):
+        """M2 amplitude and phase before the tidal corrections are applied."""
+        corr = tidetools.CorrTides["M2"]
+        return {"M2": {"amp": amp * corr["ft"], "phase": phase - corr["uvt"]}}
+
+    @pytest.mark.parametrize(
+        "uamp, upha, vamp, vpha, expected",
+        [
+            # Rectilinear current along x
+            (2, 0, 0, 0, (2, 0, 0, 0)),
+            # Anticlockwise ellipse aligned with x
+            (2, 0, 1, 90, (2, 1, 0, 0)),
+            # Rectilinear current at 45 degrees
+            (1, 30, 1, 30, (np.sqrt(2), 0, 45, 30)),
+        ],
+    )
+    def test_get_params_from_harmonics(self, uamp, upha, vamp, vpha, expected):
+        params = ellipse.get_params_from_harmonics(
+            self._apparam(uamp, upha), self._apparam(vamp, vpha)
+        )
+        result = [
+            params["M2"][name]
+            for name in ("Semi-Major Axis", "Semi-Minor Axis", "Inclination", "Phase")
+        ]
+        np.testing.assert_allclose(result, expected, atol=1e-12)
+
+    def test_matches_get_params(self, velocity_files):
+        _, _, u, v, time = velocity_files
+        expected = ellipse.get_params(u[:, 0], v[:, 0], time, NCONST)
+        params = ellipse.get_params_from_harmonics(
+            tidetools.fittit_lstsq(u[:, 0], time, NCONST),
+            tidetools.fittit_lstsq(v[:, 0], time, NCONST),
+        )
+        for const in expected:
+            for name in expected[const]:
+                np.testing.assert_allclose(
+                    params[const][name], expected[const][name], atol=1e-6
+                )
+
+
+class TestGetParamsDomain:
+    """Unit tests for get_params_domain() function."""
+
+    @pytest.mark.parametrize(
+        "depthrange, depav, k",
+        [
+            ("None", False, slice(None)),
+            (1.6, False, [1]),
+            ([1, 3], False, [1, 2]),
+            ("None", True, slice(None)),
+        ],
+    )
+    @pytest.mark.parametrize("max_workers", [None, 2])
+    def test_matches_untiled_get_params(
+        self, velocity_files, tmp_path, depthrange, depav, k, max_workers
+    ):
+        filesu, filesv, u, v, time = velocity_files
+        outfilename = str(tmp_path / "ellipse.nc")
+        ellipse.get_params_domain(
+            filesu,
+            filesv,
+            outfilename,
+            NCONST,
+            tile_size=(2, 4),
+            depthrange=depthrange,
+            depav=depav,
+            max_workers=max_workers,
+        )
+        u_u, v_v = ellipse.prepare_vel(u[:, k], v[:, k], depav=depav, depth=DEPTHS[k])
+        expected = ellipse.get_params(u_u, v_v, time, NCONST)
+        with nc.Dataset(outfilename) as out:
+            if depav:
+                assert "depth" not in out.variables
+            else:
+                np.testing.assert_array_equal(out.variables["depth"][:], DEPTHS[k])
+            for const in tidetools.FIT_CONSTITUENTS[:NCONST]:
+                for name, long_name, units in ellipse.ELLIPSE_VARIABLES:
+                    var = out.variables["{}_{}".format(const, name)]
+                    assert var.units == units
+                    assert var.long_name == "{} {}".format(const, long_name)
+                    result = var[:]
+                    # No ellipse parameters where unstaggering needs j-1 or i-1
+                    assert result[..., 0, :].mask.all()
+                    assert result[..., :, 0].mask.all()
+                    np.testing.assert_allclose(
+                        result[..., 1:, 1:], expected[const][long_name], atol=1e-6
+                    )
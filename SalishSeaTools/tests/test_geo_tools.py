@@ -164,3 +164,43 @@ class TestFindClosestModelPoint:
                 land_mask=all_land_land_mask,
                 raiseOutOfBounds=True,
             )
+
+
+class TestFindClosestModelPoints:
+    """Unit tests for find_closest_model_points() function"""
+
+    model_lons = TestFindClosestModelPoint.model_lons
+    model_lats = TestFindClosestModelPoint.model_lats
+    land_mask = TestFindClosestModelPoint.land_mask
+
+    def test_matches_find_closest_model_point(self):
+        lons = np.array([-124.488, -124.5, -124.5, -124.49, 0])
+        lats = np.array([48.54, 48.54, 48.555, 48.546, 0])
+        yinds, xinds = geo_tools.find_closest_model_points(
+            lons, lats, self.model_lons, self.model_lats, land_mask=self.land_mask
+        )
+        for lon, lat, yind, xind in zip(lons, lats, yinds, xinds):
+            j, i = geo_tools.find_closest_model_point(
+                lon, lat, self.model_lons, self.model_lats, land_mask=self.land_mask
+            )
+            np.testing.assert_array_equal((yind, xind), (j, i))
+        np.testing.assert_array_equal(yinds[:3], [0, 1, 1])
+        np.testing.assert_array_equal(xinds[:3], [2, 0, 0])
+        assert np.isnan(yinds[-1]) and np.isnan(xinds[-1])
+
+    def test_no_land_mask(self):
+        yinds, xinds = geo_tools.find_closest_model_points(
+            np.array([[-124.5]]), np.array([[48.555]]), self.model_lons, self.model_lats
+        )
+        assert yinds.shape == (1, 1)
+        assert (yinds[0, 0], xinds[0, 0]) == (3, 2)
+
+    def test_bad_tol_grid_key(self):
+        with pytest.raises(KeyError):
+            geo_tools.find_closest_model_points(
+                np.array([-124.5]),
+                np.array([48.5]),
+                self.model_lons,
+                self.model_lats,
+                grid="NotAKey",
+            )
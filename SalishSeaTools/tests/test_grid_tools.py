@@ -0,0 +1,318 @@
+# Copyright 2013 – present by the SalishSeaCast contributors
+# and The University of British Columbia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unit tests for grid_tools module."""
+
+import netCDF4 as nc
+import numpy as np
+import pytest
+import xarray as xr
+
+from salishsea_tools import geo_tools, grid_tools
+
+
+def _nemo_grid():
+    """Small rotated NEMO-like grid and surface mask."""
+    j, i = np.mgrid[0:30, 0:20]
+    grid_NEMO = xr.Dataset(
+        {
+            "longitude": (("y", "x"), -123.5 + 0.005 * i - 0.002 * j),
+            "latitude": (("y", "x"), 49 + 0.003 * j + 0.0015 * i),
+        }
+    )
+    mask = np.random.default_rng(47).random((30, 20)) > 0.3
+    return grid_NEMO, xr.DataArray(mask.astype(int), dims=("y", "x"))
+
+
+class TestBuildGEMMask:
+    """Unit tests for build_GEM_mask() function."""
+
+    def test_build_GEM_mask(self):
+        grid_NEMO, mask_NEMO = _nemo_grid()
+        lon_GEM, lat_GEM = np.meshgrid(
+            np.linspace(236.4, 236.6, 12), np.linspace(48.98, 49.14, 9)
+        )
+        grid_GEM = xr.Dataset(
+            {
+                "longitude": (("y", "x"), lon_GEM),
+                "latitude": (("y", "x"), lat_GEM),
+            }
+        )
+        mask_GEM = grid_tools.build_GEM_mask(grid_GEM, grid_NEMO, mask_NEMO)
+
+        # Point by point calculation
+        expected = np.zeros(lon_GEM.shape, dtype=int)
+        for n, (lon, lat) in enumerate(zip(lon_GEM.ravel() - 360, lat_GEM.ravel())):
+            j, i = geo_tools.find_closest_model_point(
+                lon, lat, grid_NEMO["longitude"], grid_NEMO["latitude"]
+            )
+            if not np.isnan(j):
+                expected.flat[n] = mask_NEMO[j, i].values
+        assert mask_GEM.shape == lon_GEM.shape
+        np.testing.assert_array_equal(mask_GEM, expected)
+        assert 0 < mask_GEM.sum() < mask_GEM.size
+
+
+class TestMatrix:
+    """Unit tests for build_matrix(), save_matrix(), load_matrix(),
+    and use_matrix() functions.
+    """
+
+    @pytest.fixture
+    def files(self, tmp_path):
+        """Weights file for a 3x4 NEMO grid from a 5x6 operational grid,
+        and an operational file with 2 variables and 4 times.
+        """
+        rng = np.random.default_rng(48)
+        weightsfile, opsfile = tmp_path / "weights.nc", tmp_path / "ops.nc"
+        with nc.Dataset(weightsfile, "w") as f:
+            f.createDimension("y", 3)
+            f.createDimension("x", 4)
+            wgts = rng.random((4, 3, 4))
+            wgts /= wgts.sum(axis=0)
+            for k in range(4):
+                src = rng.integers(1, 31, (3, 4))
+                f.createVariable("src0{}".format(k + 1), int, ("y", "x"))[:] = src
+                f.createVariable("wgt0{}".format(k + 1), float, ("y", "x"))[:] = wgts[k]
+        with nc.Dataset(opsfile, "w") as f:
+            f.createDimension("time_counter", 4)
+            f.createDimension("y", 5)
+            f.createDimension("x", 6)
+            for var in ("tair", "qair"):
+                f.createVariable(var, float, ("time_counter", "y", "x"))[:] = (
+                    rng.random((4, 5, 6))
+                )
+        return str(weightsfile), str(opsfile)
+
+    def test_build_matrix(self, files):
+        weightsfile, opsfile = files
+        matrix, nemoshape = grid_tools.build_matrix(weightsfile, opsfile)
+        assert nemoshape == (3, 4)
+        assert matrix.shape == (12, 30)
+        np.testing.assert_allclose(matrix.sum(axis=1), 1)
+
+    def test_save_load_matrix(self, files, tmp_path):
+        weightsfile, opsfile = files
+        matrixfile = str(tmp_path / "matrix.npz")
+        matrix, nemoshape = grid_tools.build_matrix(
+            weightsfile, opsfile, matrixfile=matrixfile
+        )
+        loaded, loaded_shape = grid_tools.load_matrix(matrixfile)
+        assert loaded_shape == nemoshape
+        np.testing.assert_array_equal(loaded.toarray(), matrix.toarray())
+        # A saved matrix is used instead of the weights file
+        cached, cached_shape = grid_tools.build_matrix(
+            "missing.nc", opsfile, matrixfile=matrixfile
+        )
+        np.testing.assert_array_equal(cached.toarray(), matrix.toarray())
+
+    def test_use_matrix(self, files):
+        weightsfile, opsfile = files
+        matrix, nemoshape = grid_tools.build_matrix(weightsfile, opsfile)
+        ndata = grid_tools.use_matrix(opsfile, matrix, nemoshape, "tair", 2)
+        with nc.Dataset(opsfile) as f:
+            odata = f.variables["tair"][2]
+        assert ndata.shape == nemoshape
+        np.testing.assert_allclose(ndata, (matrix @ odata.ravel()).reshape(nemoshape))
+
+    def test_use_matrix_many_times_and_variables(self, files):
+        weightsfile, opsfile = files
+        matrix, nemoshape = grid_tools.build_matrix(weightsfile, opsfile)
+        ndata = grid_tools.use_matrix(
+            opsfile, matrix, nemoshape, ["tair", "qair"], slice(None)
+        )
+        assert list(ndata) == ["tair", "qair"]
+        for var in ndata:
+            assert ndata[var].shape == (4,) + nemoshape
+            for time in range(4):
+                np.testing.assert_allclose(
+                    ndata[var][time],
+                    grid_tools.use_matrix(opsfile, matrix, nemoshape, var, time),
+                )
+        ndata = grid_tools.use_matrix(opsfile, matrix, nemoshape, "qair", [3, 1])
+        np.testing.assert_allclose(
+            ndata[0], grid_tools.use_matrix(opsfile, matrix, nemoshape, "qair", 3)
+        )
+
+
+class TestBuildWeights:
+    """Unit tests for build_weights() function."""
+
+    @staticmethod
+    def _field(lons, lats):
+        return 2 * ((lons + 180) % 360 - 180) + 3 * lats
+
+    def test_analytic_field(self, tmp_path):
+        # Rotated, slightly curvilinear source grid in 0 to 360 longitudes
+        j, i = np.mgrid[0:20, 0:25]
+        theta = np.radians(20)
+        lons_src = 236.4 + 0.03 * (i * np.cos(theta) - j * np.sin(theta)) + 1e-4 * i * j
+        lats_src = 48.8 + 0.02 * (i * np.sin(theta) + j * np.cos(theta))
+        grid_NEMO, _ = _nemo_grid()
+        lons_NEMO = grid_NEMO["longitude"].values
+        lats_NEMO = grid_NEMO["latitude"].values
+        weightsfile = str(tmp_path / "weights.nc")
+        src, wgt = grid_tools.build_weights(
+            lons_src, lats_src, lons_NEMO, lats_NEMO, weightsfile=weightsfile
+        )
+        assert src.shape == wgt.shape == (4,) + lons_NEMO.shape
+        np.testing.assert_allclose(wgt.sum(axis=0), 1)
+
+        opsfile = str(tmp_path / "ops.nc")
+        with nc.Dataset(opsfile, "w") as f:
+            f.createDimension("time_counter", 1)
+            f.createDimension("y", 20)
+            f.createDimension("x", 25)
+            f.createVariable("field", float, ("time_counter", "y", "x"))[:] = (
+                self._field(lons_src, lats_src)
+            )
+        matrix, nemoshape = grid_tools.build_matrix(weightsfile, opsfile)
+        ndata = grid_tools.use_matrix(opsfile, matrix, nemoshape, "field", 0)
+        # Bilinear interpolation is exact for a field that is linear in lon/lat
+        np.testing.assert_allclose(ndata, self._field(lons_NEMO, lats_NEMO))
+
+    def test_outside_source_grid(self):
+        lons_src, lats_src = np.meshgrid(np.arange(4.0), np.arange(3.0))
+        lons = np.array([[0.5, 2.25, 5.0]])
+        lats = np.array([[0.5, 1.75, 1.0]])
+        src, wgt = grid_tools.build_weights(lons_src, lats_src, lons, lats)
+        np.testing.assert_array_equal(src[:, 0, 0], [1, 2, 6, 5])
+        np.testing.assert_allclose(wgt[:, 0, 0], 0.25)
+        np.testing.assert_allclose(
+            wgt[:, 0, 1], [0.75 * 0.25, 0.25 * 0.25, 0.25 * 0.75, 0.75 * 0.75]
+        )
+        np.testing.assert_array_equal(src[:, 0, 1], [7, 8, 12, 11])
+        np.testing.assert_array_equal(wgt[:, 0, 2], 0)
+
+
+class TestTimeDependentGrid:
+    """Unit tests for calculate_time_dependent_grid(), time_dependent_grid_U()
+    and time_dependent_grid_V() functions.
+    """
+
+    nt, nz, ny, nx = 7, 5, 6, 8
+
+    @pytest.fixture
+    def grid(self):
+        rng = np.random.default_rng(50)
+        shape = (self.nz, self.ny, self.nx)
+        tmask = (rng.random(shape) > 0.3).astype(int)
+        e3 = rng.uniform(1, 3, shape)
+        scale_factors = [rng.uniform(400, 500, shape[1:]) for _ in range(4)]
+        ssh = rng.normal(0, 1, (self.nt,) + shape[1:])
+        return e3, scale_factors, tmask, ssh
+
+    @staticmethod
+    def _assert_equal(result, expected):
+        assert set(result) == set(expected)
+        for key in expected:
+            np.testing.assert_allclose(result[key], expected[key])
+
+    def test_calculate_time_dependent_grid(self, grid):
+        e3, _, tmask, ssh = grid
+        input_vars = {"e3t_0": e3, "gdept_0": np.cumsum(e3, axis=0)}
+        result = grid_tools.calculate_time_dependent_grid(e3, tmask, ssh, input_vars)
+        H = grid_tools.calculate_H(e3, tmask)
+        adj = grid_tools.calculate_adjustment_factor(H, ssh)[:, np.newaxis]
+        self._assert_equal(
+            result, {"e3t_t": e3 * adj, "gdept_t": input_vars["gdept_0"] * adj}
+        )
+
+    @pytest.mark.parametrize("time_chunk", [None, 3])
+    def test_mesh_mask_t_axis(self, grid, time_chunk):
+        # Initial grids read from a mesh mask keep its leading t=1 axis
+        e3, scale_factors, tmask, ssh = grid
+        input_vars = {"e3t_0": e3[np.newaxis], "gdept_0": np.cumsum(e3, axis=0)}
+        result = grid_tools.calculate_time_dependent_grid(
+            e3, tmask, ssh, input_vars, time_chunk=time_chunk
+        )
+        H = grid_tools.calculate_H(e3, tmask)
+        adj = grid_tools.calculate_adjustment_factor(H, ssh)[:, np.newaxis]
+        self._assert_equal(
+            result, {"e3t_t": e3 * adj, "gdept_t": input_vars["gdept_0"] * adj}
+        )
+        assert result["e3t_t"].shape == (self.nt, self.nz, self.ny, self.nx)
+        result = grid_tools.time_dependent_grid_U(
+            e3,
+            *scale_factors,
+            tmask,
+            ssh,
+            {"e3u_0": e3[np.newaxis]},
+            time_chunk=time_chunk,
+            subset=(slice(1, 4), slice(2, 5)),
+        )
+        assert result["e3u_t"].shape == (self.nt, self.nz, 3, 3)
+
+    def test_chunked_subset_matches_full_domain(self, grid, tmp_path):
+        e3, _, tmask, ssh = grid
+        input_vars = {"e3t_0": e3, "gdept_0": np.cumsum(e3, axis=0)}
+        full = grid_tools.calculate_time_dependent_grid(e3, tmask, ssh, input_vars)
+        result = grid_tools.calculate_time_dependent_grid(
+            e3,
+            tmask,
+            ssh,
+            input_vars,
+            time_chunk=3,
+            subset=(slice(1, 4), slice(2, None)),
+            memmap=tmp_path,
+        )
+        self._assert_equal(result, {k: v[..., 1:4, 2:] for k, v in full.items()})
+        assert isinstance(result["e3t_t"], np.memmap)
+        assert (tmp_path / "e3t_t.npy").exists()
+
+    @pytest.mark.parametrize(
+        "func, key",
+        [
+            (grid_tools.time_dependent_grid_U, "u"),
+            (grid_tools.time_dependent_grid_V, "v"),
+        ],
+    )
+    @pytest.mark.parametrize(
+        "subset",
+        [
+            (slice(1, 4), slice(2, 5)),
+            (slice(3, None), slice(5, None)),
+            (slice(None), slice(None, -1)),
+        ],
+    )
+    def test_UV_subset_matches_full_domain(self, grid, func, key, subset):
+        e3, scale_factors, tmask, ssh = grid
+        input_vars = {"e3{}_0".format(key): e3}
+        args = (e3, *scale_factors, tmask, ssh, input_vars)
+        full = func(*args, return_ssh=True)
+        result = func(*args, return_ssh=True, time_chunk=2, subset=subset)
+        expected = {k: v[..., subset[0], subset[1]] for k, v in full.items()}
+        self._assert_equal(result, expected)
+
+    def test_out(self, grid):
+        e3, scale_factors, tmask, ssh = grid
+        args = (e3, *scale_factors, tmask, ssh, {"e3u_0": e3})
+        expected = grid_tools.time_dependent_grid_U(*args)
+        out = {"e3u_t": np.zeros((self.nt, self.nz, self.ny, self.nx), np.float32)}
+        result = grid_tools.time_dependent_grid_U(*args, time_chunk=4, out=out)
+        assert result["e3u_t"] is out["e3u_t"]
+        np.testing.assert_allclose(out["e3u_t"], expected["e3u_t"], rtol=1e-6)
+
+    def test_masked_ssh(self, grid):
+        e3, _, tmask, ssh = grid
+        mask = np.random.default_rng(0).random(ssh.shape) > 0.8
+        ssh = np.ma.masked_array(ssh, mask=mask)
+        result = grid_tools.calculate_time_dependent_grid(
+            e3, tmask, ssh, {"e3t_0": e3}, time_chunk=3
+        )
+        np.testing.assert_array_equal(
+            np.ma.getmaskarray(result["e3t_t"]),
+            np.broadcast_to(mask[:, None], (self.nt, self.nz, self.ny, self.nx)),
+        )
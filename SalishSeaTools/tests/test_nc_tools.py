@@ -17,7 +17,7 @@
 
 import datetime
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
 import arrow
 import dateutil
@@ -284,6 +284,58 @@ def test_timestamp_index_error(nc_dataset):
         nc_tools.timestamp(nc_dataset, 1)
 
 
+def test_get_datetime64s(nc_dataset):
+    """get_datetime64s returns expected numpy datetime64 array"""
+    nc_dataset.createDimension("time_counter")
+    time_counter = nc_dataset.createVariable("time_counter", float, ("time_counter",))
+    time_counter.time_origin = "2002-OCT-26 00:00:00"
+    time_counter[:] = np.array([0.5, 1.5, 2.5]) * 60 * 60
+    datetime64s = nc_tools.get_datetime64s(nc_dataset)
+    expected = np.array(
+        ["2002-10-26T00:30", "2002-10-26T01:30", "2002-10-26T02:30"],
+        dtype="datetime64[us]",
+    )
+    np.testing.assert_array_equal(datetime64s, expected)
+
+
+def test_get_datetime64s_tindex(nc_dataset):
+    """get_datetime64s returns expected time stamps at tindex"""
+    nc_dataset.createDimension("time_counter")
+    time_counter = nc_dataset.createVariable("time_counter", float, ("time_counter",))
+    time_counter.time_origin = "2002-OCT-26 00:00:00"
+    time_counter[:] = np.array([0.5, 1.5, 2.5]) * 60 * 60
+    datetime64s = nc_tools.get_datetime64s(nc_dataset, [2, 0])
+    expected = np.array(
+        ["2002-10-26T02:30", "2002-10-26T00:30"], dtype="datetime64[us]"
+    )
+    np.testing.assert_array_equal(datetime64s, expected)
+
+
+def test_get_datetime64s_index_error(nc_dataset):
+    """get_datetime64s raises IndexError for tindex out of range"""
+    nc_dataset.createDimension("time_counter")
+    time_counter = nc_dataset.createVariable("time_counter", float, ("time_counter",))
+    time_counter.time_origin = "2002-OCT-26 00:00:00"
+    time_counter[:] = np.array([8.5 * 60 * 60])
+    with pytest.raises(IndexError):
+        nc_tools.get_datetime64s(nc_dataset, 1)
+
+
+def test_get_datetimes(nc_dataset):
+    """get_datetimes returns expected timezone-aware datetime array"""
+    nc_dataset.createDimension("time_counter")
+    time_counter = nc_dataset.createVariable("time_counter", float, ("time_counter",))
+    time_counter.time_origin = "2002-OCT-26 00:00:00"
+    time_counter[:] = np.array([0.5, 1.5]) * 60 * 60
+    datetimes = nc_tools.get_datetimes(nc_dataset)
+    expected = [
+        arrow.get(2002, 10, 26, 0, 30, 0).datetime,
+        arrow.get(2002, 10, 26, 1, 30, 0).datetime,
+    ]
+    assert list(datetimes) == expected
+    assert datetimes[0].tzinfo == datetime.timezone.utc
+
+
 @pytest.mark.parametrize(
     "datetimes, expected",
     [
@@ -615,3 +667,526 @@ def test_check_dataset_attrs_car_attrs_good(capsys, nc_dataset):
     nc_tools.check_dataset_attrs(nc_dataset)
     out, err = capsys.readouterr()
     assert out == ""
+
+
+@pytest.fixture
+def sc_files(tmp_path):
+    """Return a list of 3 netCDF files that split a (time, z, y, x) variable
+    along the unlimited time_counter dimension, and the full variable values.
+    """
+    votemper = np.arange(9 * 2 * 3 * 4, dtype=float).reshape(9, 2, 3, 4)
+    files = []
+    for n, (start, end) in enumerate(((0, 4), (4, 5), (5, 9))):
+        filename = str(tmp_path / "sc_{}.nc".format(n))
+        with nc_tools.nc.Dataset(filename, "w") as dataset:
+            dataset.createDimension("time_counter")
+            dataset.createDimension("deptht", 2)
+            dataset.createDimension("y", 3)
+            dataset.createDimension("x", 4)
+            time_counter = dataset.createVariable(
+                "time_counter", float, ("time_counter",)
+            )
+            time_counter[:] = np.arange(start, end) * 3600
+            var = dataset.createVariable(
+                "votemper", float, ("time_counter", "deptht", "y", "x")
+            )
+            var[:] = votemper[start:end]
+            nav_lon = dataset.createVariable("nav_lon", float, ("y", "x"))
+            nav_lon[:] = np.ones((3, 4))
+        files.append(filename)
+    return files, votemper
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        (3,),
+        (slice(None),),
+        (slice(2, 7),),
+        (slice(1, 9, 2),),
+        (slice(None), 1, 2, 3),
+        (slice(3, 6), Ellipsis, 0),
+        (slice(0, 8), 0, slice(1, 3)),
+    ],
+)
+def test_scDataset_getitem(items, sc_files):
+    """scDataset concatenated variable indexing matches the full array"""
+    files, votemper = sc_files
+    with nc_tools.scDataset(files) as ds:
+        values = ds.variables["votemper"][items]
+    np.testing.assert_array_equal(values, votemper[items])
+
+
+def test_scDataset_coalesced_reads(sc_files):
+    """scDataset reads each file's run of time indices in a single read"""
+    files, votemper = sc_files
+    with nc_tools.scDataset(files) as ds:
+        var = ds.variables["votemper"]
+        runs = list(nc_tools._time_runs(var._fi[1:8], var._li[1:8]))
+    assert runs == [
+        (0, slice(1, 4), slice(0, 3)),
+        (1, slice(0, 1), slice(3, 4)),
+        (2, slice(0, 3), slice(4, 7)),
+    ]
+
+
+def test_scDataset_passthrough_variable(sc_files):
+    """scDataset passes non-time variables through to the first file"""
+    files, votemper = sc_files
+    with nc_tools.scDataset(files) as ds:
+        np.testing.assert_array_equal(ds.variables["nav_lon"][:], np.ones((3, 4)))
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        (slice(None),),
+        (slice(2, 7), 1),
+        (slice(None), Ellipsis, 2, 3),
+    ],
+)
+def test_scDataset_getitem_max_workers(items, sc_files):
+    """scDataset concatenated variable concurrent reads match the full array"""
+    files, votemper = sc_files
+    with nc_tools.scDataset(files, max_workers=4) as ds:
+        values = ds.variables["votemper"][items]
+    np.testing.assert_array_equal(values, votemper[items])
+
+
+def test_scDataset_max_workers_shared_slots(sc_files):
+    """scDataset concurrent reads with workers that share a file handle slot"""
+    files, votemper = sc_files
+    with patch.object(nc_tools, "getrlimit", return_value=(10, 10)):
+        with nc_tools.scDataset(files, max_workers=4) as ds:
+            values = ds.variables["votemper"][:]
+            assert ds._dsmgr._MAXOPEN == 2
+    np.testing.assert_array_equal(values, votemper)
+
+
+def test_scDataset_index_file_written(sc_files, tmp_path):
+    """scDataset writes a sidecar index when index_file does not exist"""
+    files, votemper = sc_files
+    index_file = tmp_path / "index.json"
+    with nc_tools.scDataset(files, index_file=index_file) as ds:
+        assert isinstance(ds.variables["nav_lon"], nc_tools.nc.Variable)
+    index = nc_tools.json.loads(index_file.read_text())
+    assert index["time_dim"] == "time_counter"
+    assert index["time_lengths"] == [4, 1, 4]
+    assert index["variables"]["votemper"]["shape"] == [4, 2, 3, 4]
+
+
+def test_scDataset_index_file_lazy(sc_files, tmp_path):
+    """scDataset constructed from a sidecar index opens files on demand"""
+    files, votemper = sc_files
+    index_file = tmp_path / "index.json"
+    nc_tools.scDataset(files, index_file=index_file).close()
+    with patch.object(nc_tools.nc, "Dataset", wraps=nc_tools.nc.Dataset) as m_ds:
+        with nc_tools.scDataset(files, index_file=index_file) as ds:
+            assert m_ds.call_count == 0
+            assert ds.variables["votemper"].shape == (9, 2, 3, 4)
+            assert ds.file_format == "NETCDF4"
+            values = ds.variables["votemper"][5:7, 1]
+            assert m_ds.call_count == 1
+            np.testing.assert_array_equal(ds.variables["nav_lon"][:], np.ones((3, 4)))
+            assert ds.variables["nav_lon"].dimensions == ("y", "x")
+    np.testing.assert_array_equal(values, votemper[5:7, 1])
+
+
+def test_scDataset_index_file_stale(sc_files, tmp_path):
+    """scDataset rebuilds a sidecar index that does not match the files"""
+    files, votemper = sc_files
+    index_file = tmp_path / "index.json"
+    nc_tools.scDataset(files[:2], index_file=index_file).close()
+    with nc_tools.scDataset(files, index_file=index_file) as ds:
+        assert ds.variables["votemper"].shape == (9, 2, 3, 4)
+    index = nc_tools.json.loads(index_file.read_text())
+    assert index["time_lengths"] == [4, 1, 4]
+
+
+def test_scDataset_cache_hits(sc_files):
+    """scDataset repeated reads are served from the block cache"""
+    files, votemper = sc_files
+    with nc_tools.scDataset(files, cache_size=2**20) as ds:
+        first = ds.variables["votemper"][:, 0, 1]
+        with patch.object(nc_tools.nc, "Dataset") as m_ds:
+            second = ds.variables["votemper"][:, 0, 1]
+            single = ds.variables["votemper"][3, 0, 1]
+        assert m_ds.call_count == 0
+        info = ds.cache_info()
+    np.testing.assert_array_equal(first, votemper[:, 0, 1])
+    np.testing.assert_array_equal(second, votemper[:, 0, 1])
+    np.testing.assert_array_equal(single, votemper[3, 0, 1])
+    assert (info.hits, info.misses, info.evictions) == (3, 4, 0)
+    # the single time read is a different block than the slice reads
+    assert info.currsize == (9 + 1) * 4 * 8
+
+
+def test_scDataset_cache_evictions(sc_files):
+    """scDataset block cache evicts least recently used blocks"""
+    files, votemper = sc_files
+    with nc_tools.scDataset(files, cache_size=4 * 4 * 8) as ds:
+        ds.variables["votemper"][0:5, 0, 1]
+        ds.variables["votemper"][5:9, 0, 1]
+        info = ds.cache_info()
+        ds.cache_clear()
+        assert ds.cache_info() == (0, 0, 0, 4 * 4 * 8, 0)
+    assert (info.hits, info.misses, info.evictions) == (0, 3, 2)
+    assert info.currsize == 4 * 4 * 8
+
+
+def test_scDataset_no_cache(sc_files):
+    """scDataset without a block cache has no cache statistics"""
+    files, votemper = sc_files
+    with nc_tools.scDataset(files) as ds:
+        assert ds.cache_info() is None
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        (slice(None, None, 3),),
+        (slice(8, 1, -3), 1),
+        (np.array([7, 0, 3, 3, -1]),),
+        ([2, 4, 6], Ellipsis, 3),
+        (np.array([True, False, True, True, False, False, True, True, False]),),
+        (np.array([], dtype=int),),
+    ],
+)
+def test_scDataset_getitem_fancy(items, sc_files):
+    """scDataset concatenated variable fancy indexing matches the full array"""
+    files, votemper = sc_files
+    with nc_tools.scDataset(files) as ds:
+        values = ds.variables["votemper"][items]
+    np.testing.assert_array_equal(values, votemper[items])
+
+
+def test_scDataset_strided_reads(sc_files):
+    """scDataset reads each file's regularly spaced time indices in one read"""
+    files, votemper = sc_files
+    with nc_tools.scDataset(files) as ds:
+        var = ds.variables["votemper"]
+        uniq = np.array([0, 2, 3, 4, 5, 7])
+        runs = list(nc_tools._time_runs(var._fi[uniq], var._li[uniq]))
+    assert runs == [
+        (0, slice(0, 3, 2), slice(0, 2)),
+        (0, slice(3, 4), slice(2, 3)),
+        (1, slice(0, 1), slice(3, 4)),
+        (2, slice(0, 3, 2), slice(4, 6)),
+    ]
+
+
+@pytest.fixture
+def subdomain_files(tmp_path):
+    """Return a 2x2 array of per-processor subdomain files of a 6x7 domain
+    and the full domain values of the votemper variable.
+    """
+    votemper = np.arange(5 * 2 * 6 * 7, dtype=float).reshape(5, 2, 6, 7)
+    filenames = np.empty((2, 2), dtype=object)
+    for j, (y1, y2) in enumerate(((0, 4), (4, 6))):
+        for i, (x1, x2) in enumerate(((0, 3), (3, 7))):
+            filename = str(tmp_path / "sub_{}{}.nc".format(j, i))
+            with nc_tools.nc.Dataset(filename, "w") as dataset:
+                dataset.createDimension("time_counter")
+                dataset.createDimension("deptht", 2)
+                dataset.createDimension("y", y2 - y1)
+                dataset.createDimension("x", x2 - x1)
+                time_counter = dataset.createVariable(
+                    "time_counter", float, ("time_counter",)
+                )
+                time_counter[:] = np.arange(5) * 3600
+                var = dataset.createVariable(
+                    "votemper", float, ("time_counter", "deptht", "y", "x")
+                )
+                var[:] = votemper[..., y1:y2, x1:x2]
+                nav_lon = dataset.createVariable("nav_lon", float, ("y", "x"))
+                nav_lon[:] = votemper[0, 0, y1:y2, x1:x2]
+            filenames[j, i] = filename
+    return filenames, votemper
+
+
+@pytest.mark.parametrize(
+    "time_chunk, max_workers",
+    [
+        (1, None),
+        (2, None),
+        (10, None),
+        (2, 2),
+    ],
+)
+def test_combine_subdomain(time_chunk, max_workers, subdomain_files, tmp_path):
+    """combine_subdomain recombines per-processor subdomain files"""
+    filenames, votemper = subdomain_files
+    outfilename = str(tmp_path / "combined.nc")
+    nc_tools.combine_subdomain(filenames, outfilename, time_chunk, max_workers)
+    with nc_tools.nc.Dataset(outfilename) as combined:
+        np.testing.assert_array_equal(combined.variables["votemper"][:], votemper)
+        np.testing.assert_array_equal(combined.variables["nav_lon"][:], votemper[0, 0])
+        np.testing.assert_array_equal(
+            combined.variables["time_counter"][:], np.arange(5) * 3600
+        )
+
+
+@pytest.fixture
+def cgrf_files(tmp_path):
+    """Create 2 days of CGRF-like pressure and temperature files and an
+    altitude file, and return the file name templates.
+    """
+    for day in (1, 2):
+        t_file = nc_tools.nc.Dataset(
+            tmp_path / "t2_y2002m10d{:02d}.nc".format(day), "w"
+        )
+        p_file = nc_tools.nc.Dataset(
+            tmp_path / "slp_y2002m10d{:02d}.nc".format(day), "w"
+        )
+        for dataset in (t_file, p_file):
+            dataset.createDimension("time_counter")
+            dataset.createDimension("y", 2)
+            dataset.createDimension("x", 3)
+        time_counter = t_file.createVariable("time_counter", float, ("time_counter",))
+        time_counter.setncatts(
+            {
+                "calendar": "gregorian",
+                "long_name": "time",
+                "title": "time",
+                "units": "hours since 2002-10-01",
+                "valid_range": [0, 1e6],
+            }
+        )
+        time_counter[:] = (day - 1) * 24 + np.arange(4)
+        for name in ("nav_lon", "nav_lat"):
+            var = t_file.createVariable(name, float, ("y", "x"))
+            var.setncatts(
+                {
+                    "long_name": name,
+                    "units": "degrees",
+                    "valid_max": 360,
+                    "valid_min": -360,
+                    "nav_model": "Default grid",
+                }
+            )
+            var[:] = np.ones((2, 3))
+        tair = t_file.createVariable("tair", float, ("time_counter", "y", "x"))
+        tair[:] = 280 + np.arange(4 * 2 * 3).reshape(4, 2, 3) + day
+        atmpres = p_file.createVariable("atmpres", float, ("time_counter", "y", "x"))
+        atmpres.setncatts(
+            {
+                "units": "Pa",
+                "valid_min": 0,
+                "valid_max": 2e5,
+                "missing_value": -1,
+                "axis": "TYX",
+            }
+        )
+        atmpres[:] = 1e5 - np.arange(4 * 2 * 3).reshape(4, 2, 3) * day
+        t_file.close()
+        p_file.close()
+    with nc_tools.nc.Dataset(tmp_path / "altitude.nc", "w") as dataset:
+        dataset.createDimension("y", 2)
+        dataset.createDimension("x", 3)
+        alt = dataset.createVariable("alt", float, ("y", "x"))
+        alt[:] = np.array([[0, 10, 100], [200, 500, 1000]])
+    return {
+        "p_file": str(tmp_path / "slp_y{day:YYYY}m{day:MM}d{day:DD}.nc"),
+        "t_file": str(tmp_path / "t2_y{day:YYYY}m{day:MM}d{day:DD}.nc"),
+        "alt_file": str(tmp_path / "altitude.nc"),
+    }
+
+
+@pytest.mark.parametrize("max_workers", [None, 2])
+def test_generate_pressure_files(max_workers, cgrf_files, tmp_path):
+    """generate_pressure_files matches generate_pressure_file for each day"""
+    start, end = arrow.get(2002, 10, 1), arrow.get(2002, 10, 2)
+    filenames = nc_tools.generate_pressure_files(
+        start,
+        end,
+        str(tmp_path / "slp_corr_y{day:YYYY}m{day:MM}d{day:DD}.nc"),
+        max_workers=max_workers,
+        **cgrf_files,
+    )
+    assert filenames == [
+        str(tmp_path / "slp_corr_y2002m10d01.nc"),
+        str(tmp_path / "slp_corr_y2002m10d02.nc"),
+    ]
+    for day, filename in zip(arrow.Arrow.range("day", start, end), filenames):
+        expected_file = str(tmp_path / "expected.nc")
+        nc_tools.generate_pressure_file(
+            expected_file,
+            cgrf_files["p_file"].format(day=day),
+            cgrf_files["t_file"].format(day=day),
+            cgrf_files["alt_file"],
+            day,
+        )
+        with nc_tools.nc.Dataset(filename) as slp, nc_tools.nc.Dataset(
+            expected_file
+        ) as expected:
+            np.testing.assert_array_equal(
+                slp.variables["atmpres"][:], expected.variables["atmpres"][:]
+            )
+            np.testing.assert_array_equal(
+                slp.variables["time_counter"][:], expected.variables["time_counter"][:]
+            )
+            assert slp.title == expected.title
+
+
+@pytest.mark.parametrize("max_workers", [None, 2])
+def test_generate_pressure_files_ops(max_workers, cgrf_files, tmp_path):
+    """generate_pressure_files(ops=True) corrects with the truncated height"""
+    start, end = arrow.get(2002, 10, 1), arrow.get(2002, 10, 2)
+    # Larger GEM domain that contains the 2x3 forcing grid at j=1, i=2
+    lon_a, lat_a = np.meshgrid(-125 + 0.1 * np.arange(6), 48 + 0.1 * np.arange(4))
+    hgt = 10 * np.arange(4 * 6, dtype=float).reshape(1, 4, 6)
+    with nc_tools.nc.Dataset(tmp_path / "hgt.nc", "w") as dataset:
+        dataset.createDimension("time", 1)
+        dataset.createDimension("y", 4)
+        dataset.createDimension("x", 6)
+        dataset.createVariable("HGT_surface", float, ("time", "y", "x"))[:] = hgt
+        dataset.createVariable("longitude", float, ("y", "x"))[:] = lon_a
+        dataset.createVariable("latitude", float, ("y", "x"))[:] = lat_a
+    for day in arrow.Arrow.range("day", start, end):
+        with nc_tools.nc.Dataset(cgrf_files["t_file"].format(day=day), "a") as t:
+            t.variables["nav_lon"][:] = lon_a[1:3, 2:5]
+            t.variables["nav_lat"][:] = lat_a[1:3, 2:5]
+    with patch.object(
+        nc_tools, "_truncate_height", wraps=nc_tools._truncate_height
+    ) as m_truncate, patch.object(
+        nc_tools, "ProcessPoolExecutor", wraps=nc_tools.ProcessPoolExecutor
+    ) as m_executor:
+        filenames = nc_tools.generate_pressure_files(
+            start,
+            end,
+            str(tmp_path / "slp_corr_y{day:YYYY}m{day:MM}d{day:DD}.nc"),
+            cgrf_files["p_file"],
+            cgrf_files["t_file"],
+            str(tmp_path / "hgt.nc"),
+            ops=True,
+            max_workers=max_workers,
+        )
+    # The height is truncated once and the workers receive it once each
+    assert m_truncate.call_count == 1
+    if max_workers is not None:
+        (alt,) = m_executor.call_args.kwargs["initargs"]
+        np.testing.assert_array_equal(alt, hgt[0, 1:3, 2:5])
+    for day, filename in zip(arrow.Arrow.range("day", start, end), filenames):
+        p_file = cgrf_files["p_file"].format(day=day)
+        t_file = cgrf_files["t_file"].format(day=day)
+        with nc_tools.nc.Dataset(p_file) as p, nc_tools.nc.Dataset(
+            t_file
+        ) as t, nc_tools.nc.Dataset(filename) as slp:
+            expected = nc_tools._slp(
+                hgt[0, 1:3, 2:5], p.variables["atmpres"][:], t.variables["tair"][:]
+            )
+            np.testing.assert_allclose(
+                slp.variables["atmpres"][:], expected.astype(np.float32)
+            )
+            np.testing.assert_allclose(slp.variables["nav_lon"][:], lon_a[1:3, 2:5])
+            assert slp.title.startswith("GRIB2")
+
+
+def test_generate_pressure_file_slp(cgrf_files, tmp_path):
+    """generate_pressure_file corrects each time step with _slp"""
+    day = arrow.get(2002, 10, 2)
+    filename = str(tmp_path / "slp_corr.nc")
+    p_file = cgrf_files["p_file"].format(day=day)
+    t_file = cgrf_files["t_file"].format(day=day)
+    nc_tools.generate_pressure_file(
+        filename, p_file, t_file, cgrf_files["alt_file"], day
+    )
+    with nc_tools.nc.Dataset(p_file) as p, nc_tools.nc.Dataset(
+        t_file
+    ) as t, nc_tools.nc.Dataset(cgrf_files["alt_file"]) as a, nc_tools.nc.Dataset(
+        filename
+    ) as slp:
+        for k in range(4):
+            expected = nc_tools._slp(
+                a.variables["alt"][:],
+                p.variables["atmpres"][k],
+                t.variables["tair"][k],
+            )
+            np.testing.assert_allclose(
+                slp.variables["atmpres"][k], expected.astype(np.float32)
+            )
+
+
+@pytest.mark.parametrize(
+    "points, stations",
+    [
+        (
+            {"Point Atkinson": (2, 1), "Victoria": (0, 3)},
+            ["Point Atkinson", "Victoria"],
+        ),
+        ([(2, 1), (0, 3), (2, 1)], [0, 1, 2]),
+    ],
+)
+def test_ssh_timeseries_at_points(points, stations, nc_dataset):
+    """ssh_timeseries_at_points matches ssh_timeseries_at_point for each point"""
+    nc_dataset.createDimension("time_counter")
+    nc_dataset.createDimension("y", 3)
+    nc_dataset.createDimension("x", 4)
+    ssh = nc_dataset.createVariable("sossheig", float, ("time_counter", "y", "x"))
+    ssh[:] = np.arange(2 * 3 * 4).reshape(2, 3, 4)
+    time_counter = nc_dataset.createVariable("time_counter", float, ("time_counter",))
+    time_counter.time_origin = "2002-OCT-26 00:00:00"
+    time_counter[:] = np.array([0.5, 1.5]) * 60 * 60
+    ssh_ts = nc_tools.ssh_timeseries_at_points(nc_dataset, points)
+    assert list(ssh_ts.station.values) == stations
+    ji = points.values() if isinstance(points, dict) else points
+    for station, (j, i) in zip(stations, ji):
+        expected = nc_tools.ssh_timeseries_at_point(nc_dataset, j, i, datetimes=True)
+        np.testing.assert_array_equal(ssh_ts.ssh.sel(station=station), expected.ssh)
+        assert (ssh_ts.j.sel(station=station), ssh_ts.i.sel(station=station)) == (j, i)
+    np.testing.assert_array_equal(
+        ssh_ts.time.values,
+        np.array(["2002-10-26T00:30", "2002-10-26T01:30"], dtype="datetime64[ns]"),
+    )
+
+
+def test_ssh_timeseries_at_points_reads_point_rows_and_cols(nc_dataset):
+    """ssh_timeseries_at_points only reads the rows and columns of the points"""
+
+    class RecordingVariable:
+        def __init__(self, var):
+            self.var, self.read_shapes = var, []
+
+        def __getattr__(self, name):
+            return getattr(self.var, name)
+
+        def __getitem__(self, key):
+            values = self.var[key]
+            self.read_shapes.append(values.shape)
+            return values
+
+    nc_dataset.createDimension("time_counter")
+    nc_dataset.createDimension("y", 30)
+    nc_dataset.createDimension("x", 40)
+    ssh = nc_dataset.createVariable("sossheig", float, ("time_counter", "y", "x"))
+    ssh[:] = np.arange(2 * 30 * 40).reshape(2, 30, 40)
+    time_counter = nc_dataset.createVariable("time_counter", float, ("time_counter",))
+    time_counter.time_origin = "2002-OCT-26 00:00:00"
+    time_counter[:] = np.array([0.5, 1.5]) * 60 * 60
+    recorder = RecordingVariable(nc_dataset.variables["sossheig"])
+    grid_T = Mock(variables={"sossheig": recorder, "time_counter": time_counter})
+    points = [(29, 0), (0, 39), (29, 39), (15, 20)]
+    ssh_ts = nc_tools.ssh_timeseries_at_points(grid_T, points)
+    assert recorder.read_shapes == [(2, 3, 3)]
+    np.testing.assert_array_equal(
+        ssh_ts.ssh.values, ssh[:][:, [29, 0, 29, 15], [0, 39, 39, 20]].T
+    )
+
+
+def test_uv_wind_timeseries_at_points(nc_dataset):
+    """uv_wind_timeseries_at_points returns u and v wind at each point"""
+    nc_dataset.createDimension("time_counter")
+    nc_dataset.createDimension("y", 3)
+    nc_dataset.createDimension("x", 4)
+    u_wind = nc_dataset.createVariable("u_wind", float, ("time_counter", "y", "x"))
+    u_wind[:] = np.arange(2 * 3 * 4).reshape(2, 3, 4)
+    v_wind = nc_dataset.createVariable("v_wind", float, ("time_counter", "y", "x"))
+    v_wind[:] = -np.arange(2 * 3 * 4).reshape(2, 3, 4)
+    time_counter = nc_dataset.createVariable("time_counter", float, ("time_counter",))
+    time_counter.time_origin = "2002-OCT-26 00:00:00"
+    time_counter[:] = np.array([0.5, 1.5]) * 60 * 60
+    wind_ts = nc_tools.uv_wind_timeseries_at_points(
+        nc_dataset, {"Sand Heads": (1, 2), "Sentry Shoal": (2, 0)}
+    )
+    np.testing.assert_array_equal(wind_ts.u.values, [[6, 18], [8, 20]])
+    np.testing.assert_array_equal(wind_ts.v.values, [[-6, -18], [-8, -20]])
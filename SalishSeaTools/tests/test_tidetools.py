@@ -15,8 +15,19 @@
 
 """Unit tests for the tidetools module."""
 
+import http.cookies
+import http.server
+import os
 import textwrap
+import threading
+import time
+import urllib.parse
+
+import netCDF4 as nc
 import numpy as np
+import pandas as pd
+import pytest
+import requests
 
 from salishsea_tools import tidetools
 
@@ -92,3 +103,566 @@ def test_get_run_length(tmp_path):
         """))
     run_length = tidetools.get_run_length("test_run", test_namelist.parent.parent)
     np.testing.assert_almost_equal(run_length, 2)
+
+
+def _tidal_signal(time, amps, phases, mean=0):
+    """Synthetic time series of the constituents in tidetools.FIT_CONSTITUENTS
+    with time in axis 0.
+    """
+    signal = np.full((time.size,) + amps.shape[1:], float(mean))
+    expand = (slice(None),) + (np.newaxis,) * (amps.ndim - 1)
+    for k, const in enumerate(tidetools.FIT_CONSTITUENTS[: amps.shape[0]]):
+        freq = tidetools.CorrTides[const]["freq"]
+        signal += amps[k] * np.cos(np.radians(freq * time[expand] - phases[k]))
+    return signal
+
+
+class TestFittitLstsq:
+    """Unit tests for fittit_lstsq() function."""
+
+    time = np.arange(0, 24 * 30, 0.5)
+
+    def test_recovers_constituents(self):
+        rng = np.random.default_rng(38)
+        amps = rng.uniform(0.1, 1, (8, 2, 3, 4))
+        phases = rng.uniform(-170, 170, (8, 2, 3, 4))
+        uaus = _tidal_signal(self.time, amps, phases, mean=0.5)
+        apparam = tidetools.fittit_lstsq(uaus, self.time, 8)
+        assert list(apparam) == list(tidetools.FIT_CONSTITUENTS)
+        for k, const in enumerate(apparam):
+            np.testing.assert_allclose(apparam[const]["amp"], amps[k])
+            np.testing.assert_allclose(apparam[const]["phase"], phases[k])
+
+    def test_matches_fittit(self):
+        rng = np.random.default_rng(0)
+        amps = rng.uniform(0.1, 1, (4, 3, 2))
+        phases = rng.uniform(-170, 170, (4, 3, 2))
+        uaus = _tidal_signal(self.time, amps, phases)
+        uaus[:, 1, 1] = 0
+        expected = tidetools.fittit(uaus, self.time, 4)
+        apparam = tidetools.fittit_lstsq(uaus, self.time, 4)
+        assert list(apparam) == list(expected)
+        for const in expected:
+            for key in ("amp", "phase"):
+                np.testing.assert_array_equal(
+                    apparam[const][key].mask, expected[const][key].mask
+                )
+                np.testing.assert_allclose(
+                    apparam[const][key].compressed(),
+                    expected[const][key].compressed(),
+                    atol=1e-6,
+                )
+
+    def test_1d_time_series(self):
+        amps, phases = np.array([0.8, 0.3]), np.array([45.0, -120.0])
+        uaus = _tidal_signal(self.time, amps, phases)
+        apparam = tidetools.fittit_lstsq(uaus, self.time, 2)
+        assert apparam["M2"]["amp"].shape == ()
+        np.testing.assert_allclose(apparam["M2"]["amp"], 0.8)
+        np.testing.assert_allclose(apparam["K1"]["phase"], -120)
+
+    def test_odd_nconst_leaves_last_constituent_masked(self):
+        amps = np.array([0.8, 0.3, 0.2, 0.1])
+        phases = np.array([45.0, -120.0, 10.0, 60.0])
+        uaus = _tidal_signal(self.time, amps, phases)
+        apparam = tidetools.fittit_lstsq(uaus, self.time, 3)
+        assert list(apparam) == ["M2", "K1", "S2", "O1"]
+        np.testing.assert_allclose(apparam["S2"]["amp"], 0.2)
+        assert apparam["O1"]["amp"].mask.all()
+
+
+class TestHarmonicAnalyser:
+    """Unit tests for HarmonicAnalyser class."""
+
+    time = np.arange(0, 24 * 30, 0.5)
+
+    @staticmethod
+    def _signal(time):
+        rng = np.random.default_rng(39)
+        amps = rng.uniform(0.1, 1, (8, 3, 2))
+        phases = rng.uniform(-170, 170, (8, 3, 2))
+        uaus = _tidal_signal(time, amps, phases, mean=0.2)
+        uaus[:, 2, 0] = 0
+        return uaus
+
+    def _assert_apparam_equal(self, apparam, expected):
+        assert list(apparam) == list(expected)
+        for const in expected:
+            for key in ("amp", "phase"):
+                np.testing.assert_array_equal(
+                    apparam[const][key].mask, expected[const][key].mask
+                )
+                np.testing.assert_allclose(
+                    apparam[const][key].compressed(),
+                    expected[const][key].compressed(),
+                    atol=1e-8,
+                )
+
+    def test_update_in_pieces(self):
+        uaus = self._signal(self.time)
+        analyser = tidetools.HarmonicAnalyser(8)
+        for piece in np.array_split(np.arange(self.time.size), 5):
+            analyser.update(uaus[piece], self.time[piece])
+        assert analyser.ntimes == self.time.size
+        self._assert_apparam_equal(
+            analyser.results(), tidetools.fittit_lstsq(uaus, self.time, 8)
+        )
+
+    def test_merge(self):
+        uaus = self._signal(self.time)
+        half = self.time.size // 2
+        first = tidetools.HarmonicAnalyser(6).update(uaus[:half], self.time[:half])
+        second = tidetools.HarmonicAnalyser(6).update(uaus[half:], self.time[half:])
+        merged = tidetools.HarmonicAnalyser(6).merge(first).merge(second)
+        self._assert_apparam_equal(
+            merged.results(), tidetools.fittit_lstsq(uaus, self.time, 6)
+        )
+
+    def test_shape_mismatch(self):
+        analyser = tidetools.HarmonicAnalyser(2)
+        analyser.update(np.zeros((4, 3)), np.arange(4))
+        with pytest.raises(ValueError):
+            analyser.update(np.zeros((4, 2)), np.arange(4))
+
+    def test_merge_different_constituents(self):
+        with pytest.raises(ValueError):
+            tidetools.HarmonicAnalyser(2).merge(tidetools.HarmonicAnalyser(4))
+
+    def test_results_without_data(self):
+        with pytest.raises(ValueError):
+            tidetools.HarmonicAnalyser(2).results()
+
+
+def _filter_loop(record, winlen, weight, centerval):
+    """Filter record along axis 0 one time step at a time, like the original
+    filter_timeseries() loop.
+    """
+    filtered = record.copy()
+    w = (winlen - 1) // 2
+    for i in range(record.shape[0]):
+        W = min(i, w, record.shape[0] - i - 1)
+        Weight = np.append(weight[:W][::-1], np.append(centerval, weight[:W]))
+        Weight = Weight / Weight.sum()
+        Weight = Weight.reshape((-1,) + (1,) * (record.ndim - 1))
+        if W > 0:
+            filtered[i] = np.sum(record[i - W : i + W + 1] * Weight, axis=0)
+        else:
+            filtered[i] = record[i]
+    return filtered
+
+
+class TestFilterTimeseries:
+    """Unit tests for filter_timeseries() function."""
+
+    @pytest.mark.parametrize("method", ["box", "doodson"])
+    def test_linear_record_unchanged(self, method):
+        # Symmetric windows, including the shrunken ones at the edges,
+        # preserve a linear trend
+        record = np.arange(100, dtype=float)[:, np.newaxis] * np.array([1, -2, 0.5])
+        filtered = tidetools.filter_timeseries(record, method=method)
+        np.testing.assert_allclose(filtered, record, atol=1e-12)
+
+    def test_box_running_mean(self):
+        record = np.random.default_rng(40).random(30)
+        filtered = tidetools.filter_timeseries(record, winlen=5)
+        np.testing.assert_allclose(
+            filtered[2:-2], np.convolve(record, np.ones(5) / 5, "valid")
+        )
+        np.testing.assert_allclose(filtered[1], record[:3].mean())
+        assert filtered[0] == record[0]
+        assert filtered[-1] == record[-1]
+
+    @pytest.mark.parametrize("method", ["box", "doodson"])
+    def test_axis_and_chunks(self, method):
+        record = np.random.default_rng(41).random((100, 3, 4))
+        expected = tidetools.filter_timeseries(record, method=method)
+        filtered = tidetools.filter_timeseries(
+            np.moveaxis(record, 0, 2), method=method, axis=2, chunk_size=7
+        )
+        np.testing.assert_allclose(np.moveaxis(filtered, 2, 0), expected)
+
+    @pytest.mark.parametrize("chunk_size", [None, 7])
+    def test_masked_record(self, chunk_size):
+        rng = np.random.default_rng(40)
+        mask = rng.random((100, 3, 4)) > 0.9
+        # Land point, a single masked time step, and a masked stretch longer
+        # than the window
+        mask[:, 0, 0] = True
+        mask[45, 1, 1] = True
+        mask[30:80, 2, 3] = True
+        record = np.ma.masked_array(
+            np.where(mask, 1e20, rng.random(mask.shape)), mask=mask
+        )
+        filtered = tidetools.filter_timeseries(record, winlen=11, chunk_size=chunk_size)
+        expected = _filter_loop(record, 11, np.ones(5, dtype=int), 1)
+        np.testing.assert_array_equal(filtered.mask, np.ma.getmaskarray(expected))
+        assert filtered.mask[50, 0, 0] and filtered.mask[50, 2, 3]
+        np.testing.assert_allclose(filtered.compressed(), expected.compressed())
+
+    def test_netcdf_variable_out(self, tmp_path):
+        record = np.random.default_rng(41).random((100, 3))
+        with nc.Dataset(tmp_path / "record.nc", "w") as ds:
+            ds.createDimension("t", 100)
+            ds.createDimension("x", 3)
+            ds.createVariable("record", float, ("t", "x"))[:] = record
+            out = ds.createVariable("filtered", float, ("t", "x"))
+            filtered = tidetools.filter_timeseries(
+                ds.variables["record"], method="doodson", chunk_size=10, out=out
+            )
+            assert filtered is out
+            np.testing.assert_allclose(
+                out[:], tidetools.filter_timeseries(record, method="doodson")
+            )
+
+    def test_invalid_method(self):
+        with pytest.raises(ValueError):
+            tidetools.filter_timeseries(np.zeros(10), method="foo")
+
+
+class TestPredictTide:
+    """Unit tests for predict_tide() function."""
+
+    time = np.arange(0, 24 * 30, 0.5)
+
+    def test_matches_fit_function(self):
+        params = (0.9, 30.0, 0.5, -60.0, 0.2, 100.0, 0.3, 170.0)
+        apparam = {
+            const: {
+                "amp": np.array(params[2 * k]),
+                "phase": np.array(params[2 * k + 1]),
+            }
+            for k, const in enumerate(tidetools.FIT_CONSTITUENTS[:4])
+        }
+        expected = tidetools.quadruple(self.time, *params, 0.25)
+        tide = tidetools.predict_tide(self.time, apparam, mean=0.25, nodal=False)
+        np.testing.assert_allclose(tide, expected)
+
+    def test_reconstructs_fitted_signal(self):
+        rng = np.random.default_rng(42)
+        amps = rng.uniform(0.1, 1, (8, 5))
+        phases = rng.uniform(-170, 170, (8, 5))
+        signal = _tidal_signal(self.time, amps, phases)
+        apparam = tidetools.fittit_lstsq(signal, self.time, 8)
+        tide = tidetools.predict_tide(self.time, apparam, nodal=False)
+        assert tide.shape == (self.time.size, 5)
+        np.testing.assert_allclose(tide, signal, atol=1e-10)
+
+    def test_nodal_corrections(self):
+        rng = np.random.default_rng(43)
+        amps = rng.uniform(0.1, 1, (2, 3))
+        phases = rng.uniform(-170, 170, (2, 3))
+        signal = _tidal_signal(self.time, amps, phases)
+        # Nodally corrected constants, as in ellipse.get_params()
+        apparam = {
+            const: {
+                "amp": amps[k] / tidetools.CorrTides[const]["ft"],
+                "phase": phases[k] + tidetools.CorrTides[const]["uvt"],
+            }
+            for k, const in enumerate(("M2", "K1"))
+        }
+        tide = tidetools.predict_tide(self.time, apparam)
+        np.testing.assert_allclose(tide, signal, atol=1e-10)
+
+    def test_datetime64_times(self):
+        apparam = {"M2": {"amp": np.ones(2), "phase": np.zeros(2)}}
+        reftime = np.datetime64("2014-09-10T00:00")
+        times = reftime + np.arange(48).astype("timedelta64[h]")
+        np.testing.assert_allclose(
+            tidetools.predict_tide(times, apparam),
+            tidetools.predict_tide(np.arange(48.0), apparam),
+        )
+
+
+class TestCompositeHarmonics:
+    """Unit tests for composite_harmonics() function."""
+
+    variables = ("M2_eta_real", "M2_eta_imag", "K1_eta_real", "K1_eta_imag")
+
+    @pytest.fixture
+    def runs(self, tmp_path):
+        """Two runs of 2 and 1 days with harmonics on a 5x4 grid."""
+        rng = np.random.default_rng(43)
+        data = {}
+        for runname, nitend in (("run1", 3456), ("run2", 1728)):
+            run_dir = tmp_path / runname
+            run_dir.mkdir()
+            (run_dir / "namelist").write_text(textwrap.dedent(f"""
+                &nam_diaharm
+                    nit000_han = 1
+                    nitend_han = {nitend}
+                &end
+
+                &namdom
+                   rn_rdt = 50.
+                &end
+                """))
+            data[runname] = {var: rng.random((1, 5, 4)) for var in self.variables}
+            with nc.Dataset(run_dir / "Tidal_Harmonics_eta.nc", "w") as ds:
+                ds.createDimension("t", 1)
+                ds.createDimension("y", 5)
+                ds.createDimension("x", 4)
+                for var, values in data[runname].items():
+                    ds.createVariable(var, float, ("t", "y", "x"))[:] = values
+        tidetools.composite_harmonics.cache_clear()
+        yield tmp_path, data
+        tidetools.composite_harmonics.cache_clear()
+
+    @pytest.mark.parametrize("chunk_size", [None, 2])
+    def test_weighted_mean(self, runs, chunk_size):
+        loc, data = runs
+        results = tidetools.composite_harmonics(
+            ["run1", "run2"], str(loc), self.variables, chunk_size=chunk_size
+        )
+        for var in self.variables:
+            expected = (2 * data["run1"][var][0] + data["run2"][var][0]) / 3
+            np.testing.assert_allclose(results[var], expected)
+
+    def test_cached_by_run_list(self, runs):
+        loc, data = runs
+        first = tidetools.composite_harmonics(
+            ("run1", "run2"), str(loc), self.variables
+        )
+        second = tidetools.composite_harmonics(
+            ["run1", "run2"], str(loc), self.variables
+        )
+        assert tidetools.composite_harmonics.cache_info().hits == 1
+        for var in self.variables:
+            assert np.shares_memory(second[var].data, first[var].data)
+            assert np.shares_memory(second[var].mask, first[var].mask)
+        other = tidetools.composite_harmonics(["run1"], str(loc), self.variables)
+        np.testing.assert_allclose(other["K1_eta_imag"], data["run1"]["K1_eta_imag"][0])
+
+    def test_cache_cannot_be_modified(self, runs):
+        loc, data = runs
+        first = tidetools.composite_harmonics(["run1"], str(loc), self.variables)
+        with pytest.raises(ValueError):
+            first["M2_eta_real"][0, 0] = 0
+        with pytest.raises(ValueError):
+            first["M2_eta_real"][0, 0] = np.ma.masked
+        with pytest.raises(ValueError):
+            first["M2_eta_real"].mask[0, 0] = True
+        with pytest.raises(ValueError):
+            first["M2_eta_real"].mask = True
+        del first["K1_eta_imag"]
+        second = tidetools.composite_harmonics(["run1"], str(loc), self.variables)
+        assert tidetools.composite_harmonics.cache_info().hits == 1
+        assert not second["M2_eta_real"].mask.any()
+        np.testing.assert_array_equal(
+            second["K1_eta_imag"], data["run1"]["K1_eta_imag"][0]
+        )
+
+    def test_get_composite_harms(self, runs):
+        loc, data = runs
+        M2_amp, K1_amp, M2_pha, K1_pha = tidetools.get_composite_harms(
+            ("run1", "run2"), str(loc)
+        )
+        real = (2 * data["run1"]["M2_eta_real"][0] + data["run2"]["M2_eta_real"][0]) / 3
+        imag = (2 * data["run1"]["M2_eta_imag"][0] + data["run2"]["M2_eta_imag"][0]) / 3
+        np.testing.assert_allclose(M2_amp, np.hypot(real, imag))
+        np.testing.assert_allclose(M2_pha, -np.degrees(np.arctan2(imag, real)))
+
+
+class _DFOWlevHandler(http.server.BaseHTTPRequestHandler):
+    """Local stand-in for the DFO water level data web service.
+
+    Like the DFO site, the station of a download is remembered in a session
+    cookie by the form POST, and the data GET fails if the cookie is for
+    a different station. Form POSTs for station 0 fail.
+    """
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append(("POST", self.path))
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        if query["no"][0] == "0":
+            self.send_error(500)
+            return
+        # Give concurrent downloads the chance to interleave
+        time.sleep(self.server.post_delay)
+        self.send_response(200)
+        self.send_header("Set-Cookie", "station={}; Path=/".format(query["no"][0]))
+        self.end_headers()
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path))
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        cookie = http.cookies.SimpleCookie(self.headers.get("Cookie", ""))
+        if "station" not in cookie or not query["Name"][0].startswith(
+            cookie["station"].value + "-"
+        ):
+            self.send_error(409)
+            return
+        body = "Station_Name,{}\n".format(query["Name"][0]).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGetDFOWlev:
+    """Unit tests for get_dfo_wlev(), get_dfo_wlevs() & get_all_perm_dfo_wlev()."""
+
+    @pytest.fixture
+    def server(self):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _DFOWlevHandler)
+        server.requests = []
+        server.post_delay = 0
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    @staticmethod
+    def _base_url(server):
+        return "http://127.0.0.1:{}/".format(server.server_address[1])
+
+    def test_get_dfo_wlev(self, server, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        outfile = tidetools.get_dfo_wlev(
+            7795, "01-JAN-2010", "31-JAN-2010", base_url=self._base_url(server)
+        )
+        assert outfile == "wlev_7795_01-JAN-2010_31-JAN-2010.csv"
+        assert (tmp_path / outfile).read_text() == (
+            "Station_Name,7795-01-JAN-2010_slev.csv\n"
+        )
+        assert [method for method, path in server.requests] == ["POST", "GET"]
+
+    def test_cache(self, server, tmp_path):
+        kwargs = {
+            "cache_dir": str(tmp_path / "cache"),
+            "base_url": self._base_url(server),
+        }
+        first = tidetools.get_dfo_wlev(7795, "01-JAN-2010", "31-JAN-2010", **kwargs)
+        second = tidetools.get_dfo_wlev(7795, "01-JAN-2010", "31-JAN-2010", **kwargs)
+        assert first == second == str(tmp_path / "cache" / os.path.basename(first))
+        assert len(server.requests) == 2
+        tidetools.get_dfo_wlev(7795, "01-FEB-2010", "28-FEB-2010", **kwargs)
+        assert len(server.requests) == 4
+        assert len(os.listdir(tmp_path / "cache")) == 2
+
+    def test_get_dfo_wlevs(self, server, tmp_path):
+        downloads = [
+            (7795, "01-JAN-2010", "31-JAN-2010"),
+            (7795, "01-FEB-2010", "28-FEB-2010"),
+            (7735, "01-JAN-2010", "31-JAN-2010"),
+        ]
+        outfiles = tidetools.get_dfo_wlevs(
+            downloads, cache_dir=str(tmp_path), base_url=self._base_url(server)
+        )
+        for (station_no, start_date, end_date), outfile in zip(downloads, outfiles):
+            assert os.path.basename(outfile) == "wlev_{}_{}_{}.csv".format(
+                station_no, start_date, end_date
+            )
+            assert "{}-{}".format(station_no, start_date) in open(outfile).read()
+        assert len(server.requests) == 6
+
+    def test_get_dfo_wlevs_sessions_isolated(self, server, tmp_path):
+        server.post_delay = 0.05
+        downloads = [
+            (station_no, "01-JAN-2010", "31-JAN-2010") for station_no in range(1, 9)
+        ]
+        outfiles = tidetools.get_dfo_wlevs(
+            downloads, cache_dir=str(tmp_path), base_url=self._base_url(server)
+        )
+        for (station_no, start_date, end_date), outfile in zip(downloads, outfiles):
+            assert "{}-{}".format(station_no, start_date) in open(outfile).read()
+
+    def test_form_post_error(self, server, tmp_path):
+        with pytest.raises(requests.HTTPError):
+            tidetools.get_dfo_wlevs(
+                [(0, "01-JAN-2010", "31-JAN-2010")],
+                cache_dir=str(tmp_path),
+                base_url=self._base_url(server),
+            )
+        assert [method for method, path in server.requests] == ["POST"]
+        assert os.listdir(tmp_path) == []
+
+    def test_get_all_perm_dfo_wlev(self, server, tmp_path):
+        kwargs = {"cache_dir": str(tmp_path), "base_url": self._base_url(server)}
+        outfiles = tidetools.get_all_perm_dfo_wlev(
+            "01-JAN-2010", "31-JAN-2010", **kwargs
+        )
+        assert list(outfiles) == list(tidetools.DFO_PERM_WLEV_STATIONS)
+        assert len(server.requests) == 2 * len(outfiles)
+        tidetools.get_all_perm_dfo_wlev("01-JAN-2010", "31-JAN-2010", **kwargs)
+        assert len(server.requests) == 2 * len(outfiles)
+
+
+class TestWlevHarmDiffs:
+    """Unit tests for wlev_harm_diffs() function."""
+
+    def test_wlev_harm_diffs(self):
+        X, Y = np.meshgrid(-124 + 0.01 * np.arange(4), 49 + 0.005 * np.arange(3))
+        mod_M2_amp = np.arange(12.0).reshape(3, 4) / 10
+        mod_K1_amp = mod_M2_amp / 2
+        mod_M2_pha = np.full((3, 4), 370.0)
+        mod_K1_pha = np.full((3, 4), -20.0)
+        meas_wl_harm = pd.DataFrame(
+            {
+                "Site": ["A", "B", "Far away"],
+                "Lat": [49.0, 49.01, 0],
+                "Lon": [124.0, 123.98, 0],
+                "M2_amp": [10.0, 80.0, 50.0],
+                "M2_pha": [10.0, 40.0, 0.0],
+                "K1_amp": [5.0, 40.0, 20.0],
+                "K1_pha": [340.0, 0.0, 0.0],
+            }
+        )
+        diffs = tidetools.wlev_harm_diffs(
+            meas_wl_harm, mod_M2_amp, mod_K1_amp, mod_M2_pha, mod_K1_pha, X, Y
+        )
+        assert list(diffs.columns) == tidetools.WLEV_HARM_DIFFS_COLUMNS
+        np.testing.assert_array_equal(diffs["Station Number"], [1, 2, 3])
+        np.testing.assert_allclose(diffs["Modelled M2 amp"][:2], [0, 1.0])
+        np.testing.assert_allclose(diffs["Modelled M2 phase"][:2], [10, 10])
+        np.testing.assert_allclose(diffs["Modelled K1 phase"][:2], [340, 340])
+        np.testing.assert_allclose(diffs["Observed M2 amp"], [0.1, 0.8, 0.5])
+        # Station A: identical K1 phases, so differences are the amplitude diff
+        np.testing.assert_allclose(diffs["K1 Difference Foreman"][0], 0.05)
+        np.testing.assert_allclose(diffs["K1 Difference Masson"][0], 0.05 / np.sqrt(2))
+        # Station B
+        Am, Ao, dg = 1.0, 0.8, np.radians(30)
+        np.testing.assert_allclose(
+            diffs["M2 Difference Foreman"][1],
+            np.sqrt(Am**2 + Ao**2 - 2 * Am * Ao * np.cos(dg)),
+        )
+        modelled = [column for column in diffs.columns[4:] if "Observed" not in column]
+        assert diffs.loc[2, modelled].isna().all()
+
+
+class TestFindModelLevel:
+    """Unit tests for find_model_level() function."""
+
+    model_depths = np.array([0.5, 1.5, 2.5, 4.0, 7.0])
+
+    @pytest.mark.parametrize(
+        "depth, expected",
+        [(0.2, 0), (1.0, 0), (1.7, 1), (2.5, 2), (3.3, 3), (5.5, 3), (10, 4)],
+    )
+    def test_scalar(self, depth, expected):
+        idx = tidetools.find_model_level(depth, self.model_depths)
+        assert idx == expected
+
+    @pytest.mark.parametrize(
+        "depth, expected",
+        [(0.2, -0.3), (0.5, 0), (1.0, 0.5), (1.7, 1.2), (3.25, 2.5), (10, 4)],
+    )
+    def test_scalar_fractional(self, depth, expected):
+        idx = tidetools.find_model_level(depth, self.model_depths, fractional=True)
+        np.testing.assert_allclose(idx, expected)
+        assert isinstance(idx, (float, np.floating)) == (expected % 1 != 0)
+
+    @pytest.mark.parametrize("fractional", [False, True])
+    def test_array(self, fractional):
+        depths = np.linspace(0, 10, 101).reshape(1, 101)
+        idx = tidetools.find_model_level(depths, self.model_depths, fractional)
+        assert idx.shape == depths.shape
+        expected = [
+            tidetools.find_model_level(depth, self.model_depths, fractional)
+            for depth in depths.ravel()
+        ]
+        np.testing.assert_array_equal(idx.ravel(), expected)
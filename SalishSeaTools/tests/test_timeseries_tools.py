@@ -0,0 +1,217 @@
+# Copyright 2013 – present by the SalishSeaCast contributors
+# and The University of British Columbia
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    https://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unit tests for timeseries_tools module."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from salishsea_tools import timeseries_tools
+
+
+@pytest.fixture
+def mask():
+    """Return a mesh mask dataset for a 2x3x4 grid with some land points."""
+    tmask = np.ones((1, 2, 3, 4), dtype=int)
+    tmask[0, :, 0, 0] = 0
+    tmask[0, 1, 2, :] = 0
+    gdept_1d = np.array([[0.5, 1.5]])
+    return xr.Dataset(
+        {
+            "tmask": (["t", "z", "y", "x"], tmask),
+            "gdept_0": (
+                ["t", "z", "y", "x"],
+                np.broadcast_to(gdept_1d[..., None, None], (1, 2, 3, 4)),
+            ),
+            "gdept_1d": (["t", "z"], gdept_1d),
+        },
+        coords={"z": np.arange(2), "y": np.arange(3), "x": np.arange(4)},
+    )
+
+
+@pytest.fixture
+def results_files(tmp_path):
+    """Create 3 daily results files with 2, 3 and 2 time steps of a
+    votemper field, and return their filenames and the full field values.
+    """
+    votemper = np.arange(7 * 2 * 3 * 4, dtype=float).reshape(7, 2, 3, 4)
+    times = pd.date_range("2017-01-01 00:30", periods=7, freq="h")
+    filenames = []
+    for n, (start, end) in enumerate(((0, 2), (2, 5), (5, 7))):
+        filename = str(tmp_path / "SalishSea_1h_{}_grid_T.nc".format(n))
+        xr.Dataset(
+            {
+                "votemper": (
+                    ["time_counter", "deptht", "y", "x"],
+                    votemper[start:end],
+                )
+            },
+            coords={"time_counter": times[start:end]},
+        ).to_netcdf(filename)
+        filenames.append(filename)
+    return filenames, votemper, times
+
+
+@pytest.mark.parametrize(
+    "memmap, max_workers",
+    [
+        (False, None),
+        (True, None),
+        (False, 2),
+        (True, 3),
+    ],
+)
+def test_load_NEMO_timeseries_ts(memmap, max_workers, mask, results_files, tmp_path):
+    """load_NEMO_timeseries returns water point timeseries from all files"""
+    filenames, votemper, times = results_files
+    data, coords = timeseries_tools.load_NEMO_timeseries(
+        filenames,
+        mask,
+        "votemper",
+        "deptht",
+        index=0,
+        shape="ts",
+        memmap=str(tmp_path / "data.npy") if memmap else None,
+        max_workers=max_workers,
+    )
+    water = mask.tmask.values[0, 0].astype(bool)
+    np.testing.assert_array_equal(data, votemper[:, 0][:, water])
+    np.testing.assert_array_equal(coords["date"], times.values)
+    if memmap:
+        np.testing.assert_array_equal(np.load(tmp_path / "data.npy"), data)
+
+
+def test_load_NEMO_timeseries_opens_files_once(
+    mask, results_files, tmp_path, monkeypatch
+):
+    """load_NEMO_timeseries opens each file once when reading sequentially"""
+    filenames, votemper, times = results_files
+    opened = []
+    open_dataset = xr.open_dataset
+
+    def counting_open_dataset(filename, *args, **kwargs):
+        opened.append(filename)
+        return open_dataset(filename, *args, **kwargs)
+
+    monkeypatch.setattr(timeseries_tools.xr, "open_dataset", counting_open_dataset)
+    data, coords = timeseries_tools.load_NEMO_timeseries(
+        filenames,
+        mask,
+        "votemper",
+        "deptht",
+        shape="ts",
+        memmap=str(tmp_path / "data.npy"),
+    )
+    assert opened == filenames
+    water = mask.tmask.values[0, 0].astype(bool)
+    np.testing.assert_array_equal(data, votemper[:, 0][:, water])
+    assert np.load(tmp_path / "data.npy").shape == (7, water.sum())
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        ["data.npy"] + [os.path.basename(filename) for filename in filenames]
+    )
+
+
+def test_load_NEMO_timeseries_grid(mask, results_files):
+    """load_NEMO_timeseries returns gridded timeseries with land zeroed"""
+    filenames, votemper, times = results_files
+    data, coords = timeseries_tools.load_NEMO_timeseries(
+        filenames, mask, "votemper", "deptht", index=1
+    )
+    water = mask.tmask.values[0, 1].astype(bool)
+    np.testing.assert_array_equal(data, np.where(water, votemper[:, 1], 0))
+    np.testing.assert_array_equal(coords["date"], times.values)
+
+
+def test_reshape_to_ts(mask):
+    """reshape_to_ts trims land points at all times"""
+    tmask, coords, ngrid, ngrid_water = timeseries_tools.reshape_coords(mask, "deptht")
+    data_grid = np.arange(2 * 3 * 4).reshape(2, 3, 4)
+    data_trim = timeseries_tools.reshape_to_ts(data_grid, tmask, ngrid, ngrid_water)
+    water = mask.tmask.values[0, 0].astype(bool)
+    np.testing.assert_array_equal(data_trim, data_grid[:, water])
+    assert data_trim.dtype == float
+
+
+def test_reshape_to_grid(mask):
+    """reshape_to_grid puts water point data on the grid with land zeroed"""
+    tmask, coords, ngrid, ngrid_water = timeseries_tools.reshape_coords(mask, "deptht")
+    data_flat = np.arange(2 * ngrid_water).reshape(2, ngrid_water) + 1.0
+    data_grid = timeseries_tools.reshape_to_grid(
+        data_flat, [coords["gridY"], coords["gridX"]], (3, 4)
+    )
+    water = mask.tmask.values[0, 0].astype(bool)
+    np.testing.assert_array_equal(data_grid[:, water], data_flat)
+    np.testing.assert_array_equal(data_grid[:, ~water], 0)
+
+
+class TestWaterPoints:
+    """Unit tests for WaterPoints class."""
+
+    tmask = np.array([[0, 1, 1, 0], [1, 1, 0, 1], [0, 0, 0, 1]])
+
+    def test_indices(self):
+        water_points = timeseries_tools.WaterPoints(self.tmask)
+        np.testing.assert_array_equal(water_points.indices, [1, 2, 4, 5, 7, 11])
+        assert water_points.size == 6
+        j, i = water_points.grid_indices
+        np.testing.assert_array_equal(self.tmask[j, i], 1)
+
+    @pytest.mark.parametrize("leading_shape", [(), (5,), (2, 3)])
+    def test_gather_scatter_round_trip(self, leading_shape):
+        water_points = timeseries_tools.WaterPoints(self.tmask)
+        data_ts = np.random.default_rng(42).random(leading_shape + (6,))
+        data_grid = water_points.scatter(data_ts, fill_value=np.nan)
+        assert data_grid.shape == leading_shape + (3, 4)
+        assert np.isnan(data_grid[..., self.tmask == 0]).all()
+        np.testing.assert_array_equal(water_points.gather(data_grid), data_ts)
+
+    def test_scatter_gather_round_trip(self):
+        water_points = timeseries_tools.WaterPoints(self.tmask)
+        data_grid = np.arange(2 * 3 * 4).reshape(2, 3, 4)
+        data_ts = water_points.gather(data_grid)
+        np.testing.assert_array_equal(
+            water_points.scatter(data_ts), np.where(self.tmask, data_grid, 0)
+        )
+
+    def test_gather_into_memmap(self, tmp_path):
+        water_points = timeseries_tools.WaterPoints(self.tmask)
+        data_grid = np.arange(2 * 3 * 4).reshape(2, 3, 4)
+        out = water_points.empty(2, memmap=str(tmp_path / "data.npy"))
+        water_points.gather(data_grid, out=out)
+        out.flush()
+        np.testing.assert_array_equal(
+            np.load(tmp_path / "data.npy"), data_grid[:, self.tmask == 1]
+        )
+
+    def test_scatter_into_out(self):
+        water_points = timeseries_tools.WaterPoints(self.tmask)
+        out = np.ones((3, 4))
+        water_points.scatter(np.arange(6), fill_value=-1, out=out)
+        np.testing.assert_array_equal(out[self.tmask == 0], -1)
+        np.testing.assert_array_equal(out[self.tmask == 1], np.arange(6))
+
+    def test_gather_shape_error(self):
+        water_points = timeseries_tools.WaterPoints(self.tmask)
+        with pytest.raises(ValueError):
+            water_points.gather(np.ones((3, 5)))
+
+    def test_scatter_shape_error(self):
+        water_points = timeseries_tools.WaterPoints(self.tmask)
+        with pytest.raises(ValueError):
+            water_points.scatter(np.ones(5))